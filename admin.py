@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+
+from fileops import file_sha256
+
+
+def _recv_json(sock, timeout=60.0, max_size=2 * 1024 * 1024):
+    buffer = b''
+    sock.settimeout(timeout)
+    while len(buffer) < max_size:
+        chunk = sock.recv(65536)
+        if not chunk:
+            raise ConnectionError("Serverul a închis conexiunea înainte de răspuns.")
+        buffer += chunk
+        try:
+            return json.loads(buffer.decode('utf-8'))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+    raise ValueError("Răspuns JSON prea mare de la server.")
+
+
+def _send_command(sock, request, timeout=60.0):
+    sock.sendall(json.dumps(request).encode('utf-8'))
+    return _recv_json(sock, timeout)
+
+
+def publish(sock, app_name, file_path, token):
+    file_size = os.path.getsize(file_path)
+    print(f"Se calculează SHA-256 pentru {file_path} ({file_size} bytes)...")
+    digest = file_sha256(file_path)
+    response = _send_command(sock, {'command': 'publish_app', 'app_name': app_name, 'size': file_size, 'sha256': digest, 'admin_token': token})
+    if response.get('status') != 'ready':
+        print(f"Serverul a refuzat publicarea: {response.get('message')}")
+        return 1
+    with open(file_path, 'rb') as f:
+        sock.sendfile(f)
+    # Serverul verifică digest-ul și salvează versiunea în istoric înainte de a răspunde.
+    response = _recv_json(sock, timeout=600.0)
+    if response.get('status') != 'success':
+        print(f"Publicare eșuată: {response.get('message')}")
+        return 1
+    print(f"{app_name} publicat: versiunea {response['version']}, {response['size']} bytes.")
+    return 0
+
+
+def versions(sock, app_name):
+    response = _send_command(sock, {'command': 'list_versions', 'app_name': app_name})
+    if response.get('status') != 'success':
+        print(f"Eroare: {response.get('message')}")
+        return 1
+    for entry in response['versions']:
+        print(f"  v{entry['version']}  {entry['size']} bytes  root={entry['root'][:16]}...")
+    return 0
+
+
+def rollback(sock, app_name, version, token):
+    response = _send_command(sock, {'command': 'rollback_app', 'app_name': app_name, 'version': version, 'admin_token': token})
+    if response.get('status') != 'success':
+        print(f"Rollback eșuat: {response.get('message')}")
+        return 1
+    print(f"{app_name} restaurat la conținutul versiunii {response['restored_version']} (versiune nouă: {response['version']}).")
+    return 0
+
+
+def profile(sock, duration, interval_ms, memory, dump, token):
+    response = _send_command(sock, {'command': 'profile_start', 'duration': duration, 'interval_ms': interval_ms, 'memory': memory, 'admin_token': token})
+    if response.get('status') != 'success':
+        print(f"Profilarea nu a pornit: {response.get('message')}")
+        return 1
+    print(f"Profilare pornită pentru {response['duration']:.1f}s...")
+    time.sleep(response['duration'])
+    response = _send_command(sock, {'command': 'profile_stop', 'dump': dump, 'admin_token': token})
+    report = response.get('report')
+    if not report:
+        print("Serverul nu a returnat niciun raport.")
+        return 1
+
+    print(f"\n{report['samples']} eșantioane în {report['duration']:.1f}s.")
+    print("\nTimp per comandă (real / CPU):")
+    for command, stats in sorted(report['commands'].items(), key=lambda item: -item[1]['wall']):
+        print(f"  {command:<16} x{stats['count']:<6} real {stats['wall'] * 1000:9.1f} ms (medie {stats['avg_wall'] * 1000:.2f}, max {stats['max_wall'] * 1000:.2f})"
+              f"  CPU {stats['cpu'] * 1000:9.1f} ms")
+    print("\nFuncții cele mai des întâlnite în vârful stivei:")
+    for function, count in report['top_functions'][:15]:
+        print(f"  {count:6}  {function}")
+    if report.get('memory_top'):
+        print("\nCele mai mari creșteri de memorie:")
+        for stat in report['memory_top'][:15]:
+            print(f"  {stat['size_diff'] / 1024:10.1f} KiB  {stat['location']}")
+    if response.get('dump_path'):
+        print(f"\nRaport complet salvat pe server în {response['dump_path']} (+ .folded pentru flamegraph).")
+    return 0
+
+
+def trace(sock, action, name, token):
+    request = {'command': 'trace_start', 'name': name} if action == 'start' else {'command': 'trace_stop'}
+    request['admin_token'] = token
+    response = _send_command(sock, request)
+    if response.get('status') != 'success':
+        print(f"Eroare: {response.get('message')}")
+        return 1
+    if action == 'start':
+        print(f"Înregistrare trafic pornită pe server în {response['path']}.")
+    else:
+        print(f"Înregistrare oprită; reluați-o cu: python replay.py {response['path']}")
+    return 0
+
+
+def _format_seconds(seconds):
+    return '-' if seconds is None else f"{seconds:.2f}s"
+
+
+def _format_ms(seconds):
+    return '-' if seconds is None else f"{seconds * 1000:.1f}ms"
+
+
+def rollouts(sock, trace_id, limit):
+    request = {'command': 'rollout_stats', 'limit': limit}
+    if trace_id:
+        request['trace_id'] = trace_id
+    response = _send_command(sock, request)
+    if response.get('status') != 'success':
+        print(f"Eroare: {response.get('message')}")
+        return 1
+
+    print("Latență per etapă (față de etapa anterioară a aceluiași client):")
+    for stage, histogram in response['stages'].items():
+        if histogram['count']:
+            print(f"  {stage:<17} n={histogram['count']:<5} p50 {_format_seconds(histogram['p50']):>8}  p90 {_format_seconds(histogram['p90']):>8}"
+                  f"  p99 {_format_seconds(histogram['p99']):>8}  max {_format_seconds(histogram['max']):>8}")
+    end_to_end = response['end_to_end']
+    print(f"  {'detectare->gata':<17} n={end_to_end['count']:<5} p50 {_format_seconds(end_to_end['p50']):>8}  p90 {_format_seconds(end_to_end['p90']):>8}"
+          f"  p99 {_format_seconds(end_to_end['p99']):>8}  max {_format_seconds(end_to_end['max']):>8}")
+    ttfb = response.get('download_ttfb') or {}
+    if ttfb.get('count'):
+        print(f"  {'primul byte':<17} n={ttfb['count']:<5} p50 {_format_ms(ttfb['p50']):>8}  p90 {_format_ms(ttfb['p90']):>8}"
+              f"  p99 {_format_ms(ttfb['p99']):>8}  max {_format_ms(ttfb['max']):>8}")
+
+    print("\nPropagări:")
+    for rollout in response['rollouts']:
+        print(f"  [{rollout['trace_id']}] {rollout['app_name']} v{rollout['version']} ({time.ctime(rollout['detected_at'])}):"
+              f" {rollout['clients_completed']}/{rollout['clients_notified']} clienți actualizați")
+        rollout_ttfb = rollout.get('ttfb') or {}
+        if rollout_ttfb.get('count'):
+            print(f"      primul byte: n={rollout_ttfb['count']} p50 {_format_ms(rollout_ttfb['p50'])}"
+                  f"  p90 {_format_ms(rollout_ttfb['p90'])}  max {_format_ms(rollout_ttfb['max'])}")
+        for offset, fraction in rollout['completion_curve']:
+            print(f"      {offset:8.2f}s  {fraction * 100:5.1f}%")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Comenzi de administrare pentru serverul de aplicații.")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--token', default=os.environ.get('APP_ADMIN_TOKEN'),
+                        help="Token-ul de administrare al serverului (implicit $APP_ADMIN_TOKEN).")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    publish_parser = commands.add_parser('publish', help="Publică o versiune nouă a unei aplicații (streaming, fără a bloca serverul).")
+    publish_parser.add_argument('app_name')
+    publish_parser.add_argument('file_path')
+
+    versions_parser = commands.add_parser('versions', help="Listează versiunile păstrate în istoric.")
+    versions_parser.add_argument('app_name')
+
+    rollback_parser = commands.add_parser('rollback', help="Restaurează o versiune din istoric.")
+    rollback_parser.add_argument('app_name')
+    rollback_parser.add_argument('version', type=float)
+
+    profile_parser = commands.add_parser('profile', help="Profilează serverul pentru o fereastră limitată de timp.")
+    profile_parser.add_argument('--duration', type=float, default=30.0)
+    profile_parser.add_argument('--interval-ms', type=float, default=5.0)
+    profile_parser.add_argument('--memory', action='store_true', help="Include instantanee tracemalloc.")
+    profile_parser.add_argument('--dump', action='store_true', help="Salvează raportul și pe server.")
+
+    trace_parser = commands.add_parser('trace', help="Pornește/oprește înregistrarea traficului pentru replay.py.")
+    trace_parser.add_argument('action', choices=('start', 'stop'))
+    trace_parser.add_argument('--name', help="Numele fișierului de trasare (implicit trace_<timestamp>).")
+
+    rollouts_parser = commands.add_parser('rollouts', help="Latența propagării actualizărilor (per etapă și per propagare).")
+    rollouts_parser.add_argument('--trace-id', help="Doar propagarea cu acest identificator.")
+    rollouts_parser.add_argument('--limit', type=int, default=10, help="Numărul de propagări recente afișate.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        with socket.create_connection((args.host, args.port)) as sock:
+            if args.command == 'publish':
+                return publish(sock, args.app_name, args.file_path, args.token)
+            if args.command == 'versions':
+                return versions(sock, args.app_name)
+            if args.command == 'rollback':
+                return rollback(sock, args.app_name, args.version, args.token)
+            if args.command == 'profile':
+                return profile(sock, args.duration, args.interval_ms, args.memory, args.dump, args.token)
+            if args.command == 'trace':
+                return trace(sock, args.action, args.name, args.token)
+            if args.command == 'rollouts':
+                return rollouts(sock, args.trace_id, args.limit)
+    except (OSError, ConnectionError, ValueError) as e:
+        print(f"Eroare de comunicare cu serverul {args.host}:{args.port}: {e}")
+        return 2
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
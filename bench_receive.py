@@ -0,0 +1,128 @@
+import argparse
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+
+from merkle import ChunkVerifier, CHUNK_SIZE, build_manifest_from_bytes, merkle_root
+from receiver import FileReceiver, RECV_BUFFER_SIZE
+
+
+PATTERN_SIZE = 64 * 1024 * 1024
+
+
+def _pattern():
+    # Conținut determinist, ca receptorul să poată calcula manifestul Merkle fără să-l primească.
+    return random.Random(41).randbytes(PATTERN_SIZE)
+
+
+def _manifest_for(size):
+    """ Manifestul unui flux de `size` bytes care repetă _pattern() (size multiplu de CHUNK_SIZE). """
+    pattern_digests = build_manifest_from_bytes(_pattern())['chunks']
+    digests = [pattern_digests[index % len(pattern_digests)] for index in range(size // CHUNK_SIZE)]
+    return {'chunk_size': CHUNK_SIZE, 'size': size, 'chunks': digests, 'root': merkle_root(digests)}
+
+
+def _serve(port_queue, payload_size, rounds):
+    """ Procesul emițător: trimite același model din memorie, o dată pe rundă, pe loopback. """
+    payload = _pattern()
+    with socket.create_server(('127.0.0.1', 0)) as listener:
+        port_queue.put(listener.getsockname()[1])
+        for _ in range(rounds):
+            connection, _ = listener.accept()
+            with connection:
+                connection.recv(16)
+                sent_total = 0
+                while sent_total < payload_size:
+                    offset = sent_total % PATTERN_SIZE
+                    sent_total += connection.send(memoryview(payload)[offset:offset + min(PATTERN_SIZE - offset, payload_size - sent_total)])
+                connection.recv(16)
+
+
+def legacy_receive(sock, path, size, verifier):
+    """ Bucla veche din ApplicationClient.download_application: recv de 8 KB + f.write per bucată. """
+    bytes_received = 0
+    with open(path, 'wb') as f:
+        while bytes_received < size:
+            chunk = sock.recv(min(8192, size - bytes_received))
+            if not chunk:
+                raise EOFError("Conexiune închisă prematur.")
+            f.write(chunk)
+            if verifier:
+                verifier.update(chunk)
+            bytes_received += len(chunk)
+    return bytes_received
+
+
+def _run_round(port, engine, path, size, manifest, fsync_policy, buffer):
+    verifier = ChunkVerifier(manifest) if manifest else None
+    with socket.create_connection(('127.0.0.1', port)) as sock:
+        sock.sendall(b'READY')
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        if engine == 'legacy':
+            received = legacy_receive(sock, path, size, verifier)
+            recv_calls = None
+        else:
+            receiver = FileReceiver(path, size, verifier=verifier, fsync_policy=fsync_policy, mode=engine, buffer=buffer)
+            received = receiver.receive(sock)
+            recv_calls = receiver.recv_calls
+        cpu_seconds = time.thread_time() - cpu_started
+        wall_seconds = time.perf_counter() - wall_started
+        sock.sendall(b'DONE')
+    if received != size or (verifier and verifier.finish()):
+        raise ValueError(f"{engine}: transfer invalid ({received}/{size} bytes, bucăți invalide {verifier.bad_chunks[:5] if verifier else []}).")
+    return wall_seconds, cpu_seconds, recv_calls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compară bucla veche de recepție cu FileReceiver (buffer și mmap) pe loopback.")
+    parser.add_argument('--size-mb', type=int, default=512)
+    parser.add_argument('--rounds', type=int, default=3, help="Runde per motor; se raportează cea mai bună.")
+    parser.add_argument('--verify', action='store_true', help="Include verificarea Merkle (SHA-256) în măsurătoare.")
+    parser.add_argument('--fsync', default='none', choices=('none', 'end', 'interval'))
+    parser.add_argument('--dir', default=None, help="Directorul fișierului de test (implicit directorul temporar).")
+    args = parser.parse_args(argv)
+
+    size = args.size_mb * 1024 * 1024
+    engines = ('legacy', 'buffer', 'mmap')
+    manifest = _manifest_for(size) if args.verify else None
+
+    port_queue = multiprocessing.Queue()
+    sender = multiprocessing.Process(target=_serve, args=(port_queue, size, len(engines) * args.rounds), daemon=True)
+    sender.start()
+    port = port_queue.get(timeout=30)
+
+    buffer = bytearray(RECV_BUFFER_SIZE)
+    fd, path = tempfile.mkstemp(prefix='bench_receive.', dir=args.dir)
+    os.close(fd)
+    results = {}
+    try:
+        for engine in engines:
+            best = None
+            for _ in range(args.rounds):
+                measured = _run_round(port, engine, path, size, manifest, args.fsync, buffer)
+                if best is None or measured[0] < best[0]:
+                    best = measured
+            results[engine] = best
+    finally:
+        os.remove(path)
+        sender.join(timeout=10)
+
+    print(f"\nRecepție {size / (1024 * 1024):.0f} MB pe loopback, fsync={args.fsync}, verificare Merkle {'da' if manifest else 'nu'}"
+          f" (cea mai bună din {args.rounds} runde):")
+    baseline_cpu = results['legacy'][1]
+    for engine, (wall_seconds, cpu_seconds, recv_calls) in results.items():
+        throughput = size / wall_seconds / (1024 * 1024)
+        cpu_per_gb = cpu_seconds / (size / (1024 ** 3))
+        calls = f"{recv_calls} recv" if recv_calls is not None else f"~{size // 8192} recv"
+        print(f"  {engine:<7} {throughput:8.0f} MB/s  CPU {cpu_seconds:6.3f}s ({cpu_per_gb:.2f} s/GB, "
+              f"{cpu_seconds / baseline_cpu * 100:5.1f}% din bucla veche)  {calls}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
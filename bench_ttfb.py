@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from fileops import drop_cached
+
+
+APP_NAME = 'bench_app.bin'
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def _recv_message(sock):
+    buffer = b''
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            raise ConnectionError("Serverul a închis conexiunea.")
+        buffer += chunk
+        try:
+            return json.loads(buffer.decode('utf-8'))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+
+
+def _write_version(path, size):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            block = os.urandom(min(remaining, 4 * 1024 * 1024))
+            f.write(block)
+            remaining -= len(block)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class WaveClient(threading.Thread):
+    """ Client minimal: se declară cu o versiune veche, așteaptă notificarea și măsoară cât durează
+    de la notificare până la primul byte al noii versiuni. """
+
+    def __init__(self, port, ready_barrier):
+        super().__init__(daemon=True)
+        self.port = port
+        self.ready_barrier = ready_barrier
+        self.ttfb = None
+        self.error = None
+
+    def run(self):
+        try:
+            with socket.create_connection(('127.0.0.1', self.port)) as sock:
+                sock.sendall(json.dumps({'command': 'announce_versions', 'versions': {APP_NAME: 0}}).encode('utf-8'))
+                _recv_message(sock)
+                self.ready_barrier.wait()
+                sock.settimeout(120.0)
+                notification = _recv_message(sock)
+                notified_at = time.perf_counter()
+                sock.sendall(json.dumps({'command': 'download_app', 'app_name': APP_NAME,
+                                         'trace_id': notification.get('trace_id')}).encode('utf-8'))
+                metadata = _recv_message(sock)
+                sock.sendall(b'READY')
+                view = memoryview(bytearray(1024 * 1024))
+                remaining = metadata['size']
+                received = sock.recv_into(view, min(len(view), remaining))
+                self.ttfb = time.perf_counter() - notified_at
+                remaining -= received
+                while remaining > 0:
+                    received = sock.recv_into(view, min(len(view), remaining))
+                    if not received:
+                        raise ConnectionError("Transfer întrerupt.")
+                    remaining -= received
+                sock.sendall(b'DONE')
+        except Exception as e:
+            self.error = e
+
+
+def run_wave(size, clients, warm_timeout, evict):
+    """ Publică o versiune nouă cu `clients` clienți conectați și întoarce TTFB-ul primei valuri. """
+    import server as server_module
+
+    work_dir = tempfile.mkdtemp(prefix='bench_ttfb.')
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        os.makedirs('apps')
+        app_path = os.path.join('apps', APP_NAME)
+        _write_version(app_path, size)
+        port = _free_port()
+        server = server_module.ApplicationServer('127.0.0.1', port, data_dir='server_data', warm_timeout=warm_timeout)
+        if evict:
+            # Simulează presiunea pe memorie: fișierul nou iese din page cache imediat după salvarea în depozit.
+            store_versions = server._store_versions
+
+            def store_then_evict(app_infos):
+                stored = store_versions(app_infos)
+                for app_info in app_infos:
+                    drop_cached(app_info['path'])
+                return stored
+            server._store_versions = store_then_evict
+        threading.Thread(target=server.start, daemon=True).start()
+        time.sleep(0.5)
+
+        barrier = threading.Barrier(clients + 1)
+        wave = [WaveClient(port, barrier) for _ in range(clients)]
+        for client in wave:
+            client.start()
+        barrier.wait(timeout=30)
+        time.sleep(0.2)
+        _write_version(app_path, size)
+        for client in wave:
+            client.join(timeout=180)
+        server_ttfb = server.rollouts.stats()['download_ttfb']
+        server.stop()
+        errors = [client.error for client in wave if client.error]
+        return sorted(client.ttfb for client in wave if client.ttfb is not None), server_ttfb, errors
+    finally:
+        os.chdir(previous_dir)
+
+
+def _percentile(ordered_values, percent):
+    if not ordered_values:
+        return float('nan')
+    return ordered_values[min(len(ordered_values) - 1, int(round(percent / 100.0 * (len(ordered_values) - 1))))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Măsoară timpul până la primul byte pentru prima val de descărcări după publicarea unei versiuni.")
+    parser.add_argument('--size-mb', type=int, default=64)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--no-evict', action='store_true', help="Nu scoate fișierul nou din page cache (disc deja cald).")
+    args = parser.parse_args(argv)
+    size = args.size_mb * 1024 * 1024
+
+    results = {}
+    for label, warm_timeout in (('fără încălzire', 0), ('cu încălzire', 5.0)):
+        results[label] = run_wave(size, args.clients, warm_timeout, evict=not args.no_evict)
+
+    print(f"\nPrima val: {args.clients} clienți, {args.size_mb} MB, page cache {'rece' if not args.no_evict else 'cald'}:")
+    for label, (ttfb_values, server_ttfb, errors) in results.items():
+        print(f"  {label:<15} client p50 {_percentile(ttfb_values, 50) * 1000:8.1f} ms  p90 {_percentile(ttfb_values, 90) * 1000:8.1f} ms"
+              f"  max {_percentile(ttfb_values, 100) * 1000:8.1f} ms | server mediu {(server_ttfb['mean'] or 0) * 1000:7.1f} ms"
+              f"{'  erori: ' + str(len(errors)) if errors else ''}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
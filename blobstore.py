@@ -0,0 +1,267 @@
+import collections
+import json
+import os
+import threading
+import time
+from urllib.parse import quote
+
+from fileops import advise, drop_cached
+from merkle import CHUNK_SIZE, chunk_digest, merkle_root
+
+
+class FileChangedError(OSError):
+    pass
+
+
+class BlobStore:
+    """ Depozit adresat prin conținut pentru istoricul versiunilor aplicațiilor.
+
+    Fiecare versiune este un manifest (hash SHA-256 per bucată + rădăcină Merkle, aceeași
+    împărțire ca la verificarea transferurilor) păstrat în manifests/<aplicație>.json.
+    Bucățile se scriu o singură dată în objects/, oricâte versiuni sau aplicații le folosesc.
+    """
+
+    def __init__(self, root, keep_versions=40, max_bytes=None, chunk_size=CHUNK_SIZE):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.manifests_dir = os.path.join(root, 'manifests')
+        self.keep_versions = keep_versions
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.lock = threading.Lock()
+        # Bucăți scrise de ingest-uri în curs, încă nereferite de vreun manifest (digest -> număr de utilizări).
+        self._pending_chunks = collections.Counter()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def _history_path(self, app_name):
+        return os.path.join(self.manifests_dir, quote(app_name, safe='') + '.json')
+
+    def _load_history(self, app_name):
+        try:
+            with open(self._history_path(app_name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def _save_history(self, app_name, history):
+        history_path = self._history_path(app_name)
+        if not history:
+            if os.path.exists(history_path):
+                os.remove(history_path)
+            return
+        temp_path = f"{history_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(history, f)
+        os.replace(temp_path, history_path)
+
+    def _all_histories(self):
+        for file_name in os.listdir(self.manifests_dir):
+            if file_name.endswith('.json'):
+                with open(os.path.join(self.manifests_dir, file_name), 'r', encoding='utf-8') as f:
+                    history = json.load(f)
+                if history:
+                    yield history[0]['app_name'], history
+
+    def versions(self, app_name):
+        """ Manifestele păstrate pentru aplicație, de la cea mai veche la cea mai nouă. """
+        with self.lock:
+            return self._load_history(app_name)
+
+    def get_version(self, app_name, version):
+        for manifest in self.versions(app_name):
+            if manifest['version'] == version:
+                return manifest
+        return None
+
+    def ingest(self, app_name, file_path, version, expected_size=None, expected_mtime=None):
+        """ Adaugă fișierul ca versiune nouă. Returnează (manifest, bytes noi scriși pe disc).
+
+        Dacă fișierul nu mai are dimensiunea/mtime-ul așteptat sau se schimbă în timpul citirii, nu se salvează
+        niciun manifest și se ridică FileChangedError (bucățile scrise rămân pentru gc).
+        """
+        existing = self.get_version(app_name, version)
+        if existing is not None:
+            return existing, 0
+
+        digests = []
+        total_size = 0
+        new_bytes = 0
+        try:
+            with open(file_path, 'rb') as f:
+                stat_before = os.fstat(f.fileno())
+                if ((expected_size is not None and stat_before.st_size != expected_size)
+                        or (expected_mtime is not None and stat_before.st_mtime != expected_mtime)):
+                    raise FileChangedError(f"{file_path} nu mai corespunde versiunii {version}")
+                while True:
+                    data = f.read(self.chunk_size)
+                    if not data:
+                        break
+                    digest = chunk_digest(data)
+                    with self.lock:
+                        self._pending_chunks[digest] += 1
+                    digests.append(digest)
+                    total_size += len(data)
+                    new_bytes += self._write_object(digest, data)
+                stat_after = os.fstat(f.fileno())
+                if (total_size != stat_before.st_size or stat_after.st_size != stat_before.st_size
+                        or stat_after.st_mtime_ns != stat_before.st_mtime_ns):
+                    raise FileChangedError(f"{file_path} s-a modificat în timpul citirii")
+
+            manifest = {
+                'app_name': app_name,
+                'version': version,
+                'size': total_size,
+                'chunk_size': self.chunk_size,
+                'chunks': digests,
+                'root': merkle_root(digests),
+                'stored_at': time.time()
+            }
+            with self.lock:
+                history = [m for m in self._load_history(app_name) if m['version'] != version]
+                history.append(manifest)
+                history.sort(key=lambda m: m['version'])
+                self._save_history(app_name, history)
+            return manifest, new_bytes
+        finally:
+            with self.lock:
+                # Doar utilizările acestui ingest: un alt ingest concurent poate avea nevoie de aceleași bucăți.
+                for digest in digests:
+                    self._pending_chunks[digest] -= 1
+                    if self._pending_chunks[digest] <= 0:
+                        del self._pending_chunks[digest]
+
+    def _write_object(self, digest, data):
+        object_path = self._object_path(digest)
+        if os.path.exists(object_path):
+            return 0
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        temp_path = f"{object_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, object_path)
+        return len(data)
+
+    def _read_object(self, digest):
+        with open(self._object_path(digest), 'rb') as f:
+            advise(f.fileno(), 'SEQUENTIAL')
+            return f.read()
+
+    def read_version(self, manifest):
+        """ Conținutul complet al unei versiuni, reconstruit din bucăți. """
+        return b''.join(self._read_object(digest) for digest in manifest['chunks'])
+
+    def materialize(self, manifest, dest_path):
+        with open(dest_path, 'wb') as out:
+            for digest in manifest['chunks']:
+                out.write(self._read_object(digest))
+
+    def drop_superseded(self, app_name, current_manifest):
+        """ După o versiune nouă, bucățile versiunii anterioare care nu mai sunt folosite de ea primesc
+        sfatul DONTNEED: se citesc doar la rollback, deci nu merită să ocupe page cache-ul. """
+        previous = [m for m in self.versions(app_name) if m['version'] < current_manifest['version']]
+        if not previous:
+            return 0
+        superseded = set(previous[-1]['chunks']) - set(current_manifest['chunks'])
+        return sum(1 for digest in superseded if drop_cached(self._object_path(digest)))
+
+    def apply_retention(self, protected_versions=None, app_names=None):
+        """ Păstrează ultimele keep_versions versiuni per aplicație și, dacă e setat, cel mult max_bytes pe disc.
+
+        Versiunile din protected_versions ({aplicație: versiune}, de obicei catalogul curent) nu se șterg.
+        Cu app_names, limita per aplicație se verifică doar pentru aplicațiile date.
+        Returnează (versiuni eliminate, bytes eliberați).
+        """
+        protected_versions = protected_versions or {}
+        removed_versions = 0
+        with self.lock:
+            histories = {name: self._load_history(name) for name in app_names} if app_names is not None else dict(self._all_histories())
+            for app_name, history in histories.items():
+                excess = len(history) - self.keep_versions
+                if excess <= 0:
+                    continue
+                kept = []
+                for manifest in history:
+                    if excess > 0 and protected_versions.get(app_name) != manifest['version'] and manifest is not history[-1]:
+                        excess -= 1
+                        removed_versions += 1
+                    else:
+                        kept.append(manifest)
+                histories[app_name] = kept
+                self._save_history(app_name, kept)
+
+        if self.max_bytes is not None:
+            removed_versions += self._apply_size_budget(protected_versions)
+
+        freed_bytes = self.gc() if removed_versions else 0
+        return removed_versions, freed_bytes
+
+    def _apply_size_budget(self, protected_versions):
+        """ Elimină cele mai vechi versiuni până când bucățile rămase încap în max_bytes.
+
+        Spațiul se calculează o singură dată; fiecare versiune eliminată scade doar bucățile rămase
+        fără nicio referință (numărate pe toate manifestele). Ștergerea efectivă o face gc() la final.
+        """
+        object_sizes = self._object_sizes()
+        usage = sum(object_sizes.values())
+        if usage <= self.max_bytes:
+            return 0
+        removed_versions = 0
+        with self.lock:
+            histories = dict(self._all_histories())
+            references = collections.Counter(self._pending_chunks)
+            for history in histories.values():
+                for manifest in history:
+                    references.update(manifest['chunks'])
+            candidates = sorted(
+                (manifest['stored_at'], app_name, manifest['version'], manifest['chunks'])
+                for app_name, history in histories.items()
+                for manifest in history[:-1]
+                if protected_versions.get(app_name) != manifest['version']
+            )
+            changed_apps = set()
+            for _, app_name, version, chunks in candidates:
+                if usage <= self.max_bytes:
+                    break
+                histories[app_name] = [m for m in histories[app_name] if m['version'] != version]
+                changed_apps.add(app_name)
+                removed_versions += 1
+                for digest in chunks:
+                    references[digest] -= 1
+                    if references[digest] == 0:
+                        usage -= object_sizes.get(digest, 0)
+            for app_name in changed_apps:
+                self._save_history(app_name, histories[app_name])
+        return removed_versions
+
+    def gc(self):
+        """ Șterge bucățile pe care nu le mai referă niciun manifest. Returnează bytes eliberați. """
+        freed_bytes = 0
+        with self.lock:
+            referenced = set(self._pending_chunks)
+            for _, history in self._all_histories():
+                for manifest in history:
+                    referenced.update(manifest['chunks'])
+            for prefix in os.listdir(self.objects_dir):
+                prefix_dir = os.path.join(self.objects_dir, prefix)
+                for entry in os.scandir(prefix_dir):
+                    if entry.name.endswith('.tmp'):
+                        continue
+                    if prefix + entry.name not in referenced:
+                        freed_bytes += entry.stat().st_size
+                        os.remove(entry.path)
+        return freed_bytes
+
+    def _object_sizes(self):
+        sizes = {}
+        for prefix in os.listdir(self.objects_dir):
+            for entry in os.scandir(os.path.join(self.objects_dir, prefix)):
+                if not entry.name.endswith('.tmp'):
+                    sizes[prefix + entry.name] = entry.stat().st_size
+        return sizes
+
+    def disk_usage(self):
+        return sum(self._object_sizes().values())
@@ -0,0 +1,241 @@
+import base64
+import bisect
+import json
+import os
+from types import MappingProxyType
+
+
+MAX_QUERY_LIMIT = 1000
+SORT_FIELDS = ('name', 'size', 'modified')
+# Santinele pentru capetele intervalelor pe chei (valoare, nume).
+_LOWEST_NAME = ''
+_HIGHEST_NAME = '\U0010ffff'
+
+
+class QueryError(ValueError):
+    pass
+
+
+def load_app_metadata(metadata_root, app_name):
+    """ Metadatele opționale ale aplicației din apps/.metadata/<nume>.json (tags, platform, ...). """
+    try:
+        with open(os.path.join(metadata_root, app_name + '.json'), 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return metadata if isinstance(metadata, dict) else {}
+
+
+def _record(app_info, metadata):
+    tags = metadata.get('tags') or ()
+    return MappingProxyType({
+        'name': app_info['name'],
+        'version': app_info['version'],
+        'size': app_info['size'],
+        'tags': tuple(sorted({str(tag) for tag in tags})) if isinstance(tags, (list, tuple)) else (),
+        'platform': metadata.get('platform') if isinstance(metadata.get('platform'), str) else None,
+        'metadata': MappingProxyType(dict(metadata))
+    })
+
+
+def encode_cursor(sort, order, key):
+    return base64.urlsafe_b64encode(json.dumps([sort, order, list(key)]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, sort, order):
+    try:
+        cursor_sort, cursor_order, key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError, AttributeError):
+        raise QueryError('Cursor invalid.')
+    if cursor_sort != sort or cursor_order != order:
+        raise QueryError('Cursorul a fost emis pentru altă sortare.')
+    return tuple(key)
+
+
+class CatalogIndex:
+    """ Indecși imutabili peste catalog, înlocuiți odată cu fiecare generație a lui.
+
+    by_name este lista sortată a numelor; by_size și by_modified sunt liste sortate de
+    (valoare, nume); by_tag și by_platform mapează valoarea la lista sortată de nume.
+    O interogare pornește din indexul cu cele mai puține candidate și verifică restul
+    filtrelor doar pe acestea, deci nu parcurge întregul catalog.
+    """
+
+    __slots__ = ('records', 'by_name', 'by_size', 'by_modified', 'by_tag', 'by_platform')
+
+    def __init__(self, records=None):
+        self.records = MappingProxyType(dict(records or {}))
+        self.by_name = sorted(self.records)
+        self.by_size = sorted((record['size'], name) for name, record in self.records.items())
+        self.by_modified = sorted((record['version'], name) for name, record in self.records.items())
+        self.by_tag = {}
+        self.by_platform = {}
+        for name in self.by_name:
+            record = self.records[name]
+            for tag in record['tags']:
+                self.by_tag.setdefault(tag, []).append(name)
+            if record['platform'] is not None:
+                self.by_platform.setdefault(record['platform'], []).append(name)
+
+    @classmethod
+    def build(cls, app_infos, metadata_by_name):
+        return cls({name: _record(info, metadata_by_name.get(name, {})) for name, info in app_infos.items()})
+
+    def with_changes(self, updated_infos=None, removed=(), metadata_by_name=None):
+        """ Generația următoare a indecșilor; actualizează doar intrările atinse. """
+        updated_infos = updated_infos or {}
+        metadata_by_name = metadata_by_name or {}
+        if not updated_infos and not removed:
+            return self
+        new_records = {name: _record(info, metadata_by_name.get(name, {})) for name, info in updated_infos.items()}
+        if len(new_records) + len(removed) > len(self.records) // 8:
+            records = dict(self.records)
+            for name in removed:
+                records.pop(name, None)
+            records.update(new_records)
+            return CatalogIndex(records)
+
+        index = CatalogIndex.__new__(CatalogIndex)
+        records = dict(self.records)
+        index.by_name = list(self.by_name)
+        index.by_size = list(self.by_size)
+        index.by_modified = list(self.by_modified)
+        index.by_tag = dict(self.by_tag)
+        index.by_platform = dict(self.by_platform)
+        for name in list(removed) + list(new_records):
+            old_record = records.pop(name, None)
+            if old_record is not None:
+                index._discard(old_record)
+        for name, record in new_records.items():
+            records[name] = record
+            bisect.insort(index.by_name, name)
+            bisect.insort(index.by_size, (record['size'], name))
+            bisect.insort(index.by_modified, (record['version'], name))
+            for tag in record['tags']:
+                index.by_tag[tag] = list(index.by_tag.get(tag, ()))
+                bisect.insort(index.by_tag[tag], name)
+            if record['platform'] is not None:
+                index.by_platform[record['platform']] = list(index.by_platform.get(record['platform'], ()))
+                bisect.insort(index.by_platform[record['platform']], name)
+        index.records = MappingProxyType(records)
+        return index
+
+    def _discard(self, record):
+        name = record['name']
+        for sorted_list, key in ((self.by_name, name), (self.by_size, (record['size'], name)), (self.by_modified, (record['version'], name))):
+            position = bisect.bisect_left(sorted_list, key)
+            if position < len(sorted_list) and sorted_list[position] == key:
+                del sorted_list[position]
+        for postings, value in [(self.by_tag, tag) for tag in record['tags']] + [(self.by_platform, record['platform'])]:
+            if value is None or value not in postings:
+                continue
+            names = [n for n in postings[value] if n != name]
+            if names:
+                postings[value] = names
+            else:
+                del postings[value]
+
+    @staticmethod
+    def _sort_key(sort, record):
+        if sort == 'size':
+            return (record['size'], record['name'])
+        if sort == 'modified':
+            return (record['version'], record['name'])
+        return (record['name'],)
+
+    def _drivers(self, query):
+        """ Sursele posibile de candidate: (număr estimat, listă sortată, început, sfârșit, sortarea listei). """
+        drivers = [(len(self.by_name), self.by_name, 0, len(self.by_name), 'name')]
+        prefix = query.get('prefix')
+        if prefix:
+            start = bisect.bisect_left(self.by_name, prefix)
+            end = bisect.bisect_left(self.by_name, prefix + _HIGHEST_NAME)
+            drivers.append((end - start, self.by_name, start, end, 'name'))
+        if query.get('min_size') is not None or query.get('max_size') is not None:
+            start = bisect.bisect_left(self.by_size, (query['min_size'], _LOWEST_NAME)) if query.get('min_size') is not None else 0
+            end = bisect.bisect_right(self.by_size, (query['max_size'], _HIGHEST_NAME)) if query.get('max_size') is not None else len(self.by_size)
+            drivers.append((end - start, self.by_size, start, end, 'size'))
+        if query.get('modified_after') is not None or query.get('modified_before') is not None:
+            start = bisect.bisect_left(self.by_modified, (query['modified_after'], _LOWEST_NAME)) if query.get('modified_after') is not None else 0
+            end = bisect.bisect_right(self.by_modified, (query['modified_before'], _HIGHEST_NAME)) if query.get('modified_before') is not None else len(self.by_modified)
+            drivers.append((end - start, self.by_modified, start, end, 'modified'))
+        for tag in query.get('tags') or ():
+            names = self.by_tag.get(tag, [])
+            drivers.append((len(names), names, 0, len(names), 'name'))
+        if query.get('platform') is not None:
+            names = self.by_platform.get(query['platform'], [])
+            drivers.append((len(names), names, 0, len(names), 'name'))
+        return drivers
+
+    @staticmethod
+    def _matches(record, query):
+        prefix = query.get('prefix')
+        if prefix and not record['name'].startswith(prefix):
+            return False
+        if query.get('tags') and not set(query['tags']).issubset(record['tags']):
+            return False
+        if query.get('platform') is not None and record['platform'] != query['platform']:
+            return False
+        if query.get('min_size') is not None and record['size'] < query['min_size']:
+            return False
+        if query.get('max_size') is not None and record['size'] > query['max_size']:
+            return False
+        if query.get('modified_after') is not None and record['version'] < query['modified_after']:
+            return False
+        if query.get('modified_before') is not None and record['version'] > query['modified_before']:
+            return False
+        return True
+
+    def query(self, query):
+        """ Returnează (înregistrări, cursor pentru pagina următoare sau None). """
+        if isinstance(query.get('tags'), str):
+            query = dict(query, tags=[query['tags']])
+        sort = query.get('sort', 'name')
+        order = query.get('order', 'asc')
+        if sort not in SORT_FIELDS or order not in ('asc', 'desc'):
+            raise QueryError(f"Sortare invalidă: {sort} {order}.")
+        limit = max(1, min(int(query.get('limit', 50)), MAX_QUERY_LIMIT))
+        cursor_key = decode_cursor(query['cursor'], sort, order) if query.get('cursor') else None
+        descending = order == 'desc'
+
+        drivers = self._drivers(query)
+        candidate_count, driver_list, start, end, driver_sort = min(drivers, key=lambda driver: driver[0])
+        if driver_sort != sort:
+            # Parcurgerea indexului de sortare se oprește după limit potriviri; e preferată când, la
+            # selectivitatea estimată, ar citi mai puține intrări decât candidatele de sortat.
+            sorted_driver = min((driver for driver in drivers if driver[4] == sort), key=lambda driver: driver[0],
+                                default=(len(self.by_size), self.by_size, 0, len(self.by_size), sort) if sort == 'size'
+                                else (len(self.by_modified), self.by_modified, 0, len(self.by_modified), sort))
+            estimated_scan = (limit + 1) * sorted_driver[0] / max(1, candidate_count)
+            if estimated_scan < candidate_count:
+                candidate_count, driver_list, start, end, driver_sort = sorted_driver
+        if driver_sort == sort:
+            # Lista aleasă are deja ordinea cerută: se parcurge de la cursor și se oprește la limit.
+            if cursor_key is not None:
+                position_key = cursor_key[0] if sort == 'name' else cursor_key
+                if descending:
+                    end = min(end, bisect.bisect_left(driver_list, position_key))
+                else:
+                    start = max(start, bisect.bisect_right(driver_list, position_key))
+            positions = range(end - 1, start - 1, -1) if descending else range(start, end)
+            results = []
+            for position in positions:
+                entry = driver_list[position]
+                record = self.records[entry if sort == 'name' else entry[1]]
+                if self._matches(record, query):
+                    results.append(record)
+                    if len(results) > limit:
+                        break
+        else:
+            candidates = [self.records[entry if driver_sort == 'name' else entry[1]] for entry in driver_list[start:end]]
+            keyed = sorted(((self._sort_key(sort, record), record) for record in candidates if self._matches(record, query)),
+                           key=lambda item: item[0], reverse=descending)
+            if cursor_key is not None:
+                keyed = [item for item in keyed if (item[0] < cursor_key if descending else item[0] > cursor_key)]
+            results = [record for _, record in keyed[:limit + 1]]
+
+        next_cursor = None
+        if len(results) > limit:
+            results = results[:limit]
+            next_cursor = encode_cursor(sort, order, self._sort_key(sort, results[-1]))
+        return results, next_cursor
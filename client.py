@@ -1,44 +1,284 @@
 import socket
 import json
 import os
+import random
 import threading
 import time
 import subprocess
 from pathlib import Path
 import errno
+import selectors
+import struct
 import sys
+import argparse
+import signal
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from host_cache import HostCache
+from merkle import ChunkVerifier, chunk_length, MAX_REPAIR_ROUNDS, MAX_CHUNKS_PER_REPAIR
+from receiver import FileReceiver, RECV_BUFFER_SIZE, FSYNC_POLICIES, RECEIVE_MODES
+
+
+class ProcessSupervisor:
+    """ Urmărește procesele pornite de client și află imediat când se termină.
+
+    Pe Linux folosește pidfd-uri (os.pidfd_open) urmărite de un singur thread; în rest, câte un
+    thread per proces, blocat în Popen.wait(). Nu se face polling și nu există pauze fixe.
+    """
+
+    def __init__(self, on_exit=None):
+        self.on_exit = on_exit
+        self._lock = threading.Lock()
+        self._processes = {}
+        # Selectorul și pipe-ul de trezire se creează la prima aplicație pornită și se eliberează în close().
+        self._selector = None
+        self._wakeup_pipe = None
+        self._watcher_thread = None
+        self._closed = False
+
+    def _open_selector(self):
+        with self._lock:
+            if self._closed or not hasattr(os, 'pidfd_open'):
+                return None
+            if self._selector is None:
+                self._selector = selectors.DefaultSelector()
+                self._wakeup_pipe = os.pipe()
+                self._selector.register(self._wakeup_pipe[0], selectors.EVENT_READ)
+            return self._selector
+
+    def add(self, app_name, process):
+        exited = threading.Event()
+        with self._lock:
+            self._processes[app_name] = (process, exited)
+
+        selector = self._open_selector()
+        if selector is not None:
+            try:
+                pidfd = os.pidfd_open(process.pid)
+            except ProcessLookupError:
+                process.wait()
+                self._mark_exited(app_name, process, exited)
+                return
+            except OSError:
+                pidfd = None
+            if pidfd is not None:
+                selector.register(pidfd, selectors.EVENT_READ, (app_name, process, exited))
+                self._ensure_watcher()
+                os.write(self._wakeup_pipe[1], b'x')
+                return
+
+        waiter = threading.Thread(target=self._wait_blocking, args=(app_name, process, exited), name=f"ProcessWaiter-{app_name}")
+        waiter.daemon = True
+        waiter.start()
+
+    def _ensure_watcher(self):
+        with self._lock:
+            if self._watcher_thread is None or not self._watcher_thread.is_alive():
+                self._watcher_thread = threading.Thread(target=self._watch_pidfds, name="ProcessSupervisor")
+                self._watcher_thread.daemon = True
+                self._watcher_thread.start()
+
+    def _watch_pidfds(self):
+        while True:
+            for key, _ in self._selector.select():
+                if key.fd == self._wakeup_pipe[0]:
+                    os.read(key.fd, 1024)
+                    if self._closed:
+                        self._release_selector()
+                        return
+                    continue
+                app_name, process, exited = key.data
+                self._selector.unregister(key.fd)
+                os.close(key.fd)
+                process.wait()
+                self._mark_exited(app_name, process, exited)
+
+    def close(self):
+        """ Oprește urmărirea prin pidfd și închide descriptorii; aplicațiile pornite continuă să ruleze. """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            watcher = self._watcher_thread
+        if self._selector is None:
+            return
+        if watcher is not None and watcher.is_alive():
+            os.write(self._wakeup_pipe[1], b'x')
+            watcher.join(timeout=5)
+        else:
+            self._release_selector()
+
+    def _release_selector(self):
+        for key in list(self._selector.get_map().values()):
+            self._selector.unregister(key.fd)
+            os.close(key.fd)
+        self._selector.close()
+        os.close(self._wakeup_pipe[1])
+
+    def _wait_blocking(self, app_name, process, exited):
+        process.wait()
+        self._mark_exited(app_name, process, exited)
+
+    def _mark_exited(self, app_name, process, exited):
+        with self._lock:
+            current = self._processes.get(app_name)
+            if current is not None and current[0] is process:
+                del self._processes[app_name]
+        exited.set()
+        if self.on_exit:
+            self.on_exit(app_name, process)
+
+    def get(self, app_name):
+        with self._lock:
+            entry = self._processes.get(app_name)
+        return entry[0] if entry else None
+
+    def running(self):
+        with self._lock:
+            return {app_name: entry[0] for app_name, entry in self._processes.items()}
+
+    def is_running(self, app_name):
+        with self._lock:
+            entry = self._processes.get(app_name)
+        return entry is not None and not entry[1].is_set()
+
+    def wait_exit(self, app_name, timeout=None):
+        with self._lock:
+            entry = self._processes.get(app_name)
+        return entry is None or entry[1].wait(timeout)
+
+    def terminate(self, app_name, grace_period=5.0, kill_timeout=5.0):
+        """ SIGTERM, apoi SIGKILL dacă procesul nu iese în grace_period. Revine imediat ce procesul s-a încheiat. """
+        with self._lock:
+            entry = self._processes.get(app_name)
+        if entry is None:
+            return True
+        process, exited = entry
+        process.terminate()
+        if exited.wait(grace_period):
+            return True
+        print(f"Aplicația {app_name} (PID: {process.pid}) nu s-a oprit în {grace_period} secunde după terminate. Se forțează (kill)...")
+        process.kill()
+        return exited.wait(kill_timeout)
+
+
+# Cât așteaptă un proces ca altul de pe aceeași mașină să termine descărcarea aceluiași conținut.
+HOST_CACHE_WAIT_TIMEOUT = 600.0
+RECONNECT_BASE_DELAY = 0.5
+RECONNECT_MAX_DELAY = 60.0
 
 
 class ApplicationClient:
-    def __init__(self, host='localhost', port=5000):
+    def __init__(self, host='localhost', port=5000, persist_versions=True, use_host_cache=True, host_cache_dir=None,
+                 fsync_policy='none', receive_mode='buffer', auto_reconnect=True, client_id=None):
         self.host = host
         self.port = port
         self.downloaded_apps = {}
         self.running_apps = {}
+        self.supervisor = ProcessSupervisor(on_exit=self._on_app_exit)
         self.lock = threading.Lock()
         self.socket_lock = threading.RLock()
         self.socket = None
         self.notification_thread = None
         self.stop_event = threading.Event()
-        self.client_id = f"{os.getpid()}-{threading.get_ident()}"
+        # Identitate stabilă față de server (propagări), aceeași la reconectări și pe conexiunile de lucru.
+        self.client_id = client_id or f"{os.getpid()}-{threading.get_ident()}"
         self.downloads_dir = 'downloads'
+        self.staging_dir = os.path.join(self.downloads_dir, '.staging')
+        self.pending_updates = {}
+        self.reconnect_pending = False
+        self.reconnect_thread = None
+        self.auto_reconnect = auto_reconnect
+        # Ultima generație a catalogului văzută de la server; la reconectare primim ce s-a schimbat de atunci.
+        self.last_generation = None
+        # Descărcări întrerupte de căderea conexiunii: app_name -> {temp_path, version, offset, is_update, pinned_version}.
+        self.interrupted_downloads = {}
+        # Apelat ca update_filter(app_name, versiune) înainte de o actualizare forțată; False o ignoră.
+        self.update_filter = None
+        # False pentru conexiunile de lucru (sync): serverul nu le înscrie ca destinatari ai notificărilor.
+        self.subscribe_updates = True
+        self.versions_file = os.path.join(self.downloads_dir, '.versions.json') if persist_versions else None
+        self.host_cache = None
+        if use_host_cache and HostCache.available():
+            try:
+                self.host_cache = HostCache(host_cache_dir)
+            except OSError as e_cache:
+                print(f"Client {self.client_id}: Cache-ul comun al mașinii nu poate fi folosit ({e_cache}). Se descarcă direct.")
+        self.fsync_policy = fsync_policy
+        self.receive_mode = receive_mode
+        # Buffer-ul de recepție e refolosit la fiecare descărcare (descărcările sunt serializate de socket_lock).
+        self._recv_buffer = bytearray(RECV_BUFFER_SIZE)
 
         if not os.path.exists(self.downloads_dir):
             os.makedirs(self.downloads_dir)
+        if not os.path.exists(self.staging_dir):
+            os.makedirs(self.staging_dir)
+        self._load_installed_versions()
+
+    def _load_installed_versions(self):
+        """ Versiunile instalate rămân cunoscute între reporniri (doar pentru fișierele care încă există). """
+        if not self.versions_file:
+            return
+        try:
+            with open(self.versions_file, 'r', encoding='utf-8') as f:
+                saved_versions = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e_versions:
+            print(f"Client {self.client_id}: Avertisment: {self.versions_file} nu poate fi citit ({e_versions}).")
+            return
+        with self.lock:
+            for app_name, version in saved_versions.items():
+                if os.path.isfile(os.path.join(self.downloads_dir, app_name)):
+                    self.downloaded_apps[app_name] = version
 
-    def connect(self):
+    def _save_installed_versions(self):
+        if not self.versions_file:
+            return
+        with self.lock:
+            versions_snapshot = dict(self.downloaded_apps)
+            temp_path = f"{self.versions_file}.{os.getpid()}.tmp"
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(versions_snapshot, f, indent=2)
+                os.replace(temp_path, self.versions_file)
+            except OSError as e_versions:
+                print(f"Client {self.client_id}: Eroare la salvarea {self.versions_file}: {e_versions}")
+
+    def announce_versions(self):
+        """ Comunică serverului versiunile instalate, ca să primim notificări pentru ele și pe o conexiune nouă. """
+        with self.lock:
+            versions_snapshot = dict(self.downloaded_apps)
+        with self.socket_lock:
+            try:
+                if not self.socket or self.socket.fileno() == -1:
+                    return None
+                self.socket.sendall(json.dumps({'command': 'announce_versions', 'versions': versions_snapshot, 'client_id': self.client_id}).encode('utf-8'))
+                response = self.receive_json()
+            except socket.error as se:
+                print(f"Client {self.client_id}: Eroare socket la announce_versions: {se}")
+                return None
+        if not response or response.get('status') != 'success':
+            return None
+        return response.get('outdated', [])
+
+    def connect(self, listen=True):
         self.socket_lock.acquire()
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.connect((self.host, self.port))
             print(f"Client {self.client_id}: Conectat la serverul {self.host}:{self.port}")
             self.stop_event.clear()
-            self.notification_thread = threading.Thread(target=self.listen_for_notifications, name=f"NotificationListener-{self.client_id}")
-            self.notification_thread.daemon = True
-            self.notification_thread.start()
+            if listen:
+                self._start_listener()
         finally:
             self.socket_lock.release()
 
+    def _start_listener(self):
+        self.notification_thread = threading.Thread(target=self.listen_for_notifications, name=f"NotificationListener-{self.client_id}")
+        self.notification_thread.daemon = True
+        self.notification_thread.start()
+
     def receive_json(self):
         buffer = b''
         current_socket_timeout = None
@@ -67,6 +307,8 @@ class ApplicationClient:
                 try:
                     json_obj = json.loads(buffer.decode('utf-8'))
                     if current_socket_timeout is not None: self.socket.settimeout(current_socket_timeout) # Restore
+                    if isinstance(json_obj, dict) and json_obj.get('type') == 'server_shutdown':
+                        self._on_server_shutdown(json_obj)
                     return json_obj
                 except UnicodeDecodeError as ude:
                     print(f"Client {self.client_id}: Avertisment (receive_json): Eroare de decodare Unicode în buffer: {ude}. Buffer: {buffer!r}")
@@ -104,7 +346,7 @@ class ApplicationClient:
                 return []
         except socket.error as se:
             print(f"Client {self.client_id}: Eroare socket la get_applications_list: {se}")
-            self.stop_event.set()
+            self._connection_lost(se)
             return []
         except Exception as e:
             print(f"Client {self.client_id}: Eroare la trimiterea cererii pentru lista de aplicații: {e}")
@@ -112,17 +354,53 @@ class ApplicationClient:
         finally:
             self.socket_lock.release()
 
-    def download_application(self, app_name, is_update_download=False, new_version_for_staging=None):
-        request = {'command': 'download_app', 'app_name': app_name}
+    def query_applications(self, cursor=None, limit=50, **filters):
+        """ Caută în catalogul serverului (prefix, tags, platform, min_size/max_size, modified_after/modified_before,
+        sort, order). Returnează (aplicații, cursor pentru pagina următoare sau None). """
+        request = {'command': 'query_apps', 'limit': limit}
+        request.update({key: value for key, value in filters.items() if value is not None})
+        if cursor:
+            request['cursor'] = cursor
+        with self.socket_lock:
+            try:
+                if not self.socket or self.socket.fileno() == -1:
+                    print(f"Client {self.client_id}: Eroare (query_applications): Socket-ul nu este conectat sau este închis.")
+                    return [], None
+                self.socket.sendall(json.dumps(request).encode('utf-8'))
+                response = self.receive_json()
+            except socket.error as se:
+                print(f"Client {self.client_id}: Eroare socket la query_applications: {se}")
+                return [], None
+        if not response or response.get('status') != 'success':
+            print(f"Client {self.client_id}: Eroare la căutare: {response.get('message') if response else 'răspuns gol'}")
+            return [], None
+        return response.get('apps', []), response.get('next_cursor')
+
+    def download_application(self, app_name, is_update_download=False, new_version_for_staging=None, version=None, trace_id=None):
+        request = {'command': 'download_app', 'app_name': app_name, 'verify': 'merkle', 'client_id': self.client_id}
+        if version is not None:
+            request['version'] = version
+        if trace_id:
+            request['trace_id'] = trace_id
+        if not self.subscribe_updates:
+            request['subscribe'] = False
         self.socket_lock.acquire()
         original_socket_timeout = None
-        temp_path = os.path.join(self.downloads_dir, f"{app_name}.{os.getpid()}.tmp")
-        app_final_path = os.path.join(self.downloads_dir, app_name)
+        with self.lock:
+            interrupted = self.interrupted_downloads.pop(app_name, None)
+        if interrupted:
+            # Fișierul parțial se păstrează; serverul trimite doar restul dacă versiunea e încă aceeași.
+            temp_path = interrupted['temp_path']
+            request['resume'] = {'version': interrupted['version'], 'offset': interrupted['offset']}
+        else:
+            temp_path = os.path.join(self.downloads_dir, f"{app_name}.{os.getpid()}.{threading.get_ident()}.tmp")
         bytes_received_for_error_reporting = 0
         server_version_from_metadata = None
-        staged_file_path = None
         operation_status = {'status': 'failed', 'path': None, 'version': None} # Default
         metadata = {}
+        cache_lock = None
+        receiver = None
+        keep_partial = False
 
         try:
             if not self.socket or (hasattr(self.socket, '_closed') and self.socket._closed) or self.socket.fileno() == -1:
@@ -130,6 +408,7 @@ class ApplicationClient:
                 return operation_status
 
             original_socket_timeout = self.socket.gettimeout()
+            os.makedirs(os.path.dirname(temp_path), exist_ok=True)
 
             self.socket.sendall(json.dumps(request).encode('utf-8'))
             metadata = self.receive_json()
@@ -145,44 +424,71 @@ class ApplicationClient:
             operation_status['version'] = server_version_from_metadata
             bytes_received = 0
             bytes_received_for_error_reporting = 0
-
-            print(f"Client {self.client_id}: Începe descărcarea {app_name} (Server v{server_version_from_metadata}, {file_size} bytes)")
+            verifier = None
+            if metadata.get('manifest'):
+                verifier = ChunkVerifier(metadata['manifest'])
+                if not verifier.root_ok or metadata['manifest']['size'] != file_size:
+                    raise ValueError(f"Manifest Merkle inconsistent pentru {app_name}.")
+
+            cache_key = metadata['manifest']['root'] if self.host_cache is not None and verifier else None
+            if cache_key is not None:
+                cached_path = self.host_cache.lookup(cache_key, file_size)
+                if cached_path is None:
+                    cache_lock = self.host_cache.try_lock(cache_key)
+                    if cache_lock is None:
+                        # Alt proces de pe mașină descarcă exact acest conținut: serverul așteaptă, noi așteptăm lock-ul.
+                        print(f"Client {self.client_id}: {app_name} v{server_version_from_metadata} se descarcă deja în alt proces. Se așteaptă cache-ul comun...")
+                        self.socket.sendall('WAIT'.encode('utf-8'))
+                        cache_lock = self.host_cache.lock(cache_key, HOST_CACHE_WAIT_TIMEOUT)
+                        cached_path = self.host_cache.lookup(cache_key, file_size)
+                copy_method = self._take_from_host_cache(cache_key, temp_path, metadata['manifest']) if cached_path else None
+                if cached_path is not None and copy_method is None:
+                    print(f"Client {self.client_id}: Obiectul din cache-ul comun pentru {app_name} nu corespunde manifestului. Se descarcă din rețea.")
+                    if cache_lock is None:
+                        cache_lock = self.host_cache.try_lock(cache_key)
+                if copy_method is not None:
+                    self.socket.sendall('CACHED'.encode('utf-8'))
+                    print(f"Client {self.client_id}: {app_name} v{server_version_from_metadata} preluat din cache-ul comun ({copy_method}), fără transfer de rețea.")
+                    target_path = self._finish_download(app_name, temp_path, server_version_from_metadata, is_update_download)
+                    operation_status.update({'status': 'staged' if is_update_download else 'success', 'path': target_path, 'cached': True})
+                    return operation_status
+
+            offset = metadata.get('offset') or 0
+            if offset and verifier:
+                # Bucățile deja primite se verifică din fișier, ca verificatorul să continue de unde a rămas.
+                self._hash_partial_file(temp_path, offset, verifier)
+            if offset:
+                print(f"Client {self.client_id}: Se reia descărcarea {app_name} (Server v{server_version_from_metadata}) de la {offset}/{file_size} bytes")
+            else:
+                print(f"Client {self.client_id}: Începe descărcarea {app_name} (Server v{server_version_from_metadata}, {file_size} bytes)")
             self.socket.settimeout(10.0)
             self.socket.sendall('READY'.encode('utf-8'))
 
             self.socket.settimeout(60.0)
-            with open(temp_path, 'wb') as f:
-                last_progress_display_time = time.time()
-
-                while bytes_received < file_size:
-                    if self.stop_event.is_set():
-                        print(f"Client {self.client_id}: Descărcare anulată din cauza opririi clientului.")
-                        raise OperationAborted("Client shutdown during download")
-
-                    try:
-                        remaining_bytes = file_size - bytes_received
-                        chunk_size_to_receive = min(8192, remaining_bytes)
-                        chunk = self.socket.recv(chunk_size_to_receive)
-                        if not chunk:
-                            if bytes_received < file_size:
-                                print(f"\nClient {self.client_id}: Eroare: Conexiunea s-a închis prematur de către server în timpul descărcării. Primit {bytes_received}/{file_size} bytes.")
-                                raise EOFError(f"Conexiune închisă prematur. Primit {bytes_received}/{file_size} bytes.")
-                            break
-
-                        f.write(chunk)
-                        bytes_received += len(chunk)
-                        bytes_received_for_error_reporting = bytes_received
-
-                        current_time = time.time()
-                        if current_time - last_progress_display_time >= 0.5 or bytes_received == file_size:
-                            progress = (bytes_received / file_size) * 100
-                            print(f"\rClient {self.client_id}: Progres descărcare: {progress:.1f}% ({bytes_received}/{file_size} bytes)      ",
-                                  end='', flush=True)
-                            last_progress_display_time = current_time
-                    except socket.timeout:
-                        print(
-                            f"\nClient {self.client_id}: Timeout (60s per chunk) la descărcarea datelor pentru {app_name}. {bytes_received_for_error_reporting}/{file_size} bytes primiți. Reîncercați descărcarea.")
-                        raise
+            transfer_started = time.time()
+            last_progress_display_time = time.time()
+
+            def show_progress(received):
+                nonlocal last_progress_display_time
+                current_time = time.time()
+                if current_time - last_progress_display_time >= 0.5 or received == file_size:
+                    progress = (received / file_size) * 100
+                    print(f"\rClient {self.client_id}: Progres descărcare: {progress:.1f}% ({received}/{file_size} bytes)      ",
+                          end='', flush=True)
+                    last_progress_display_time = current_time
+
+            receiver = self._new_receiver(temp_path, file_size, verifier, show_progress, offset)
+            try:
+                bytes_received = receiver.receive(self.socket)
+            except socket.timeout:
+                print(
+                    f"\nClient {self.client_id}: Timeout (60s per chunk) la descărcarea datelor pentru {app_name}. {receiver.received}/{file_size} bytes primiți. Reîncercați descărcarea.")
+                raise
+            except EOFError:
+                print(f"\nClient {self.client_id}: Eroare: Conexiunea s-a închis prematur de către server în timpul descărcării. Primit {receiver.received}/{file_size} bytes.")
+                raise
+            finally:
+                bytes_received_for_error_reporting = receiver.received
 
             print()
             if bytes_received != file_size:
@@ -190,6 +496,15 @@ class ApplicationClient:
                  print(error_message_incomplete)
                  raise ValueError(error_message_incomplete) # Treat as an error
 
+            if verifier:
+                bad_chunks = verifier.finish()
+                if bad_chunks:
+                    print(f"Client {self.client_id}: {len(bad_chunks)} bucăți corupte detectate în {app_name}: {bad_chunks[:10]}. Se cer doar acestea din nou...")
+                    if not self._repair_chunks(app_name, temp_path, verifier, file_size):
+                        self.socket.sendall('FAILED'.encode('utf-8'))
+                        raise ValueError(f"Bucăți corupte nereparate pentru {app_name}: {verifier.bad_chunks[:10]}")
+                self._report_verification_cost(app_name, verifier, time.time() - transfer_started)
+
             print(f"Client {self.client_id}: Verificare dimensiune fișier descărcat...")
             actual_file_size = os.path.getsize(temp_path)
             if actual_file_size != file_size:
@@ -201,31 +516,31 @@ class ApplicationClient:
             self.socket.sendall('DONE'.encode('utf-8'))
             print(f"Client {self.client_id}: Confirmare 'DONE' trimisă la server pentru {app_name}.")
 
-            if os.path.exists(app_final_path):
-                os.remove(app_final_path)
-            os.rename(temp_path, app_final_path)
-
-            self.downloaded_apps[app_name] = server_version_from_metadata # Should be under self.lock if accessed by multiple threads
-            print(f"Client {self.client_id}: Aplicația {app_name} (v{server_version_from_metadata}) descărcată și verificată: {app_final_path}.")
-
-            if os.name != 'nt':
+            if cache_key is not None:
                 try:
-                    os.chmod(app_final_path, 0o755)
-                    print(f"Client {self.client_id}: Permisiuni de execuție setate pentru {app_final_path}.")
-                except Exception as e_chmod:
-                    print(f"Client {self.client_id}: Avertisment: Nu s-au putut seta permisiunile de execuție: {e_chmod}")
+                    self.host_cache.insert(cache_key, temp_path)
+                    self.host_cache.prune()
+                except OSError as e_cache:
+                    print(f"Client {self.client_id}: Avertisment: {app_name} nu a putut fi adăugat în cache-ul comun: {e_cache}")
+            target_path = self._finish_download(app_name, temp_path, server_version_from_metadata, is_update_download)
 
             if original_socket_timeout is not None and self.socket and self.socket.fileno() != -1: self.socket.settimeout(original_socket_timeout)
-            operation_status.update({'status': 'success', 'path': app_final_path})
+            operation_status.update({'status': 'staged' if is_update_download else 'success', 'path': target_path})
             return operation_status
 
         # Consolidate exception handling for download_application
         except (socket.error, EOFError, ValueError, OperationAborted) as specific_e:
             print(f"\nClient {self.client_id}: Eroare specifică la descărcarea {app_name} ({bytes_received_for_error_reporting}/{metadata.get('size', 'N/A')} bytes): {specific_e}")
             operation_status['status'] = 'failed'
+            if self._transfer_interrupted(receiver):
+                keep_partial = self._interrupt_download(app_name, temp_path, receiver, server_version_from_metadata,
+                                                        is_update_download, version, specific_e)
         except Exception as general_e:
             print(f"\nClient {self.client_id}: Eroare generală la descărcarea {app_name} ({bytes_received_for_error_reporting}/{metadata.get('size', 'N/A')} bytes): {general_e}")
             operation_status['status'] = 'failed'
+            if self._transfer_interrupted(receiver):
+                keep_partial = self._interrupt_download(app_name, temp_path, receiver, server_version_from_metadata,
+                                                        is_update_download, version, general_e)
         finally:
             if original_socket_timeout is not None and self.socket and self.socket.fileno() != -1:
                 try:
@@ -233,7 +548,7 @@ class ApplicationClient:
                 except socket.error as e_restore_timeout:
                     print(f"Client {self.client_id}: Avertisment: nu s-a putut restaura timeout-ul socket-ului: {e_restore_timeout}")
 
-            if os.path.exists(temp_path):
+            if os.path.exists(temp_path) and not keep_partial:
                 error_occurred = 'specific_e' in locals() or 'general_e' in locals()
                 keep_temp_file = False
                 if error_occurred:
@@ -249,9 +564,238 @@ class ApplicationClient:
                     except OSError as ose:
                         print(f"Client {self.client_id}: Nu s-a putut șterge fișierul temporar {temp_path}: {ose}")
 
+            if cache_lock is not None:
+                self.host_cache.release(cache_lock)
             self.socket_lock.release()
         return operation_status
 
+    def _transfer_interrupted(self, receiver):
+        """ O eroare de orice tip (EOFError, timeout, OSError la mmap etc.) apărută în timpul recepției lasă
+        fluxul desincronizat: descărcarea se tratează ca întreruptă, nu ca eșuată definitiv. """
+        return receiver is not None and receiver.received < receiver.size and not self.stop_event.is_set()
+
+    def _interrupt_download(self, app_name, temp_path, receiver, version, is_update_download, pinned_version, error):
+        """ Transferul s-a întrerupt pe fir: păstrează partea scrisă pentru reluare și abandonează conexiunea,
+        al cărei flux nu mai e sincronizat. Returnează True dacă fișierul parțial trebuie păstrat. """
+        keep_partial = 0 < receiver.written < receiver.size
+        if keep_partial:
+            with self.lock:
+                self.interrupted_downloads[app_name] = {'temp_path': temp_path, 'version': version, 'offset': receiver.written,
+                                                        'is_update': is_update_download, 'pinned_version': pinned_version}
+            print(f"Client {self.client_id}: {receiver.written}/{receiver.size} bytes din {app_name} păstrați pentru reluare.")
+        self._connection_lost(error)
+        try:
+            self.socket.close()
+        except (OSError, AttributeError):
+            pass
+        return keep_partial
+
+    def _take_from_host_cache(self, cache_key, temp_path, manifest):
+        """ Copiază obiectul din cache lângă temp_path și îl verifică față de manifest înainte de a-l folosi.
+        Returnează metoda de copiere, sau None dacă obiectul nu corespunde (și atunci îl elimină). """
+        cached_copy = temp_path + '.cache'
+        try:
+            copy_method = self.host_cache.materialize(cache_key, cached_copy)
+            verifier = ChunkVerifier(manifest)
+            self._hash_partial_file(cached_copy, manifest['size'], verifier)
+            if verifier.finish() or os.path.getsize(cached_copy) != manifest['size']:
+                self.host_cache.discard(cache_key)
+                return None
+            os.replace(cached_copy, temp_path)
+            return copy_method
+        except (OSError, EOFError):
+            return None
+        finally:
+            if os.path.exists(cached_copy):
+                os.remove(cached_copy)
+
+    def _hash_partial_file(self, temp_path, size, verifier):
+        view = memoryview(self._recv_buffer)
+        with open(temp_path, 'rb') as f:
+            remaining = size
+            while remaining > 0:
+                read = f.readinto(view[:min(len(view), remaining)])
+                if not read:
+                    raise EOFError(f"Fișierul parțial {temp_path} are mai puțin de {size} bytes.")
+                verifier.update(view[:read])
+                remaining -= read
+
+    def _finish_download(self, app_name, temp_path, version, is_update_download):
+        if is_update_download:
+            # Versiunea veche rămâne neatinsă; înlocuirea se face în handle_staged_update.
+            staged_file_path = os.path.join(self.staging_dir, f"{app_name}.{version}")
+            os.makedirs(os.path.dirname(staged_file_path), exist_ok=True)
+            os.replace(temp_path, staged_file_path)
+            print(f"Client {self.client_id}: Aplicația {app_name} (v{version}) descărcată, verificată și pusă în scenă: {staged_file_path}.")
+            self._set_executable(staged_file_path)
+            return staged_file_path
+        return self._install_downloaded_file(app_name, temp_path, version)
+
+    def _set_executable(self, path):
+        if os.name != 'nt':
+            try:
+                os.chmod(path, 0o755)
+                print(f"Client {self.client_id}: Permisiuni de execuție setate pentru {path}.")
+            except Exception as e_chmod:
+                print(f"Client {self.client_id}: Avertisment: Nu s-au putut seta permisiunile de execuție: {e_chmod}")
+
+    def _install_downloaded_file(self, app_name, temp_path, version):
+        """ Mută fișierul descărcat și verificat în locul final și înregistrează versiunea. """
+        app_final_path = os.path.join(self.downloads_dir, app_name)
+        if os.path.exists(app_final_path):
+            os.remove(app_final_path)
+        os.rename(temp_path, app_final_path)
+        with self.lock:
+            self.downloaded_apps[app_name] = version
+        self._save_installed_versions()
+        print(f"Client {self.client_id}: Aplicația {app_name} (v{version}) descărcată și verificată: {app_final_path}.")
+        self._set_executable(app_final_path)
+        return app_final_path
+
+    def download_bundle(self, app_names=None, outdated=False):
+        """ Descarcă mai multe aplicații într-un singur răspuns al serverului, fără câte un schimb READY/DONE per aplicație.
+
+        Cu outdated=True serverul alege singur aplicațiile instalate care au versiuni mai noi.
+        Returnează {nume: {'status', 'version', 'path'}}.
+        """
+        request = {'command': 'download_bundle'}
+        if outdated:
+            with self.lock:
+                request.update({'outdated': True, 'installed': dict(self.downloaded_apps)})
+        else:
+            request['apps'] = list(app_names or [])
+        if not self.subscribe_updates:
+            request['subscribe'] = False
+        results = {}
+
+        self.socket_lock.acquire()
+        original_socket_timeout = None
+        try:
+            if not self.socket or (hasattr(self.socket, '_closed') and self.socket._closed) or self.socket.fileno() == -1:
+                print(f"Client {self.client_id}: Eroare pachet: Socket-ul nu este conectat sau este închis.")
+                return results
+
+            original_socket_timeout = self.socket.gettimeout()
+            self.socket.sendall(json.dumps(request).encode('utf-8'))
+            bundle_header = self.receive_json()
+            if not bundle_header or bundle_header.get('status') != 'success':
+                error_msg = bundle_header.get('message') if bundle_header else "Răspuns invalid pentru pachet."
+                print(f"Client {self.client_id}: Eroare la cererea pachetului: {error_msg}")
+                return results
+            for missing_name in bundle_header.get('missing', []):
+                print(f"Client {self.client_id}: Aplicația {missing_name} nu există pe server; omisă din pachet.")
+                results[missing_name] = {'status': 'failed', 'version': None, 'path': None}
+            if not bundle_header.get('count'):
+                print(f"Client {self.client_id}: Nicio aplicație de descărcat în pachet.")
+                return results
+
+            print(f"Client {self.client_id}: Începe descărcarea pachetului: {bundle_header['count']} aplicații, {bundle_header['total_size']} bytes.")
+            self.socket.settimeout(60.0)
+            self.socket.sendall('READY'.encode('utf-8'))
+
+            received = []
+            while True:
+                (header_length,) = struct.unpack('!I', self._recv_exact(4))
+                if header_length == 0:
+                    break
+                entry = json.loads(self._recv_exact(header_length).decode('utf-8'))
+                entry_result = self._receive_bundle_entry(entry)
+                results[entry['app_name']] = entry_result
+                if entry_result['status'] == 'success':
+                    received.append({'app_name': entry['app_name'], 'version': entry_result['version']})
+
+            self.socket.sendall(json.dumps({'command': 'bundle_ack', 'received': received}).encode('utf-8'))
+            ack_response = self.receive_json()
+            if not ack_response or ack_response.get('status') != 'success':
+                print(f"Client {self.client_id}: Serverul a respins confirmarea pachetului: {ack_response.get('message') if ack_response else 'răspuns gol'}")
+            print(f"Client {self.client_id}: Pachet descărcat: {len(received)}/{bundle_header['count']} aplicații instalate.")
+            return results
+        except (socket.error, EOFError, ValueError, OperationAborted) as e:
+            print(f"\nClient {self.client_id}: Eroare la descărcarea pachetului: {e}")
+            # Fluxul pachetului s-a oprit la mijloc și nu mai e sincronizat: conexiunea se abandonează,
+            # iar reconectarea reia sesiunea (ca la download_application întrerupt).
+            if not self.stop_event.is_set():
+                self._connection_lost(e)
+            try:
+                self.socket.close()
+            except (OSError, AttributeError):
+                pass
+            return results
+        finally:
+            if original_socket_timeout is not None and self.socket and self.socket.fileno() != -1:
+                try:
+                    self.socket.settimeout(original_socket_timeout)
+                except socket.error:
+                    pass
+            self.socket_lock.release()
+
+    def _receive_bundle_entry(self, entry):
+        app_name = entry['app_name']
+        entry_size = entry['size']
+        if entry.get('error'):
+            print(f"Client {self.client_id}: Serverul nu a putut trimite {app_name}: {entry['error']}")
+            return {'status': 'failed', 'version': None, 'path': None}
+
+        temp_path = os.path.join(self.downloads_dir, f"{app_name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+        verifier = ChunkVerifier(entry['manifest']) if entry.get('manifest') else None
+        try:
+            self._new_receiver(temp_path, entry_size, verifier).receive(self.socket)
+
+            if verifier and (not verifier.root_ok or verifier.finish()):
+                # Restul pachetului continuă; aplicația coruptă poate fi descărcată individual (cu reparare pe bucăți).
+                print(f"Client {self.client_id}: {app_name} din pachet nu a trecut verificarea Merkle (bucăți {verifier.bad_chunks[:10]}). Se omite.")
+                os.remove(temp_path)
+                return {'status': 'failed', 'version': entry['version'], 'path': None}
+
+            app_final_path = self._install_downloaded_file(app_name, temp_path, entry['version'])
+            return {'status': 'success', 'version': entry['version'], 'path': app_final_path}
+        finally:
+            # După instalare fișierul temporar nu mai există; orice altceva (EOF, eroare, oprire) îl lasă în urmă.
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _check_download_stop(self):
+        if self.stop_event.is_set():
+            print(f"Client {self.client_id}: Descărcare anulată din cauza opririi clientului.")
+            raise OperationAborted("Client shutdown during download")
+
+    def _new_receiver(self, temp_path, size, verifier, on_progress=None, offset=0):
+        return FileReceiver(temp_path, size, verifier=verifier, fsync_policy=self.fsync_policy, mode=self.receive_mode,
+                            buffer=self._recv_buffer, check_stop=self._check_download_stop, on_progress=on_progress, offset=offset)
+
+    def _recv_exact(self, size):
+        buffer = bytearray()
+        while len(buffer) < size:
+            chunk = self.socket.recv(min(65536, size - len(buffer)))
+            if not chunk:
+                raise EOFError(f"Conexiune închisă prematur. Primit {len(buffer)}/{size} bytes.")
+            buffer += chunk
+        return bytes(buffer)
+
+    def _repair_chunks(self, app_name, temp_path, verifier, file_size):
+        """ Cere retransmiterea doar a bucăților invalide și le rescrie la poziția lor în fișierul temporar. """
+        for repair_round in range(1, MAX_REPAIR_ROUNDS + 1):
+            if not verifier.bad_chunks:
+                break
+            requested_chunks = verifier.bad_chunks[:MAX_CHUNKS_PER_REPAIR]
+            print(f"Client {self.client_id}: (Reparare {repair_round}/{MAX_REPAIR_ROUNDS}) Se cer {len(requested_chunks)} bucăți pentru {app_name}.")
+            self.socket.sendall(json.dumps({'command': 'resend_chunks', 'chunks': requested_chunks}).encode('utf-8'))
+            with open(temp_path, 'r+b') as f:
+                for index in requested_chunks:
+                    data = self._recv_exact(chunk_length(index, file_size, verifier.chunk_size))
+                    if verifier.verify_chunk(index, data):
+                        f.seek(index * verifier.chunk_size)
+                        f.write(data)
+        return not verifier.bad_chunks
+
+    def _report_verification_cost(self, app_name, verifier, transfer_seconds):
+        share = (verifier.hash_seconds / transfer_seconds * 100) if transfer_seconds > 0 else 0.0
+        print(f"Client {self.client_id}: Verificare Merkle {app_name}: {verifier.hash_seconds * 1000:.1f} ms hashing "
+              f"({verifier.throughput_mb_s():.0f} MB/s), {share:.1f}% din timpul transferului.")
+        if share > 50:
+            print(f"Client {self.client_id}: Avertisment: hashing-ul ocupă peste jumătate din timpul transferului; verificarea poate deveni gâtul de sticlă.")
+
     def run_application(self, app_name):
         app_path_relative = os.path.join(self.downloads_dir, app_name)
         app_path_absolute = os.path.abspath(app_path_relative)
@@ -295,6 +839,7 @@ class ApplicationClient:
             if current_process:
                 with self.lock:
                     self.running_apps[app_name] = current_process
+                self.supervisor.add(app_name, current_process)
                 print(f"Client {self.client_id}: Aplicația '{app_name}' a fost pornită (PID: {current_process.pid}).")
 
         except FileNotFoundError:
@@ -316,54 +861,45 @@ class ApplicationClient:
         except Exception as e:
             print(f"Client {self.client_id}: Eroare necunoscută la rularea aplicației '{app_name}': {e}")
 
+    def _on_app_exit(self, app_name, process):
+        with self.lock:
+            if self.running_apps.get(app_name) is process:
+                del self.running_apps[app_name]
+        print(f"Client {self.client_id}: Procesul pentru {app_name} (PID: {process.pid}) s-a încheiat (cod: {process.returncode}). Eliminat din lista aplicațiilor active.")
+
     def is_app_running(self, app_name):
         """Verifică dacă o aplicație (pornită cu Popen) rulează."""
-        with self.lock:
-            process = self.running_apps.get(app_name)
-            if process:
-                if process.poll() is None:
-                    return True
-                else:
-                    del self.running_apps[app_name]
-                    print(f"Client {self.client_id}: Procesul pentru {app_name} (PID: {process.pid}) s-a încheiat (cod: {process.returncode}). Eliminat din lista aplicațiilor active.")
-                    return False
-        return False
+        return self.supervisor.is_running(app_name)
 
-    def terminate_app(self, app_name):
+    def list_running_apps(self):
+        running = self.supervisor.running()
+        if not running:
+            print("Nicio aplicație pornită local nu rulează.")
+            return
+        print("\nAplicații pornite local:")
+        for app_name, process in running.items():
+            print(f"  - {app_name} (PID: {process.pid})")
+
+    def terminate_app(self, app_name, grace_period=5.0):
         """ Oprește o aplicație care rulează (doar cele pornite cu Popen). """
         if sys.platform == "win32" and not self.running_apps.get(app_name):
              print(f"Client {self.client_id}: (terminate_app) Pe Windows, aplicațiile pornite cu startfile nu pot fi oprite programatic de client în acest mod.")
              return False
 
-
-        if self.is_app_running(app_name):
-            with self.lock:
-                process = self.running_apps.get(app_name)
-                if process:
-                    try:
-                        print(f"Client {self.client_id}: Se încearcă oprirea aplicației {app_name} (PID: {process.pid})...")
-                        process.terminate()
-                        try:
-                            process.wait(timeout=5)
-                            print(f"Client {self.client_id}: Aplicația {app_name} (PID: {process.pid}) a fost oprită (terminate).")
-                        except subprocess.TimeoutExpired:
-                            print(f"Client {self.client_id}: Aplicația {app_name} (PID: {process.pid}) nu s-a oprit în 5 secunde după terminate. Se forțează (kill)...")
-                            process.kill()
-                            process.wait(timeout=5) # Wait for kill
-                            print(f"Client {self.client_id}: Aplicația {app_name} (PID: {process.pid}) a fost forțată să se oprească (kill).")
-
-                        if app_name in self.running_apps:
-                            del self.running_apps[app_name]
-                        return True
-                    except Exception as e:
-                        print(f"Client {self.client_id}: Eroare la oprirea aplicației {app_name}: {e}")
-                        return False
-                else:
-                    print(f"Client {self.client_id}: (terminate_app) Aplicația {app_name} s-a încheiat înainte de a putea fi oprită explicit.")
-                    return True
-        else:
+        process = self.supervisor.get(app_name)
+        if process is None:
             print(f"Client {self.client_id}: (terminate_app) Aplicația {app_name} nu rulează sau nu este gestionată (nu a fost pornită cu Popen).")
             return False
+        try:
+            print(f"Client {self.client_id}: Se încearcă oprirea aplicației {app_name} (PID: {process.pid})...")
+            if self.supervisor.terminate(app_name, grace_period=grace_period):
+                print(f"Client {self.client_id}: Aplicația {app_name} (PID: {process.pid}) a fost oprită.")
+                return True
+            print(f"Client {self.client_id}: Aplicația {app_name} (PID: {process.pid}) nu s-a oprit nici după kill.")
+            return False
+        except Exception as e:
+            print(f"Client {self.client_id}: Eroare la oprirea aplicației {app_name}: {e}")
+            return False
 
     def update_application(self, app_name, notification_data):
         new_server_version = notification_data['version']
@@ -379,7 +915,9 @@ class ApplicationClient:
             print("2. Descarcă o aplicație")
             print("3. Rulează o aplicație descărcată")
             print("4. Listează aplicațiile pornite local (monitorizate)")
-            print("5. Ieșire")
+            print("5. Descarcă mai multe aplicații într-un singur pachet")
+            print("6. Caută aplicații (prefix, etichetă, platformă)")
+            print("7. Ieșire")
             print(f"Client {self.client_id}: Procesul de actualizare pentru {app_name} s-a încheiat. Introduceți o comandă:")
             return
 
@@ -399,25 +937,25 @@ class ApplicationClient:
 
         print(f"Client {self.client_id}: Procesul de actualizare pentru {app_name} s-a încheiat. Introduceți o comandă:")
 
-    def handle_staged_update(self, app_name, staged_file_path, new_version_timestamp):
+    def handle_staged_update(self, app_name, staged_file_path, new_version_timestamp, trace_id=None):
         print(f"Client {self.client_id}: Gestionare actualizare în scenă pentru {app_name} (noua versiune: {new_version_timestamp}). Fișier în scenă: {staged_file_path}")
         final_app_path = os.path.join(self.downloads_dir, app_name)
         max_retries = 10
-        retry_delay = 5
+        retry_delay = 0.1
+        restart_after_swap = self.is_app_running(app_name)
 
         for attempt in range(max_retries):
             if self.stop_event.is_set():
                 print(f"Client {self.client_id}: (handle_staged_update) Oprire solicitată, se anulează încercările de actualizare pentru {app_name}.")
                 return
 
-            app_was_running = self.is_app_running(app_name) # Check before trying to terminate
-            if app_was_running:
+            if self.is_app_running(app_name):
                 print(f"Client {self.client_id}: (Attempt {attempt + 1}/{max_retries}) Aplicația {app_name} rulează. Se încearcă oprirea...")
-                self.terminate_app(app_name)
-                time.sleep(1)
-                if self.is_app_running(app_name):
-                    print(f"Client {self.client_id}: (Attempt {attempt + 1}/{max_retries}) Nu s-a putut opri {app_name}. Se reîncearcă în {retry_delay}s...")
-                    time.sleep(retry_delay)
+                # terminate_app revine imediat ce supervizorul vede procesul încheiat; înlocuirea urmează fără pauză.
+                if not self.terminate_app(app_name):
+                    print(f"Client {self.client_id}: (Attempt {attempt + 1}/{max_retries}) Nu s-a putut opri {app_name}. Se reîncearcă în {retry_delay:.1f}s...")
+                    self.stop_event.wait(retry_delay)
+                    retry_delay = min(retry_delay * 2, 5)
                     continue
             try:
                 print(f"Client {self.client_id}: (Attempt {attempt + 1}/{max_retries}) Se încearcă înlocuirea {final_app_path} cu {staged_file_path}...")
@@ -428,19 +966,17 @@ class ApplicationClient:
                 os.replace(staged_file_path, final_app_path)
                 with self.lock:
                     self.downloaded_apps[app_name] = new_version_timestamp
+                self._save_installed_versions()
                 print(f"Client {self.client_id}: Actualizare reușită pentru {app_name} la versiunea {new_version_timestamp} folosind fișierul din scenă.")
                 print(f"  Fișierul {staged_file_path} a fost mutat în {final_app_path}.")
-                self.socket_lock.acquire()
-                try:
-                    if self.socket and self.socket.fileno() != -1:
-                        print(f"Client {self.client_id}: Se trimite \'DONE\' la server pentru actualizarea {app_name} (v{new_version_timestamp}).")
-                        self.socket.sendall('DONE'.encode('utf-8'))
-                    else:
-                        print(f"Client {self.client_id}: (handle_staged_update) Socket închis, nu se poate trimite 'DONE'.")
-                except Exception as e_send_done:
-                    print(f"Client {self.client_id}: Eroare la trimiterea \'DONE\' după actualizarea din scenă: {e_send_done}")
-                finally:
-                    self.socket_lock.release()
+                self._report_trace_event(trace_id, 'swapped')
+                # Confirmarea 'DONE' a fost deja trimisă la descărcare; aici doar se repornește aplicația.
+                if restart_after_swap:
+                    print(f"Client {self.client_id}: Se repornește {app_name} cu noua versiune...")
+                    self.run_application(app_name)
+                    if self.is_app_running(app_name):
+                        self._report_trace_event(trace_id, 'restarted')
+                self._report_trace_event(trace_id, 'completed')
                 return
 
             except PermissionError as pe:
@@ -448,64 +984,85 @@ class ApplicationClient:
             except Exception as e:
                 print(f"Client {self.client_id}: (Attempt {attempt + 1}/{max_retries}) Eroare la înlocuirea {app_name}: {e}")
 
-            print(f"Client {self.client_id}: (Attempt {attempt + 1}/{max_retries}) Reîncercare în {retry_delay} secunde...")
-            time.sleep(retry_delay)
+            print(f"Client {self.client_id}: (Attempt {attempt + 1}/{max_retries}) Reîncercare în {retry_delay:.1f} secunde...")
+            self.stop_event.wait(retry_delay)
+            retry_delay = min(retry_delay * 2, 5)
 
         print(f"Client {self.client_id}: Eșec la actualizarea {app_name} după {max_retries} încercări.")
         print(f"  Fișierul actualizat este încă la: {staged_file_path}")
         print(f"  Puteți încerca să închideți manual aplicația '{app_name}' și apoi să mutați '{staged_file_path}' în '{final_app_path}'.")
 
-    def handle_forced_app_update(self, app_name, new_version_server, app_size_server):
+    def handle_forced_app_update(self, app_name, new_version_server, app_size_server, trace_id=None):
+        received_at = time.monotonic()
         print(f"Client {self.client_id}: Primită notificare de actualizare FORȚATĂ pentru {app_name} la versiunea server {new_version_server}.")
-        local_app_path = os.path.join(self.downloads_dir, app_name)
-
-        if self.is_app_running(app_name):
-            print(f"Client {self.client_id}: (ForcedUpdate) Aplicația {app_name} rulează. Se încearcă oprirea...")
-            terminated_successfully = self.terminate_app(app_name)
-            if terminated_successfully:
-                print(f"Client {self.client_id}: (ForcedUpdate) Aplicația {app_name} a fost oprită.")
-                time.sleep(0.5) # Scurtă pauză pentru eliberarea resurselor
-            else:
-                print(f"Client {self.client_id}: (ForcedUpdate) AVERTISMENT: Nu s-a putut opri {app_name}. Ștergerea și actualizarea ar putea eșua.")
-        
-        deleted_local_copy = False
-        if os.path.exists(local_app_path):
-            print(f"Client {self.client_id}: (ForcedUpdate) Se șterge versiunea locală a {app_name} de la {local_app_path}...")
-            try:
-                os.remove(local_app_path)
-                print(f"Client {self.client_id}: (ForcedUpdate) Versiunea locală a {app_name} a fost ștearsă.")
-                deleted_local_copy = True
-                with self.lock: # Remove from downloaded_apps as it's now deleted
-                    if app_name in self.downloaded_apps:
-                        del self.downloaded_apps[app_name]
-            except PermissionError as pe:
-                 print(f"Client {self.client_id}: (ForcedUpdate) Eroare de PERMISIUNE la ștergerea {local_app_path}: {pe}. Fișierul ar putea fi încă blocat.")
-            except Exception as e:
-                print(f"Client {self.client_id}: (ForcedUpdate) Eroare la ștergerea {local_app_path}: {e}")
-        else:
-            print(f"Client {self.client_id}: (ForcedUpdate) Versiunea locală a {app_name} nu există la {local_app_path}. Se continuă cu descărcarea.")
-            deleted_local_copy = True
-
-        if not deleted_local_copy:
-            print(f"Client {self.client_id}: (ForcedUpdate) EȘEC la ștergerea versiunii locale a {app_name}. Actualizarea forțată nu poate continua în siguranță.")
-            print(f"  Vă rugăm închideți manual aplicația și ștergeți '{local_app_path}', apoi reporniți clientul sau încercați o descărcare manuală.")
+        if self.update_filter is not None and not self.update_filter(app_name, new_version_server):
+            print(f"Client {self.client_id}: (ForcedUpdate) {app_name} v{new_version_server} ignorată (fixată la altă versiune sau negestionată).")
             return
+        with self.lock:
+            pending_version = self.pending_updates.get(app_name)
+            if pending_version is not None and pending_version >= new_version_server:
+                print(f"Client {self.client_id}: (ForcedUpdate) O actualizare pentru {app_name} (v{pending_version}) este deja în curs de pregătire.")
+                return
+            self.pending_updates[app_name] = new_version_server
 
-        print(f"Client {self.client_id}: (ForcedUpdate) Se încearcă descărcarea noii versiuni ({new_version_server}) pentru {app_name}.")
-        download_result = self.download_application(app_name)
-
-        if download_result and download_result.get('status') == 'success':
-            new_local_version = download_result.get('version')
-            new_local_path = download_result.get('path')
-            print(f"Client {self.client_id}: (ForcedUpdate) {app_name} actualizat cu succes la versiunea {new_local_version} ({new_local_path}).")
-        elif download_result and download_result.get('status') == 'staged':
-            staged_path = download_result.get('path')
-            staged_version = download_result.get('version')
-            print(f"Client {self.client_id}: (ForcedUpdate) Descărcarea pentru {app_name} a rezultat într-un fișier în scenă la {staged_path} (v{staged_version}).")
-            print(f"  Se va încerca gestionarea actualizării din scenă...")
-            self.handle_staged_update(app_name, staged_path, staged_version)
-        else:
-            print(f"Client {self.client_id}: (ForcedUpdate) EȘEC la descărcarea noii versiuni pentru {app_name}.")
+        # Descărcarea rulează în fundal, cât timp versiunea veche continuă să ruleze;
+        # thread-ul de notificări eliberează socket-ul imediat pentru transfer.
+        prefetch_thread = threading.Thread(target=self._prefetch_and_stage_update,
+                                           args=(app_name, new_version_server, app_size_server, trace_id, received_at),
+                                           name=f"UpdatePrefetch-{app_name}")
+        prefetch_thread.daemon = True
+        prefetch_thread.start()
+
+    def _prefetch_and_stage_update(self, app_name, new_version_server, app_size_server, trace_id=None, received_at=None):
+        try:
+            self._report_trace_event(trace_id, 'received', received_at)
+            print(f"Client {self.client_id}: (ForcedUpdate) Se descarcă în fundal {app_name} v{new_version_server} ({app_size_server} bytes) în zona de scenă...")
+            download_result = self._download_at_low_priority(app_name, is_update_download=True, new_version_for_staging=new_version_server, trace_id=trace_id)
+
+            if download_result and download_result.get('status') == 'staged':
+                staged_path = download_result.get('path')
+                staged_version = download_result.get('version')
+                print(f"Client {self.client_id}: (ForcedUpdate) {app_name} v{staged_version} verificat în scenă la {staged_path}. Se aplică actualizarea...")
+                self._report_trace_event(trace_id, 'staged')
+                self.handle_staged_update(app_name, staged_path, staged_version, trace_id=trace_id)
+            else:
+                print(f"Client {self.client_id}: (ForcedUpdate) EȘEC la descărcarea noii versiuni pentru {app_name}. Versiunea locală rămâne neschimbată.")
+        finally:
+            with self.lock:
+                if self.pending_updates.get(app_name) == new_version_server:
+                    del self.pending_updates[app_name]
+
+    def _download_at_low_priority(self, app_name, **kwargs):
+        """ Rulează descărcarea într-un thread separat cu prioritate scăzută. Nice-ul nu mai poate fi readus la 0
+        fără privilegii și e moștenit de thread-urile și procesele create ulterior, așa că thread-ul apelant
+        (care face schimbul și repornirea aplicației) rămâne la prioritatea normală. """
+        result = {}
+
+        def download():
+            _lower_current_thread_priority()
+            result['download'] = self.download_application(app_name, **kwargs)
+
+        worker = threading.Thread(target=download, name=f"prefetch-{app_name}", daemon=True)
+        worker.start()
+        worker.join()
+        return result.get('download')
+
+    def _report_trace_event(self, trace_id, stage, happened_at=None):
+        """ Raportează serverului o etapă a propagării; se trimite vârsta evenimentului, nu ceasul local. """
+        if not trace_id:
+            return
+        age = time.monotonic() - happened_at if happened_at is not None else 0.0
+        with self.socket_lock:
+            try:
+                if not self.socket or self.socket.fileno() == -1:
+                    return
+                self.socket.sendall(json.dumps({'command': 'trace_event', 'trace_id': trace_id, 'stage': stage, 'age': age,
+                                              'client_id': self.client_id}).encode('utf-8'))
+                response = self.receive_json()
+                if response and response.get('status') == 'error':
+                    print(f"Client {self.client_id}: Etapa '{stage}' nu a fost înregistrată de server: {response.get('message')}")
+            except (socket.error, OSError) as e_trace:
+                print(f"Client {self.client_id}: Eroare la raportarea etapei '{stage}': {e_trace}")
 
     def listen_for_notifications(self):
 
@@ -520,9 +1077,9 @@ class ApplicationClient:
 
             try:
                 if not self.socket or self.socket.fileno() == -1:
-                    if not self.stop_event.is_set():
-                        print(f"Client {self.client_id} (Notificări): Socket invalid sau închis. Thread-ul de notificări se oprește.")
-                    self.stop_event.set()
+                    if self.reconnect_pending or self.stop_event.is_set() or self._connection_lost("socket închis"):
+                        break
+                    print(f"Client {self.client_id} (Notificări): Socket invalid sau închis. Thread-ul de notificări se oprește.")
                     break
 
                 self.socket.settimeout(1.0)
@@ -530,9 +1087,9 @@ class ApplicationClient:
                 chunk = self.socket.recv(4096)
 
                 if not chunk:
-                    if not self.stop_event.is_set():
-                        print(f"Client {self.client_id} (Notificări): Serverul a închis conexiunea. Thread-ul de notificări se oprește.")
-                    self.stop_event.set()
+                    if self.reconnect_pending or self.stop_event.is_set() or self._connection_lost("serverul a închis conexiunea"):
+                        break
+                    print(f"Client {self.client_id} (Notificări): Serverul a închis conexiunea. Thread-ul de notificări se oprește.")
                     break
                 
                 temp_buffer += chunk
@@ -551,13 +1108,16 @@ class ApplicationClient:
 
                         msg_type = message.get('type')
                         app_name_notif = message.get('app_name')
+                        self._note_generation(message.get('generation'))
 
                         if msg_type == 'app_update':
                             print(f"Client {self.client_id}: Notificare de actualizare primită pentru {app_name_notif} (Versiune server: {message.get('version')}).")
                             self.update_application(app_name_notif, message)
                         elif msg_type == 'force_delete_then_redownload':
                             print(f"Client {self.client_id}: Notificare de ACTUALIZARE FORȚATĂ primită pentru {app_name_notif} (Versiune server: {message.get('version')}).")
-                            self.handle_forced_app_update(app_name_notif, message.get('version'), message.get('size'))
+                            self.handle_forced_app_update(app_name_notif, message.get('version'), message.get('size'), message.get('trace_id'))
+                        elif msg_type == 'server_shutdown':
+                            self._on_server_shutdown(message)
                         else:
                             print(f"Client {self.client_id}: Tip de notificare necunoscut: {msg_type}")
 
@@ -587,9 +1147,9 @@ class ApplicationClient:
                     self.stop_event.set()
                     break
             except socket.error as se:
-                if not self.stop_event.is_set():
-                    print(f"\nClient {self.client_id} (Notificări): Eroare socket: {se}. Thread-ul se oprește.")
-                self.stop_event.set()
+                if self.reconnect_pending or self.stop_event.is_set() or self._connection_lost(se):
+                    break
+                print(f"\nClient {self.client_id} (Notificări): Eroare socket: {se}. Thread-ul se oprește.")
                 break
             except Exception as e:
                 if not self.stop_event.is_set():
@@ -601,9 +1161,114 @@ class ApplicationClient:
             finally:
                 if acquired_lock_for_notif:
                     self.socket_lock.release()
+            # Cedează procesorul ca alte thread-uri (meniu, descărcări în fundal) să poată prelua socket-ul.
+            time.sleep(0.01)
         
         print(f"Client {self.client_id}: Thread-ul de notificări s-a oprit.")
 
+    def _note_generation(self, generation):
+        if isinstance(generation, int) and (self.last_generation is None or generation > self.last_generation):
+            self.last_generation = generation
+
+    def _connection_lost(self, reason):
+        """ Conexiunea a căzut fără să fi cerut noi oprirea: se programează reconectarea, dacă e permisă.
+        Returnează True dacă se va reconecta; altfel clientul se oprește, ca înainte. """
+        if self.stop_event.is_set() or not self.auto_reconnect:
+            self.stop_event.set()
+            return False
+        return self._schedule_reconnect(f"Conexiunea cu serverul s-a pierdut ({reason})")
+
+    def _on_server_shutdown(self, message):
+        """ Serverul se oprește controlat: conexiunea curentă se abandonează și se reia după retry_after,
+        plus un decalaj aleator în fereastra retry_jitter anunțată de server (ca să nu revină toți odată). """
+        retry_after = max(0.5, float(message.get('retry_after') or 5.0))
+        retry_jitter = max(0.0, float(message.get('retry_jitter') or 0.0))
+        self._schedule_reconnect(f"Serverul se oprește ({message.get('message')})", retry_after + random.uniform(0.0, retry_jitter))
+
+    def _schedule_reconnect(self, reason, first_delay=None):
+        with self.lock:
+            if self.reconnect_pending:
+                return True
+            self.reconnect_pending = True
+        if first_delay is None:
+            first_delay = random.uniform(0.0, RECONNECT_BASE_DELAY)
+        print(f"\nClient {self.client_id}: {reason}. Reconectare în {first_delay:.1f}s.")
+        self.reconnect_thread = threading.Thread(target=self._reconnect_loop, args=(first_delay,), name=f"Reconnect-{self.client_id}")
+        self.reconnect_thread.daemon = True
+        self.reconnect_thread.start()
+        return True
+
+    def _reconnect_loop(self, first_delay):
+        """ Reîncearcă până reușește sau până la close_connection(). Între încercări se așteaptă un timp
+        aleator în [0, min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * 2^încercare)] (backoff cu jitter complet). """
+        delay = first_delay
+        attempt = 0
+        while not self.stop_event.wait(delay):
+            attempt += 1
+            old_listener = self.notification_thread
+            if old_listener and old_listener.is_alive() and old_listener is not threading.current_thread():
+                old_listener.join(timeout=5)
+            with self.socket_lock:
+                if self.socket:
+                    try: self.socket.close()
+                    except OSError: pass
+                try:
+                    self.connect(listen=False)
+                except OSError as e_connect:
+                    delay = random.uniform(0.0, min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * 2 ** attempt))
+                    print(f"Client {self.client_id}: Reconectarea {attempt} a eșuat: {e_connect}. Următoarea încercare în {delay:.1f}s.")
+                    continue
+            with self.lock:
+                self.reconnect_pending = False
+            print(f"Client {self.client_id}: Reconectat la server după {attempt} încercări.")
+            self._resume_session()
+            self._start_listener()
+            self._resume_interrupted_downloads()
+            return
+
+    def _resume_session(self):
+        """ Redeclară versiunile instalate și tratează notificările pierdute cât timp conexiunea a lipsit. """
+        with self.lock:
+            versions_snapshot = dict(self.downloaded_apps)
+        request = {'command': 'resume_session', 'versions': versions_snapshot, 'last_generation': self.last_generation,
+                   'client_id': self.client_id}
+        with self.socket_lock:
+            try:
+                self.socket.sendall(json.dumps(request).encode('utf-8'))
+                response = self.receive_json()
+            except (socket.error, OSError) as se:
+                print(f"Client {self.client_id}: Eroare socket la resume_session: {se}")
+                return
+        if not response or response.get('status') != 'success':
+            print(f"Client {self.client_id}: Serverul nu a reluat sesiunea ({response.get('message') if response else 'răspuns gol'}). Se redeclară doar versiunile.")
+            self.announce_versions()
+            return
+        self._note_generation(response.get('generation'))
+        missed = response.get('missed') or []
+        missed_names = {message['app_name'] for message in missed}
+        with self.lock:
+            # Actualizările întrerupte care nu mai sunt necesare își pierd fișierul parțial.
+            stale = [name for name, record in self.interrupted_downloads.items() if record['is_update'] and name not in missed_names]
+            stale_records = [self.interrupted_downloads.pop(name) for name in stale]
+        for record in stale_records:
+            if os.path.exists(record['temp_path']):
+                os.remove(record['temp_path'])
+        if missed:
+            print(f"Client {self.client_id}: {len(missed)} actualizări pierdute cât timp conexiunea a lipsit: {sorted(missed_names)}.")
+        for message in missed:
+            self.handle_forced_app_update(message['app_name'], message['version'], message.get('size'), message.get('trace_id'))
+
+    def _resume_interrupted_downloads(self):
+        """ Reia în fundal descărcările cerute explicit care au fost întrerupte (actualizările vin prin resume_session). """
+        with self.lock:
+            pending = [(name, record.get('pinned_version')) for name, record in self.interrupted_downloads.items() if not record['is_update']]
+        for app_name, pinned_version in pending:
+            print(f"Client {self.client_id}: Se reia descărcarea întreruptă pentru {app_name}...")
+            resume_thread = threading.Thread(target=self.download_application, args=(app_name,), kwargs={'version': pinned_version},
+                                             name=f"ResumeDownload-{app_name}")
+            resume_thread.daemon = True
+            resume_thread.start()
+
     def close_connection(self):
         print("Se închide conexiunea...")
         self.stop_event.set()
@@ -641,16 +1306,252 @@ class ApplicationClient:
         finally:
             if lock_acquired_for_close:
                 self.socket_lock.release()
-            elif self.socket_lock.locked() and threading.current_thread() != self.notification_thread:
-                 pass
+            self.supervisor.close()
 
 
 class OperationAborted(Exception):
     pass
 
 
-def main():
-    client = ApplicationClient()
+def _lower_current_thread_priority(niceness=10):
+    """ Scade prioritatea thread-ului curent (doar Linux, unde nice se aplică per thread). """
+    if not sys.platform.startswith("linux"):
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), niceness)
+    except (AttributeError, OSError) as e:
+        print(f"Avertisment: Nu s-a putut scădea prioritatea thread-ului de fundal: {e}")
+
+
+EXIT_SYNCED = 0
+EXIT_SYNC_FAILED = 1
+EXIT_UNAVAILABLE = 2
+
+
+def load_desired_state(manifest_path):
+    """ Starea dorită: {"apps": {"nume": "latest" | versiune fixată}} sau {"apps": ["nume", ...]} (toate "latest"). """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    apps = manifest.get('apps') if isinstance(manifest, dict) else manifest
+    if isinstance(apps, list):
+        apps = {name: 'latest' for name in apps}
+    if not isinstance(apps, dict):
+        raise ValueError("Manifestul trebuie să conțină 'apps' ca listă sau dicționar.")
+    for app_name, pin in apps.items():
+        if pin != 'latest' and (isinstance(pin, bool) or not isinstance(pin, (int, float))):
+            raise ValueError(f"Versiune invalidă pentru {app_name}: {pin!r} (se acceptă 'latest' sau o versiune numerică).")
+    return apps
+
+
+class FleetSync:
+    """ Mod fără interfață: aduce downloads/ la starea descrisă de manifest.
+
+    Descărcările rulează în paralel, câte una pe conexiune, pe cel mult `concurrency`
+    conexiuni de lucru, păstrate (împreună cu pool-ul de thread-uri) pe toată durata rulării.
+    Doar conexiunea principală primește notificările: aplicațiile pe 'latest' se actualizează
+    imediat, cele fixate pe o versiune sunt lăsate neschimbate.
+    """
+
+    def __init__(self, client, manifest_path, concurrency=4, prune=False):
+        self.client = client
+        self.manifest_path = manifest_path
+        self.concurrency = max(1, concurrency)
+        self.prune = prune
+        self.desired = {}
+        self.stop_requested = threading.Event()
+        self._workers = threading.local()
+        self._worker_clients = []
+        self._workers_lock = threading.Lock()
+        self._pool = None
+        client.update_filter = self._accept_update
+
+    def _accept_update(self, app_name, version):
+        return self.desired.get(app_name) == 'latest'
+
+    def _worker_client(self):
+        worker = getattr(self._workers, 'client', None)
+        if worker is None or not worker.socket or worker.socket.fileno() == -1:
+            host_cache = self.client.host_cache
+            previous_worker = worker
+            worker = ApplicationClient(self.client.host, self.client.port, persist_versions=False,
+                                       use_host_cache=host_cache is not None, host_cache_dir=host_cache.root if host_cache else None,
+                                       fsync_policy=self.client.fsync_policy, receive_mode=self.client.receive_mode, auto_reconnect=False,
+                                       client_id=self.client.client_id)
+            worker.subscribe_updates = False
+            if previous_worker is not None:
+                # Conexiunea workerului a căzut: cel nou reia descărcările întrerupte ale celui vechi.
+                worker.interrupted_downloads = previous_worker.interrupted_downloads
+                previous_worker.close_connection()
+                with self._workers_lock:
+                    self._worker_clients.remove(previous_worker)
+            worker.connect(listen=False)
+            self._workers.client = worker
+            with self._workers_lock:
+                self._worker_clients.append(worker)
+        return worker
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="SyncWorker")
+        return self._pool
+
+    def close(self):
+        """ Oprește pool-ul de descărcare și închide conexiunile de lucru. """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        with self._workers_lock:
+            workers, self._worker_clients = self._worker_clients, []
+        for worker in workers:
+            worker.close_connection()
+
+    def _server_versions(self):
+        """ list_apps pe conexiunea principală. Spre deosebire de get_applications_list, un server care
+        nu răspunde se raportează (ConnectionError), nu se confundă cu un catalog gol. """
+        client = self.client
+        with client.socket_lock:
+            if not client.socket or client.socket.fileno() == -1:
+                raise ConnectionError("nu există conexiune cu serverul")
+            try:
+                client.socket.sendall(json.dumps({'command': 'list_apps'}).encode('utf-8'))
+            except OSError as e_send:
+                raise ConnectionError(str(e_send)) from e_send
+            response = client.receive_json()
+        if not response:
+            raise ConnectionError("serverul a închis conexiunea")
+        if response.get('status') != 'success':
+            raise ConnectionError(response.get('message') or "răspuns invalid la list_apps")
+        return {app['name']: app['version'] for app in response.get('apps', [])}
+
+    def _download(self, app_name, pinned_version):
+        return self._worker_client().download_application(app_name, version=pinned_version)
+
+    def reconcile(self):
+        """ O trecere de sincronizare. Returnează (aplicații instalate acum, aplicații eșuate). """
+        self.desired = load_desired_state(self.manifest_path)
+        server_versions = self._server_versions()
+        with self.client.lock:
+            installed = dict(self.client.downloaded_apps)
+
+        plan, failed = {}, []
+        for app_name, pin in self.desired.items():
+            target_version = server_versions.get(app_name) if pin == 'latest' else pin
+            if target_version is None:
+                print(f"Sync: {app_name} nu există pe server.")
+                failed.append(app_name)
+            elif installed.get(app_name) != target_version or not os.path.isfile(os.path.join(self.client.downloads_dir, app_name)):
+                plan[app_name] = None if pin == 'latest' else pin
+
+        synced, total_bytes = [], 0
+        started = time.perf_counter()
+        if plan:
+            print(f"Sync: {len(plan)} aplicații de adus la zi ({self.concurrency} descărcări în paralel)...")
+            pool = self._executor()
+            futures = {pool.submit(self._download, app_name, pinned_version): app_name for app_name, pinned_version in plan.items()}
+            for future in as_completed(futures):
+                app_name = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e_download:
+                    print(f"Sync: Eroare la {app_name}: {e_download}")
+                    result = None
+                if result and result.get('status') == 'success':
+                    with self.client.lock:
+                        self.client.downloaded_apps[app_name] = result['version']
+                    total_bytes += os.path.getsize(result['path'])
+                    synced.append(app_name)
+                else:
+                    failed.append(app_name)
+
+        if self.prune:
+            for app_name in [name for name in installed if name not in self.desired]:
+                try:
+                    os.remove(os.path.join(self.client.downloads_dir, app_name))
+                except FileNotFoundError:
+                    pass
+                with self.client.lock:
+                    self.client.downloaded_apps.pop(app_name, None)
+                print(f"Sync: {app_name} nu mai este în manifest și a fost șters.")
+
+        self.client._save_installed_versions()
+        self.client.announce_versions()
+        elapsed = time.perf_counter() - started
+        print(f"Sync: {len(synced)} instalate, {len(self.desired) - len(synced) - len(failed)} deja la zi, {len(failed)} eșuate"
+              f" ({total_bytes / (1024 * 1024):.1f} MB în {elapsed:.2f}s, {total_bytes / (1024 * 1024) / elapsed if elapsed > 0 else 0:.1f} MB/s).")
+        return synced, failed
+
+    def run(self, once=False, interval=60.0):
+        try:
+            while True:
+                try:
+                    _, failed = self.reconcile()
+                except ConnectionError as e_server:
+                    print(f"Sync: Serverul nu este disponibil: {e_server}")
+                    if once or not self.client.reconnect_pending:
+                        return EXIT_UNAVAILABLE
+                    # Reconectarea e în curs: trecerea se reia la următorul interval.
+                    failed = None
+                except (OSError, ValueError) as e_manifest:
+                    print(f"Sync: Manifestul {self.manifest_path} nu poate fi folosit: {e_manifest}")
+                    return EXIT_UNAVAILABLE
+                if once:
+                    return EXIT_SYNC_FAILED if failed else EXIT_SYNCED
+                deadline = time.monotonic() + interval
+                while time.monotonic() < deadline:
+                    if self.stop_requested.wait(1.0):
+                        return EXIT_SYNCED
+                    if self.client.stop_event.is_set() and not self.client.reconnect_pending:
+                        print("Sync: Conexiunea cu serverul s-a pierdut.")
+                        return EXIT_UNAVAILABLE
+        finally:
+            self.close()
+
+
+def run_sync(args):
+    client = ApplicationClient(args.host, args.port, use_host_cache=not args.no_host_cache, host_cache_dir=args.host_cache_dir,
+                               fsync_policy=args.fsync, receive_mode=args.receive_mode)
+    try:
+        client.connect()
+    except OSError as e_connect:
+        print(f"Sync: Serverul {args.host}:{args.port} nu este disponibil: {e_connect}")
+        return EXIT_UNAVAILABLE
+    sync = FleetSync(client, args.manifest, concurrency=args.concurrency, prune=args.prune)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sync.stop_requested.set())
+    try:
+        return sync.run(once=args.once, interval=args.interval)
+    except KeyboardInterrupt:
+        return EXIT_SYNCED
+    finally:
+        client.close_connection()
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Client pentru serverul de aplicații. Fără subcomandă pornește meniul interactiv.")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--host-cache-dir', help="Cache-ul comun al mașinii (implicit $APP_HOST_CACHE_DIR sau <tmp>/app_host_cache-<uid>).")
+    parser.add_argument('--no-host-cache', action='store_true', help="Descarcă direct, fără cache-ul comun al mașinii.")
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES, default='none',
+                        help="Când se forțează pe disc fișierele descărcate: niciodată, la final sau la fiecare 64 MiB.")
+    parser.add_argument('--receive-mode', choices=RECEIVE_MODES, default='buffer',
+                        help="buffer: recv_into într-un buffer refolosit + scrieri mari; mmap: recv_into direct în fișier.")
+    modes = parser.add_subparsers(dest='mode')
+    sync_parser = modes.add_parser('sync', help="Sincronizare fără interfață după un manifest cu starea dorită.")
+    sync_parser.add_argument('--manifest', required=True, help="JSON: {\"apps\": {\"nume\": \"latest\" | versiune}}.")
+    sync_parser.add_argument('--once', action='store_true', help="O singură trecere; codul de ieșire spune dacă totul e la zi.")
+    sync_parser.add_argument('--concurrency', type=int, default=4, help="Numărul maxim de descărcări simultane.")
+    sync_parser.add_argument('--interval', type=float, default=60.0, help="Secunde între treceri complete în modul daemon.")
+    sync_parser.add_argument('--prune', action='store_true', help="Șterge aplicațiile descărcate care nu mai apar în manifest.")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.mode == 'sync':
+        return run_sync(args)
+
+    client = ApplicationClient(args.host, args.port, use_host_cache=not args.no_host_cache, host_cache_dir=args.host_cache_dir,
+                               fsync_policy=args.fsync, receive_mode=args.receive_mode)
     try:
         client.connect()
 
@@ -660,7 +1561,9 @@ def main():
             print("2. Descarcă o aplicație")
             print("3. Rulează o aplicație descărcată")
             print("4. Listează aplicațiile pornite local (monitorizate)")
-            print("5. Ieșire")
+            print("5. Descarcă mai multe aplicații într-un singur pachet")
+            print("6. Caută aplicații (prefix, etichetă, platformă)")
+            print("7. Ieșire")
             return input("Introduceți opțiunea: ").strip()
 
         while not client.stop_event.is_set():
@@ -684,6 +1587,28 @@ def main():
             elif choice == '4':
                 client.list_running_apps()
             elif choice == '5':
+                names_input = input("Numele aplicațiilor, separate prin virgulă ('*' = toate cele neactualizate): ").strip()
+                if names_input == '*':
+                    client.download_bundle(outdated=True)
+                elif names_input:
+                    client.download_bundle([name.strip() for name in names_input.split(',') if name.strip()])
+                else: print("Lista de aplicații nu poate fi goală.")
+            elif choice == '6':
+                prefix = input("Prefix nume (gol = oricare): ").strip() or None
+                tag = input("Etichetă (gol = oricare): ").strip() or None
+                platform = input("Platformă (gol = oricare): ").strip() or None
+                cursor = None
+                while True:
+                    apps_page, cursor = client.query_applications(cursor=cursor, limit=20, prefix=prefix,
+                                                                  tags=[tag] if tag else None, platform=platform)
+                    for app_info in apps_page:
+                        tags_text = f" [{', '.join(app_info['tags'])}]" if app_info['tags'] else ""
+                        print(f"  - {app_info['name']} (v{app_info['version']}, {app_info['size']} bytes){tags_text}")
+                    if not apps_page:
+                        print("Nicio aplicație nu corespunde căutării.")
+                    if not cursor or input("Pagina următoare? (d/n): ").strip().lower() != 'd':
+                        break
+            elif choice == '7':
                 print("Se închide clientul...")
                 break
             else: print("Opțiune invalidă.")
@@ -708,4 +1633,4 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
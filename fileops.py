@@ -0,0 +1,118 @@
+import hashlib
+import os
+import shutil
+import sys
+import time
+
+
+FICLONE = 0x40049409  # ioctl Linux pentru reflink (btrfs, XFS, ...)
+WARM_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(block_size)
+            if not data:
+                break
+            hasher.update(data)
+    return hasher.hexdigest()
+
+
+def _reflink(src_path, dst_path):
+    if not sys.platform.startswith('linux'):
+        return False
+    import fcntl
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return True
+        except OSError:
+            pass
+    os.remove(dst_path)
+    return False
+
+
+def _copy_file_range(src_path, dst_path):
+    if not hasattr(os, 'copy_file_range'):
+        return False
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), min(remaining, 1 << 30))
+                if copied == 0:
+                    break
+                remaining -= copied
+            if remaining == 0:
+                return True
+        except OSError:
+            pass
+    os.remove(dst_path)
+    return False
+
+
+def clone_file(src_path, dst_path, allow_hardlink=False):
+    """ Copiază src în dst cu cea mai ieftină metodă disponibilă; returnează metoda folosită.
+
+    Ordinea: reflink (copy-on-write), hardlink (doar la cerere, fiindcă dst partajează inode-ul
+    cu src), os.copy_file_range (copiere în kernel), apoi copiere obișnuită.
+    """
+    if _reflink(src_path, dst_path):
+        return 'reflink'
+    if allow_hardlink:
+        try:
+            os.link(src_path, dst_path)
+            return 'hardlink'
+        except OSError:
+            pass
+    if _copy_file_range(src_path, dst_path):
+        return 'copy_file_range'
+    shutil.copyfile(src_path, dst_path)
+    return 'copy'
+
+
+def advise(fd, advice, offset=0, length=0):
+    """ posix_fadvise cu sfatul dat prin nume ('WILLNEED', 'DONTNEED', 'SEQUENTIAL'); fără efect unde nu există. """
+    advice_value = getattr(os, 'POSIX_FADV_' + advice, None)
+    if advice_value is None:
+        return False
+    try:
+        os.posix_fadvise(fd, offset, length, advice_value)
+        return True
+    except OSError:
+        return False
+
+
+def warm_file(path, timeout=None):
+    """ Aduce fișierul în page cache înainte să fie cerut; returnează câți bytes s-au citit.
+
+    WILLNEED pornește readahead-ul asincron pentru tot fișierul, apoi se citește secvențial,
+    într-un buffer refolosit, cât permite timeout-ul. Ce nu apucă să fie citit rămâne în grija
+    readahead-ului din kernel.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    view = memoryview(bytearray(WARM_BLOCK_SIZE))
+    read_total = 0
+    with open(path, 'rb', buffering=0) as f:
+        advise(f.fileno(), 'SEQUENTIAL')
+        advise(f.fileno(), 'WILLNEED')
+        while deadline is None or time.monotonic() < deadline:
+            read = f.readinto(view)
+            if not read:
+                break
+            read_total += read
+    return read_total
+
+
+def drop_cached(path):
+    """ Sfat DONTNEED: paginile curate ale fișierului pot fi eliberate din page cache. """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        return advise(fd, 'DONTNEED')
+    finally:
+        os.close(fd)
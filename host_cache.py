@@ -0,0 +1,188 @@
+import os
+import stat
+import tempfile
+import time
+
+from fileops import clone_file
+
+try:
+    import fcntl
+except ImportError:  # Windows: fără flock, cache-ul partajat e dezactivat.
+    fcntl = None
+
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024 * 1024
+LOCK_POLL_INTERVAL = 0.05
+
+
+def default_cache_dir(group=None):
+    """ Fără grup comun, fiecare utilizator are cache-ul lui (<tmp>/app_host_cache-<uid>). """
+    if os.environ.get('APP_HOST_CACHE_DIR'):
+        return os.environ['APP_HOST_CACHE_DIR']
+    if group is not None or not hasattr(os, 'getuid'):
+        return os.path.join(tempfile.gettempdir(), 'app_host_cache')
+    return os.path.join(tempfile.gettempdir(), f'app_host_cache-{os.getuid()}')
+
+
+def _group_id(group):
+    if group is None or isinstance(group, int):
+        return group
+    import grp
+    return grp.getgrnam(group).gr_gid
+
+
+class HostCache:
+    """ Cache de conținut comun proceselor client de pe aceeași mașină.
+
+    Obiectele sunt indexate după rădăcina Merkle a versiunii (objects/ab/cdef...), deci
+    același conținut se păstrează o singură dată, indiferent de numele aplicației. Un flock
+    pe locks/<rădăcină>.lock asigură că un singur proces îl descarcă, iar celelalte îl așteaptă.
+
+    Cache-ul aparține unui singur utilizator (directoare 0o755) sau, cu `group`, membrilor
+    unui grup (0o2770). Se folosesc doar obiecte ale proprietarilor de încredere (noi, root sau,
+    în modul grup, fișiere ale grupului), iar clientul verifică oricum conținutul față de
+    manifest înainte să-l instaleze. Instalarea face o copie (reflink sau copiere), niciodată
+    un hardlink: aplicația instalată nu împarte inode-ul cu obiectul din cache.
+    """
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES, group=None):
+        group = group if group is not None else os.environ.get('APP_HOST_CACHE_GROUP')
+        self.group_id = _group_id(group)
+        self.root = root or default_cache_dir(self.group_id)
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(self.root, 'objects')
+        self.locks_dir = os.path.join(self.root, 'locks')
+        for directory in (self.root, self.objects_dir, self.locks_dir):
+            self._make_dir(directory)
+
+    @staticmethod
+    def available():
+        return fcntl is not None
+
+    def _trusted(self, file_stat):
+        """ Proprietarul fișierului/directorului poate fi: noi, root sau (în modul grup) grupul cache-ului. """
+        if file_stat.st_mode & stat.S_IWOTH:
+            return False
+        if not hasattr(os, 'getuid'):
+            return True
+        if file_stat.st_uid in (os.getuid(), 0):
+            return True
+        return self.group_id is not None and file_stat.st_gid == self.group_id
+
+    def _make_dir(self, directory):
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+            if self.group_id is not None:
+                os.chown(directory, -1, self.group_id)
+                os.chmod(directory, 0o2770)
+            else:
+                os.chmod(directory, 0o755)
+        if not self._trusted(os.stat(directory)):
+            raise PermissionError(f"Directorul cache-ului {directory} aparține altui utilizator sau poate fi scris de oricine.")
+
+    def _object_path(self, key):
+        return os.path.join(self.objects_dir, key[:2], key[2:])
+
+    def lookup(self, key, size):
+        """ Calea obiectului dacă există, are dimensiunea așteptată și un proprietar de încredere.
+        Conținutul NU este verificat aici; apelantul îl verifică față de manifest. """
+        object_path = self._object_path(key)
+        try:
+            object_stat = os.stat(object_path)
+        except OSError:
+            return None
+        if object_stat.st_size != size or not stat.S_ISREG(object_stat.st_mode) or not self._trusted(object_stat):
+            return None
+        try:
+            os.utime(object_path)  # marchează folosirea pentru evacuare
+        except OSError:
+            pass
+        return object_path
+
+    def discard(self, key):
+        """ Elimină un obiect care nu a trecut verificarea (dacă avem dreptul). """
+        try:
+            os.remove(self._object_path(key))
+            return True
+        except OSError:
+            return False
+
+    def _open_lock(self, key):
+        return os.open(os.path.join(self.locks_dir, key + '.lock'), os.O_RDONLY | os.O_CREAT, 0o660 if self.group_id is not None else 0o644)
+
+    def try_lock(self, key):
+        """ Lock exclusiv fără așteptare; None dacă alt proces îl deține. """
+        lock_fd = self._open_lock(key)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock_fd
+        except BlockingIOError:
+            os.close(lock_fd)
+            return None
+
+    def lock(self, key, timeout):
+        """ Așteaptă lock-ul cel mult timeout secunde; None la expirare. """
+        deadline = time.monotonic() + timeout
+        while True:
+            lock_fd = self.try_lock(key)
+            if lock_fd is not None or time.monotonic() >= deadline:
+                return lock_fd
+            time.sleep(LOCK_POLL_INTERVAL)
+
+    @staticmethod
+    def release(lock_fd):
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+        finally:
+            os.close(lock_fd)
+
+    def insert(self, key, source_path):
+        """ Adaugă în cache un fișier deja verificat. Publicarea e atomică (os.replace). """
+        object_path = self._object_path(key)
+        self._make_dir(os.path.dirname(object_path))
+        temp_path = f"{object_path}.{os.getpid()}.tmp"
+        try:
+            # Copie proprie (nu hardlink): aplicația instalată din source_path poate fi modificată ulterior.
+            clone_file(source_path, temp_path)
+            os.chmod(temp_path, 0o440 if self.group_id is not None else 0o444)
+            os.replace(temp_path, object_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return object_path
+
+    def materialize(self, key, dest_path):
+        """ Creează dest_path ca o copie independentă a obiectului; returnează metoda folosită (reflink, copy, ...). """
+        return clone_file(self._object_path(key), dest_path)
+
+    def prune(self):
+        """ Evacuează obiectele folosite cel mai demult până sub max_bytes; le sare pe cele în lucru. """
+        objects = []
+        total_bytes = 0
+        for prefix_entry in os.scandir(self.objects_dir):
+            if not prefix_entry.is_dir():
+                continue
+            for entry in os.scandir(prefix_entry.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    entry_stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                objects.append((entry_stat.st_mtime, entry_stat.st_size, prefix_entry.name + entry.name, entry.path))
+                total_bytes += entry_stat.st_size
+        removed_bytes = 0
+        for _, size, key, path in sorted(objects):
+            if total_bytes - removed_bytes <= self.max_bytes:
+                break
+            lock_fd = self.try_lock(key)
+            if lock_fd is None:
+                continue
+            try:
+                os.remove(path)
+                removed_bytes += size
+            except OSError:
+                pass
+            finally:
+                self.release(lock_fd)
+        return removed_bytes
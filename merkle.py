@@ -0,0 +1,121 @@
+import hashlib
+import time
+
+
+CHUNK_SIZE = 1024 * 1024
+MAX_REPAIR_ROUNDS = 5
+MAX_CHUNKS_PER_REPAIR = 256
+
+
+def chunk_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def chunk_length(index, total_size, chunk_size=CHUNK_SIZE):
+    """ Lungimea bucății cu indexul dat (ultima poate fi mai scurtă). """
+    return max(0, min(chunk_size, total_size - index * chunk_size))
+
+
+def merkle_root(chunk_digests):
+    """ Rădăcina Merkle (SHA-256) peste lista de digest-uri hex ale bucăților. """
+    if not chunk_digests:
+        return hashlib.sha256(b'').hexdigest()
+    level = [bytes.fromhex(digest) for digest in chunk_digests]
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [hashlib.sha256(level[i] + level[i + 1]).digest() for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+
+def _manifest(digests, total_size, chunk_size):
+    return {
+        'chunk_size': chunk_size,
+        'size': total_size,
+        'chunks': digests,
+        'root': merkle_root(digests)
+    }
+
+
+def build_manifest(file_path, chunk_size=CHUNK_SIZE):
+    """ Citește fișierul secvențial și construiește manifestul: hash per bucată + rădăcină Merkle. """
+    with open(file_path, 'rb') as f:
+        return build_manifest_from_file(f, chunk_size)
+
+
+def build_manifest_from_file(f, chunk_size=CHUNK_SIZE):
+    """ Manifestul unui fișier deja deschis (de la început), ca să descrie exact ce se trimite din el. """
+    digests = []
+    total_size = 0
+    f.seek(0)
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            break
+        digests.append(chunk_digest(data))
+        total_size += len(data)
+    return _manifest(digests, total_size, chunk_size)
+
+
+def build_manifest_from_bytes(data, chunk_size=CHUNK_SIZE):
+    view = memoryview(data)
+    digests = [chunk_digest(view[offset:offset + chunk_size]) for offset in range(0, len(data), chunk_size)]
+    return _manifest(digests, len(data), chunk_size)
+
+
+class ChunkVerifier:
+    """ Verifică bucățile unui transfer pe măsură ce sosesc și măsoară costul hashing-ului. """
+
+    def __init__(self, manifest):
+        self.chunk_size = manifest['chunk_size']
+        self.expected_digests = manifest['chunks']
+        self.root_ok = merkle_root(self.expected_digests) == manifest['root']
+        self.bad_chunks = []
+        self.hash_seconds = 0.0
+        self.hashed_bytes = 0
+        self._index = 0
+        self._filled = 0
+        self._hasher = hashlib.sha256()
+
+    def update(self, data):
+        started = time.perf_counter()
+        view = memoryview(data)
+        while view:
+            take = min(self.chunk_size - self._filled, len(view))
+            self._hasher.update(view[:take])
+            self._filled += take
+            view = view[take:]
+            if self._filled == self.chunk_size:
+                self._finish_chunk()
+        self.hashed_bytes += len(data)
+        self.hash_seconds += time.perf_counter() - started
+
+    def finish(self):
+        """ Închide ultima bucată parțială; returnează lista indecșilor invalizi. """
+        if self._filled:
+            started = time.perf_counter()
+            self._finish_chunk()
+            self.hash_seconds += time.perf_counter() - started
+        return self.bad_chunks
+
+    def verify_chunk(self, index, data):
+        """ Verifică o bucată retransmisă; o scoate din lista celor invalide dacă e corectă. """
+        started = time.perf_counter()
+        valid = 0 <= index < len(self.expected_digests) and chunk_digest(data) == self.expected_digests[index]
+        self.hash_seconds += time.perf_counter() - started
+        self.hashed_bytes += len(data)
+        if valid and index in self.bad_chunks:
+            self.bad_chunks.remove(index)
+        return valid
+
+    def throughput_mb_s(self):
+        if self.hash_seconds <= 0:
+            return float('inf')
+        return self.hashed_bytes / self.hash_seconds / (1024 * 1024)
+
+    def _finish_chunk(self):
+        if self._index >= len(self.expected_digests) or self._hasher.hexdigest() != self.expected_digests[self._index]:
+            self.bad_chunks.append(self._index)
+        self._index += 1
+        self._filled = 0
+        self._hasher = hashlib.sha256()
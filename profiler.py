@@ -0,0 +1,164 @@
+import collections
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+
+# Sub timeout-ul de inactivitate al conexiunilor (CLIENT_IDLE_TIMEOUT în server.py): admin.py așteaptă
+# toată fereastra pe aceeași conexiune înainte de profile_stop.
+MAX_PROFILE_SECONDS = 240.0
+
+
+class ServerProfiler:
+    """ Profilare la cerere pentru server: eșantionare de stive pe toate thread-urile,
+    instantanee tracemalloc și timp real / CPU per comandă din handle_client.
+
+    Cât timp profilarea e oprită nu rulează niciun thread și nu e instalat niciun hook;
+    handle_client verifică doar atributul `active`.
+    """
+
+    def __init__(self):
+        self.active = False
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._sampler_thread = None
+        self._last_report = None
+        self._reset(0.0, 0.0, False)
+
+    def _reset(self, duration, interval, trace_memory):
+        self._duration = duration
+        self._interval = interval
+        self._trace_memory = trace_memory
+        self._started_at = time.time()
+        self._samples = 0
+        self._stack_counts = collections.Counter()
+        self._function_counts = collections.Counter()
+        self._command_stats = {}
+        self._memory_start = None
+        self._started_tracemalloc = False
+
+    def start(self, duration=30.0, interval=0.005, trace_memory=False):
+        with self._lock:
+            if self.active:
+                return {'status': 'error', 'message': 'Profilarea este deja pornită.'}
+            duration = max(0.1, min(float(duration), MAX_PROFILE_SECONDS))
+            interval = max(0.001, float(interval))
+            self._reset(duration, interval, trace_memory)
+            if trace_memory:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(25)
+                    self._started_tracemalloc = True
+                self._memory_start = tracemalloc.take_snapshot()
+            self._stop_event.clear()
+            self.active = True
+            self._sampler_thread = threading.Thread(target=self._sample_loop, name="ProfilerSampler")
+            self._sampler_thread.daemon = True
+            self._sampler_thread.start()
+        print(f"Profilare pornită pentru {duration:.1f}s (eșantion la {interval * 1000:.1f} ms, memorie: {'da' if trace_memory else 'nu'}).")
+        return {'status': 'success', 'duration': duration, 'interval': interval, 'memory': trace_memory}
+
+    def stop(self):
+        sampler_thread = self._sampler_thread
+        if sampler_thread is None:
+            return self.report()
+        self._stop_event.set()
+        if sampler_thread is not threading.current_thread():
+            sampler_thread.join(timeout=10)
+        return self.report()
+
+    def timed_command(self, command, handler, *args):
+        """ Rulează handler-ul comenzii și atribuie timpul real și CPU (al thread-ului) comenzii. """
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            return handler(*args)
+        finally:
+            wall = time.perf_counter() - wall_started
+            cpu = time.thread_time() - cpu_started
+            with self._lock:
+                stats = self._command_stats.setdefault(str(command), {'count': 0, 'wall': 0.0, 'cpu': 0.0, 'max_wall': 0.0})
+                stats['count'] += 1
+                stats['wall'] += wall
+                stats['cpu'] += cpu
+                stats['max_wall'] = max(stats['max_wall'], wall)
+
+    def _sample_loop(self):
+        own_thread_id = threading.get_ident()
+        deadline = time.monotonic() + self._duration
+        while not self._stop_event.wait(self._interval) and time.monotonic() < deadline:
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < 64:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                thread_label = thread_names.get(thread_id, str(thread_id)).split(' (')[0].rstrip('-0123456789') or 'thread'
+                folded = ';'.join([thread_label] + stack[::-1])
+                with self._lock:
+                    self._stack_counts[folded] += 1
+                    self._function_counts[stack[0]] += 1
+            with self._lock:
+                self._samples += 1
+        self._finish()
+
+    def _finish(self):
+        memory_top = None
+        if self._trace_memory and tracemalloc.is_tracing():
+            memory_end = tracemalloc.take_snapshot()
+            memory_top = [
+                {'location': str(stat.traceback[0]), 'size_diff': stat.size_diff, 'size': stat.size, 'count_diff': stat.count_diff}
+                for stat in memory_end.compare_to(self._memory_start, 'lineno')[:30]
+            ]
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        with self._lock:
+            self._last_report = self._build_report(memory_top)
+            self.active = False
+        print(f"Profilare încheiată: {self._last_report['samples']} eșantioane.")
+
+    def _build_report(self, memory_top=None, top=30):
+        commands = {
+            command: dict(stats, avg_wall=stats['wall'] / stats['count'], avg_cpu=stats['cpu'] / stats['count'])
+            for command, stats in self._command_stats.items()
+        }
+        return {
+            'started_at': self._started_at,
+            'duration': time.time() - self._started_at,
+            'interval': self._interval,
+            'samples': self._samples,
+            'top_functions': self._function_counts.most_common(top),
+            'top_stacks': self._stack_counts.most_common(top),
+            'commands': commands,
+            'memory_top': memory_top
+        }
+
+    def report(self, top=30):
+        """ Raportul ultimei ferestre de profilare sau, dacă e încă activă, un raport parțial. """
+        with self._lock:
+            if self.active:
+                return dict(self._build_report(top=top), partial=True)
+            return self._last_report
+
+    def dump(self, profiles_dir):
+        """ Scrie raportul (JSON) și stivele în format folded (pentru flamegraph) în profiles_dir. """
+        report = self.report()
+        if report is None:
+            return None
+        os.makedirs(profiles_dir, exist_ok=True)
+        base_path = os.path.join(profiles_dir, f"profile_{int(report['started_at'])}")
+        with open(base_path + '.json', 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        with self._lock:
+            folded_stacks = list(self._stack_counts.items())
+        with open(base_path + '.folded', 'w', encoding='utf-8') as f:
+            for stack, count in folded_stacks:
+                f.write(f"{stack} {count}\n")
+        return base_path + '.json'
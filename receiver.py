@@ -0,0 +1,158 @@
+import mmap
+import os
+
+from merkle import CHUNK_SIZE
+
+
+RECV_BUFFER_SIZE = CHUNK_SIZE
+MIN_RECV_SIZE = 64 * 1024
+FSYNC_POLICIES = ('none', 'end', 'interval')
+FSYNC_INTERVAL_BYTES = 64 * 1024 * 1024
+RECEIVE_MODES = ('buffer', 'mmap')
+
+
+def preallocate(fd, size):
+    """ Rezervă blocurile fișierului dinainte (extent-uri contigue, fără ENOSPC la mijlocul transferului). """
+    if size <= 0:
+        return
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        # Fără posix_fallocate (macOS/Windows) sau sistem de fișiere care nu îl suportă.
+        os.ftruncate(fd, size)
+
+
+def _write_all(fd, view, offset):
+    while view:
+        written = os.pwrite(fd, view, offset) if hasattr(os, 'pwrite') else _seek_write(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+def _seek_write(fd, view, offset):
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.write(fd, view)
+
+
+class FileReceiver:
+    """ Primește de pe socket bytes-ii [offset, size) ai unui fișier prealocat.
+
+    În modul 'buffer', recv_into umple un buffer refolosit (implicit cât o bucată Merkle), iar
+    fișierul primește doar scrieri mari, aliniate la dimensiunea buffer-ului. În modul 'mmap',
+    recv_into scrie direct în maparea fișierului, fără niciun apel write. Cererile recv pornesc
+    de la MIN_RECV_SIZE și se dublează cât timp kernel-ul le umple complet. Nu se alocă obiecte
+    bytes pe parcursul transferului; bucățile ajung la verificator ca memoryview.
+
+    `written` spune câți bytes de la începutul fișierului sunt deja pe disc; după o întrerupere,
+    transferul se poate relua de acolo cu offset=written.
+    """
+
+    def __init__(self, path, size, verifier=None, fsync_policy='none', mode='buffer', buffer=None,
+                 check_stop=None, on_progress=None, offset=0):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Politică fsync necunoscută: {fsync_policy}")
+        if mode not in RECEIVE_MODES:
+            raise ValueError(f"Mod de recepție necunoscut: {mode}")
+        self.path = path
+        self.size = size
+        self.verifier = verifier
+        self.fsync_policy = fsync_policy
+        self.mode = mode
+        self.buffer = buffer if buffer is not None else bytearray(RECV_BUFFER_SIZE)
+        self.check_stop = check_stop
+        self.on_progress = on_progress
+        self.offset = offset
+        self.received = offset
+        self.written = offset
+        self.recv_calls = 0
+        self._synced_at = offset
+
+    def receive(self, sock):
+        if self.check_stop is not None:
+            self.check_stop()
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0) | (os.O_TRUNC if self.offset == 0 else 0)
+        fd = os.open(self.path, flags, 0o644)
+        try:
+            preallocate(fd, self.size)
+            if self.mode == 'mmap' and self.size > 0:
+                self._receive_mmap(sock, fd)
+            else:
+                self._receive_buffered(sock, fd)
+            if self.fsync_policy != 'none':
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        return self.received
+
+    def _recv_into(self, sock, view, limit):
+        received = sock.recv_into(view, limit)
+        self.recv_calls += 1
+        if received == 0:
+            raise EOFError(f"Conexiune închisă prematur. Primit {self.received}/{self.size} bytes.")
+        return received
+
+    def _after_block(self, fd, block):
+        """ Rulează o dată pe bloc (nu pe recv): verificare, fsync periodic, progres, oprire. """
+        if self.verifier is not None:
+            self.verifier.update(block)
+        if self.fsync_policy == 'interval' and self.received - self._synced_at >= FSYNC_INTERVAL_BYTES:
+            getattr(os, 'fdatasync', os.fsync)(fd)
+            self._synced_at = self.received
+        if self.on_progress is not None:
+            self.on_progress(self.received)
+        if self.check_stop is not None:
+            self.check_stop()
+
+    def _receive_buffered(self, sock, fd):
+        view = memoryview(self.buffer)
+        capacity = len(view)
+        request_size = min(MIN_RECV_SIZE, capacity)
+        filled = 0
+        try:
+            while self.received < self.size:
+                limit = min(request_size, capacity - filled, self.size - self.received)
+                received = self._recv_into(sock, view[filled:], limit)
+                if received == limit and request_size < capacity:
+                    request_size *= 2
+                filled += received
+                self.received += received
+                if filled == capacity or self.received == self.size:
+                    block = view[:filled]
+                    _write_all(fd, block, self.received - filled)
+                    self.written = self.received
+                    self._after_block(fd, block)
+                    filled = 0
+        finally:
+            view.release()
+
+    def _receive_mmap(self, sock, fd):
+        mapping = mmap.mmap(fd, self.size)
+        view = memoryview(mapping)
+        capacity = len(self.buffer)
+        request_size = min(MIN_RECV_SIZE, capacity)
+        block_start = self.offset
+        try:
+            while self.received < self.size:
+                limit = min(request_size, self.size - self.received)
+                # Feliile se eliberează explicit: una rămasă vie (de ex. în traceback-ul unei erori)
+                # ar face mapping.close() să arunce BufferError în locul erorii originale.
+                with view[self.received:] as target:
+                    received = self._recv_into(sock, target, limit)
+                if received == limit and request_size < capacity:
+                    request_size *= 2
+                self.received += received
+                # Maparea e chiar fișierul: tot ce s-a primit e deja în page cache.
+                self.written = self.received
+                if self.received - block_start >= capacity or self.received == self.size:
+                    with view[block_start:self.received] as block:
+                        self._after_block(fd, block)
+                    block_start = self.received
+            if self.fsync_policy != 'none':
+                mapping.flush()
+        finally:
+            view.release()
+            try:
+                mapping.close()
+            except BufferError:
+                # Un consumator (verificatorul) mai ține o referință; maparea se închide când aceasta dispare.
+                pass
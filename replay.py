@@ -0,0 +1,248 @@
+import argparse
+import collections
+import json
+import socket
+import sys
+import threading
+import time
+
+from traffic_trace import (read_trace, name_hash, COMMAND_NAMES,
+                           KIND_SESSION_OPEN, KIND_REQUEST, KIND_SESSION_CLOSE)
+
+
+REPLAYABLE_COMMANDS = ('list_apps', 'query_apps', 'download_app', 'list_versions')
+# Trasarea nu păstrează filtrele interogărilor; se reia prima pagină a catalogului, fără filtre.
+REPLAY_QUERY = {'command': 'query_apps', 'limit': 50}
+
+
+def _recv_json(sock, timeout=60.0, max_size=8 * 1024 * 1024):
+    buffer = b''
+    sock.settimeout(timeout)
+    while len(buffer) < max_size:
+        chunk = sock.recv(65536)
+        if not chunk:
+            raise ConnectionError("Serverul a închis conexiunea.")
+        buffer += chunk
+        try:
+            return json.loads(buffer.decode('utf-8'))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+    raise ValueError("Răspuns JSON prea mare.")
+
+
+def _recv_discard(sock, size):
+    buffer = bytearray(1024 * 1024)
+    view = memoryview(buffer)
+    remaining = size
+    while remaining > 0:
+        received = sock.recv_into(view, min(len(buffer), remaining))
+        if received == 0:
+            raise ConnectionError(f"Conexiune închisă cu {remaining} bytes rămași.")
+        remaining -= received
+
+
+def load_sessions(trace_path):
+    """ Grupează înregistrările pe sesiuni: {sesiune: {'open': moment, 'requests': [...], 'close': moment}}. """
+    sessions = collections.OrderedDict()
+    for record in read_trace(trace_path):
+        session = sessions.setdefault(record.session, {'open': record.offset, 'requests': [], 'close': None})
+        if record.kind == KIND_SESSION_OPEN:
+            session['open'] = record.offset
+        elif record.kind == KIND_REQUEST:
+            session['requests'].append(record)
+        elif record.kind == KIND_SESSION_CLOSE:
+            session['close'] = record.offset
+    return sessions
+
+
+class Replayer:
+    """ Reia sarcina dintr-o trasare împotriva unui server local, la viteza originală sau accelerată. """
+
+    def __init__(self, host, port, speed=1.0):
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.latencies = collections.defaultdict(list)
+        self.schedule_lag = []
+        self.errors = collections.Counter()
+        self.skipped = collections.Counter()
+        self._lock = threading.Lock()
+        self._apps_by_hash = {}
+        self._app_names = []
+
+    def _load_catalog(self):
+        with socket.create_connection((self.host, self.port)) as sock:
+            sock.sendall(json.dumps({'command': 'list_apps'}).encode('utf-8'))
+            apps = _recv_json(sock).get('apps', [])
+        self._app_names = sorted(app['name'] for app in apps)
+        self._apps_by_hash = {name_hash(name): name for name in self._app_names}
+
+    def _resolve_app(self, app_hash):
+        if app_hash in self._apps_by_hash:
+            return self._apps_by_hash[app_hash]
+        # Aplicația din producție nu există local: se alege una determinist, ca distribuția cererilor să rămână similară.
+        return self._app_names[app_hash % len(self._app_names)] if self._app_names else None
+
+    def run(self, sessions):
+        self._load_catalog()
+        replay_started = time.monotonic()
+        threads = []
+        for session_id, session in sessions.items():
+            thread = threading.Thread(target=self._replay_session, args=(session, replay_started), name=f"Replay-{session_id}")
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return time.monotonic() - replay_started
+
+    def _wait_until(self, replay_started, trace_offset):
+        target = replay_started + trace_offset / self.speed
+        delay = target - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return max(0.0, time.monotonic() - target)
+
+    def _replay_session(self, session, replay_started):
+        self._wait_until(replay_started, session['open'])
+        try:
+            sock = socket.create_connection((self.host, self.port))
+        except OSError:
+            with self._lock:
+                self.errors['connect'] += 1
+            return
+        try:
+            for record in session['requests']:
+                command = COMMAND_NAMES.get(record.command)
+                if command not in REPLAYABLE_COMMANDS:
+                    with self._lock:
+                        self.skipped[command or 'necunoscută'] += 1
+                    continue
+                lag = self._wait_until(replay_started, record.offset)
+                started = time.perf_counter()
+                try:
+                    self._execute(sock, command, record)
+                except (OSError, ConnectionError, ValueError) as e:
+                    with self._lock:
+                        self.errors[command] += 1
+                    print(f"Replay: eroare la {command}: {e}")
+                    return
+                with self._lock:
+                    self.latencies[command].append(time.perf_counter() - started)
+                    self.schedule_lag.append(lag)
+            if session['close'] is not None:
+                self._wait_until(replay_started, session['close'])
+        finally:
+            sock.close()
+
+    def _execute(self, sock, command, record):
+        if command == 'list_apps':
+            sock.sendall(json.dumps({'command': 'list_apps'}).encode('utf-8'))
+            _recv_json(sock)
+        elif command == 'query_apps':
+            sock.sendall(json.dumps(REPLAY_QUERY).encode('utf-8'))
+            response = _recv_json(sock)
+            if response.get('status') != 'success':
+                raise ValueError(response.get('message'))
+        elif command == 'list_versions':
+            sock.sendall(json.dumps({'command': 'list_versions', 'app_name': self._resolve_app(record.name_hash)}).encode('utf-8'))
+            _recv_json(sock)
+        elif command == 'download_app':
+            sock.sendall(json.dumps({'command': 'download_app', 'app_name': self._resolve_app(record.name_hash)}).encode('utf-8'))
+            metadata = _recv_json(sock)
+            if metadata.get('status') != 'success':
+                raise ValueError(metadata.get('message'))
+            sock.sendall(b'READY')
+            _recv_discard(sock, metadata['size'])
+            sock.sendall(b'DONE')
+
+    def summary(self):
+        commands = {}
+        for command, values in self.latencies.items():
+            ordered = sorted(values)
+            commands[command] = {
+                'count': len(ordered),
+                'mean': sum(ordered) / len(ordered),
+                'p50': _percentile(ordered, 50),
+                'p90': _percentile(ordered, 90),
+                'p99': _percentile(ordered, 99),
+                'max': ordered[-1]
+            }
+        lag = sorted(self.schedule_lag)
+        return {
+            'speed': self.speed,
+            'commands': commands,
+            'schedule_lag_p99': _percentile(lag, 99) if lag else 0.0,
+            'errors': dict(self.errors),
+            'skipped': dict(self.skipped)
+        }
+
+
+def _percentile(ordered_values, percent):
+    if not ordered_values:
+        return 0.0
+    index = min(len(ordered_values) - 1, int(round(percent / 100.0 * (len(ordered_values) - 1))))
+    return ordered_values[index]
+
+
+def print_summary(summary):
+    print(f"\nReplay la {summary['speed']}x:")
+    for command, stats in sorted(summary['commands'].items()):
+        print(f"  {command:<14} n={stats['count']:<6} p50 {stats['p50'] * 1000:8.2f} ms  p90 {stats['p90'] * 1000:8.2f} ms"
+              f"  p99 {stats['p99'] * 1000:8.2f} ms  max {stats['max'] * 1000:8.2f} ms")
+    print(f"  Întârziere față de program (p99): {summary['schedule_lag_p99'] * 1000:.1f} ms")
+    if summary['errors']:
+        print(f"  Erori: {summary['errors']}")
+    if summary['skipped']:
+        print(f"  Comenzi omise (nereproductibile): {summary['skipped']}")
+
+
+def compare_summaries(baseline, current):
+    """ Compară distribuțiile de latență între două rulări (de ex. două build-uri). """
+    print("\nComparație cu rularea de referință (valori în ms, diferență relativă):")
+    for command in sorted(set(baseline['commands']) | set(current['commands'])):
+        before = baseline['commands'].get(command)
+        after = current['commands'].get(command)
+        if not before or not after:
+            print(f"  {command:<14} prezent doar într-una din rulări")
+            continue
+        parts = []
+        for key in ('p50', 'p90', 'p99'):
+            change = (after[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            parts.append(f"{key} {before[key] * 1000:.2f} -> {after[key] * 1000:.2f} ({change:+.1f}%)")
+        print(f"  {command:<14} " + "  ".join(parts))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reia o trasare de trafic înregistrată de server împotriva unui server local.")
+    parser.add_argument('trace_path')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--speed', type=float, default=1.0, help="Factor de accelerare (1 = timp real).")
+    parser.add_argument('--output', help="Salvează rezumatul (JSON) pentru comparații ulterioare.")
+    parser.add_argument('--compare', help="Rezumat JSON al unei rulări anterioare cu care se compară.")
+    args = parser.parse_args(argv)
+
+    sessions = load_sessions(args.trace_path)
+    print(f"{len(sessions)} sesiuni, {sum(len(s['requests']) for s in sessions.values())} cereri în {args.trace_path}.")
+    replayer = Replayer(args.host, args.port, speed=args.speed)
+    try:
+        elapsed = replayer.run(sessions)
+    except OSError as e:
+        print(f"Nu s-a putut contacta serverul {args.host}:{args.port}: {e}")
+        return 2
+    summary = replayer.summary()
+    print(f"Replay încheiat în {elapsed:.1f}s.")
+    print_summary(summary)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare_summaries(json.load(f), summary)
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import bisect
+import collections
+import threading
+import time
+import uuid
+
+
+# Etapele per client, în ordinea în care apar; 'detected' (schimbarea văzută de server) este momentul zero.
+STAGES = ('notified', 'received', 'download_started', 'download_done', 'staged', 'swapped', 'restarted', 'completed')
+CLIENT_STAGES = ('received', 'staged', 'swapped', 'restarted', 'completed')
+# Limitele superioare ale găleților de histogramă, în secunde.
+HISTOGRAM_BOUNDS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, float('inf'))
+# Timpul până la primul byte al unei descărcări e de ordinul milisecundelor: găleți mai fine.
+TTFB_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+MAX_ROLLOUTS = 200
+
+
+class LatencyHistogram:
+
+    def __init__(self, bounds=HISTOGRAM_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent):
+        """ Limita superioară a găleții care conține percentila (estimare conservatoare). """
+        if not self.count:
+            return None
+        threshold = percent / 100.0 * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.bounds, self.counts):
+            seen += bucket_count
+            if seen >= threshold:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+            'buckets': [[bound if bound != float('inf') else None, bucket_count]
+                        for bound, bucket_count in zip(self.bounds, self.counts) if bucket_count]
+        }
+
+
+class RolloutTracker:
+    """ Urmărește propagarea fiecărei actualizări: de la detectarea fișierului nou pe server,
+    prin notificare, descărcare și confirmarea 'DONE', până la înlocuirea (și repornirea) pe client.
+
+    Toate momentele se măsoară cu ceasul monoton al serverului. Clienții raportează vârsta
+    evenimentului (câte secunde au trecut de atunci), nu ceasul lor local.
+    """
+
+    def __init__(self, max_rollouts=MAX_ROLLOUTS):
+        self.max_rollouts = max_rollouts
+        self._lock = threading.Lock()
+        self._rollouts = collections.OrderedDict()
+        self._stage_histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self._end_to_end = LatencyHistogram()
+        self._ttfb = LatencyHistogram(TTFB_BOUNDS)
+
+    def begin(self, app_name, version, detected_at=None):
+        """ Deschide o propagare nouă și returnează identificatorul ei (inclus în notificări). """
+        trace_id = uuid.uuid4().hex[:16]
+        detected_at = time.monotonic() if detected_at is None else detected_at
+        with self._lock:
+            self._rollouts[trace_id] = {
+                'trace_id': trace_id,
+                'app_name': app_name,
+                'version': version,
+                'detected_wall': time.time() - (time.monotonic() - detected_at),
+                'detected_at': detected_at,
+                'clients': {},
+                'ttfb': LatencyHistogram(TTFB_BOUNDS)
+            }
+            while len(self._rollouts) > self.max_rollouts:
+                self._rollouts.popitem(last=False)
+        return trace_id
+
+    def mark(self, trace_id, client_key, stage, age=0.0):
+        """ Înregistrează o etapă pentru un client; doar prima apariție a fiecărei etape contează. """
+        if stage not in STAGES:
+            return False
+        happened_at = time.monotonic() - max(0.0, float(age or 0.0))
+        with self._lock:
+            rollout = self._rollouts.get(trace_id)
+            if rollout is None:
+                return False
+            client_stages = rollout['clients'].setdefault(client_key, {})
+            if stage in client_stages:
+                return True
+            offset = max(0.0, happened_at - rollout['detected_at'])
+            previous_offsets = [client_stages[s] for s in STAGES[:STAGES.index(stage)] if s in client_stages]
+            client_stages[stage] = offset
+            self._stage_histograms[stage].add(offset - max(previous_offsets) if previous_offsets else offset)
+            if stage == 'completed':
+                self._end_to_end.add(offset)
+        return True
+
+    def record_ttfb(self, trace_id, seconds):
+        """ Timpul serverului până la primul byte trimis pentru o descărcare; cu trace_id, intră și în
+        histograma propagării respective (prima val de cereri de după notificare). """
+        with self._lock:
+            self._ttfb.add(seconds)
+            rollout = self._rollouts.get(trace_id) if trace_id else None
+            if rollout is not None:
+                rollout['ttfb'].add(seconds)
+
+    def _summarize(self, rollout):
+        clients = rollout['clients']
+        targets = sum(1 for stages in clients.values() if 'notified' in stages)
+        completions = sorted(stages['completed'] for stages in clients.values() if 'completed' in stages)
+        return {
+            'trace_id': rollout['trace_id'],
+            'app_name': rollout['app_name'],
+            'version': rollout['version'],
+            'detected_at': rollout['detected_wall'],
+            'clients_notified': targets,
+            'clients_completed': len(completions),
+            # Curba de finalizare: [secunde de la detectare, fracțiunea clienților notificați care rulează noua versiune].
+            'completion_curve': [[offset, (index + 1) / targets if targets else None] for index, offset in enumerate(completions)],
+            'ttfb': rollout['ttfb'].to_dict(),
+            'stages_per_client': {key: dict(stages) for key, stages in clients.items()}
+        }
+
+    def stats(self, trace_id=None, limit=10):
+        with self._lock:
+            if trace_id is not None:
+                rollout = self._rollouts.get(trace_id)
+                rollouts = [self._summarize(rollout)] if rollout else []
+            else:
+                rollouts = [self._summarize(rollout) for rollout in list(self._rollouts.values())[-max(1, int(limit)):]]
+            return {
+                'stages': {stage: histogram.to_dict() for stage, histogram in self._stage_histograms.items()},
+                'end_to_end': self._end_to_end.to_dict(),
+                'download_ttfb': self._ttfb.to_dict(),
+                'rollouts': rollouts
+            }
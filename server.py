@@ -1,22 +1,287 @@
 import socket
+import signal
 import threading
 import os
 import json
 import time
-import shutil
+import struct
+import hashlib
+import hmac
+import collections
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from types import MappingProxyType
+
+from blobstore import BlobStore, FileChangedError
+from catalog_index import CatalogIndex, QueryError, load_app_metadata
+from profiler import MAX_PROFILE_SECONDS, ServerProfiler
+from rollout import RolloutTracker, CLIENT_STAGES
+from traffic_trace import TraceRecorder
+from fileops import clone_file, file_sha256, advise, warm_file
+from merkle import build_manifest, build_manifest_from_bytes, build_manifest_from_file, MAX_REPAIR_ROUNDS
+
+
+class AppCatalog:
+    """ Instantaneu imutabil al catalogului de aplicații.
+
+    Cititorii păstrează referința curentă fără blocare; scriitorii construiesc
+    generația următoare cu with_changes() și o publică prin atribuire atomică.
+    """
+
+    __slots__ = ('generation', '_apps')
+
+    def __init__(self, apps=None, generation=0):
+        frozen_apps = {}
+        for name, info in (apps or {}).items():
+            frozen_apps[name] = info if isinstance(info, MappingProxyType) else MappingProxyType(dict(info))
+        self.generation = generation
+        self._apps = MappingProxyType(frozen_apps)
+
+    def get(self, name, default=None):
+        return self._apps.get(name, default)
+
+    def items(self):
+        return self._apps.items()
+
+    def keys(self):
+        return self._apps.keys()
+
+    def __contains__(self, name):
+        return name in self._apps
+
+    def __iter__(self):
+        return iter(self._apps)
+
+    def __len__(self):
+        return len(self._apps)
+
+    def with_changes(self, updated=None, removed=()):
+        """ Returnează generația următoare; instantaneul curent rămâne neschimbat. """
+        if not updated and not removed:
+            return self
+        next_apps = dict(self._apps)
+        for name in removed:
+            next_apps.pop(name, None)
+        for name, info in (updated or {}).items():
+            next_apps[name] = info
+        return AppCatalog(next_apps, self.generation + 1)
+
+
+class AppsDirScanner:
+    """ Scanare incrementală a directorului de aplicații, bazată pe os.scandir.
+
+    Subdirectoarele devin spații de nume ('echipa/app.bin'); intrările ascunse ('.x') sunt ignorate.
+    Listarea unui director se refolosește cât timp mtime-ul lui nu s-a schimbat, iar o verificare
+    completă (care prinde și fișierele rescrise pe loc) se întinde pe mai multe treceri, câte
+    aproximativ full_rescan_budget intrări pe trecere.
+    """
+
+    def __init__(self, root, full_rescan_budget=2000):
+        self.root = root
+        self.full_rescan_budget = full_rescan_budget
+        self.entries = {}
+        self._dirs = {}
+        self._rescan_queue = collections.deque()
+        self._lock = threading.Lock()
+
+    def scan(self, full=False):
+        """ O trecere de scanare. Returnează (aplicații noi/modificate, nume eliminate). """
+        with self._lock:
+            if full:
+                forced_dirs = None
+            else:
+                if not self._rescan_queue:
+                    self._rescan_queue.extend(self._dirs.keys())
+                forced_dirs = set()
+                budget_used = 0
+                while self._rescan_queue and budget_used < self.full_rescan_budget:
+                    rel_dir = self._rescan_queue.popleft()
+                    forced_dirs.add(rel_dir)
+                    cached = self._dirs.get(rel_dir)
+                    budget_used += 1 + (len(cached['files']) if cached else 0)
+
+            changed, removed, seen_dirs = {}, set(), set()
+            root_mtime_ns = os.stat(self.root).st_mtime_ns
+            self._scan_dir('', self.root, root_mtime_ns, forced_dirs, changed, removed, seen_dirs)
+
+            for vanished_dir in [rel_dir for rel_dir in self._dirs if rel_dir not in seen_dirs]:
+                for app_name in self._dirs.pop(vanished_dir)['files']:
+                    self.entries.pop(app_name, None)
+                    removed.add(app_name)
+            return changed, removed
+
+    def current_entries(self):
+        with self._lock:
+            return dict(self.entries)
+
+    def restore_entries(self, entries):
+        """ Preia intrările dintr-un instantaneu salvat. Directoarele nu au mtime cunoscut,
+        deci prima scanare le listează pe toate și raportează diferențele față de instantaneu. """
+        with self._lock:
+            self.entries = {}
+            self._dirs = {}
+            self._rescan_queue.clear()
+            for app_name, app_info in entries.items():
+                self.entries[app_name] = {key: app_info[key] for key in ('name', 'path', 'version', 'size')}
+                rel_dir, _, _ = app_name.rpartition('/')
+                self._dir_state(rel_dir)['files'].add(app_name)
+                while rel_dir:
+                    parent_dir, _, sub_name = rel_dir.rpartition('/')
+                    parent_state = self._dir_state(parent_dir)
+                    if sub_name not in parent_state['subdirs']:
+                        parent_state['subdirs'].append(sub_name)
+                    rel_dir = parent_dir
+
+    def _dir_state(self, rel_dir):
+        return self._dirs.setdefault(rel_dir, {'mtime_ns': None, 'files': set(), 'subdirs': []})
+
+    def _scan_dir(self, rel_dir, abs_dir, dir_mtime_ns, forced_dirs, changed, removed, seen_dirs):
+        seen_dirs.add(rel_dir)
+        cached = self._dirs.get(rel_dir)
+        must_list = (cached is None or cached['mtime_ns'] != dir_mtime_ns
+                     or forced_dirs is None or rel_dir in forced_dirs)
+
+        if not must_list:
+            # Listarea e neschimbată, dar mtime-ul părintelui nu reflectă schimbările din subdirectoare.
+            for sub_name in cached['subdirs']:
+                sub_abs = os.path.join(abs_dir, sub_name)
+                try:
+                    sub_mtime_ns = os.stat(sub_abs).st_mtime_ns
+                except FileNotFoundError:
+                    continue
+                self._scan_dir(self._join(rel_dir, sub_name), sub_abs, sub_mtime_ns, forced_dirs, changed, removed, seen_dirs)
+            return
+
+        files = set()
+        subdirs = []
+        with os.scandir(abs_dir) as dir_entries:
+            for entry in dir_entries:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append((entry.name, entry.path, entry.stat(follow_symlinks=False).st_mtime_ns))
+                    elif entry.is_file():
+                        entry_stat = entry.stat()
+                        app_name = self._join(rel_dir, entry.name)
+                        files.add(app_name)
+                        previous = self.entries.get(app_name)
+                        if previous is None or previous['version'] != entry_stat.st_mtime or previous['size'] != entry_stat.st_size:
+                            app_info = {'name': app_name, 'path': entry.path, 'version': entry_stat.st_mtime, 'size': entry_stat.st_size}
+                            self.entries[app_name] = app_info
+                            changed[app_name] = app_info
+                except FileNotFoundError:
+                    continue
+                except OSError as e_entry:
+                    print(f"Eroare la scanarea intrării {entry.path}: {e_entry}")
+
+        if cached is not None:
+            for app_name in cached['files'] - files:
+                self.entries.pop(app_name, None)
+                removed.add(app_name)
+        self._dirs[rel_dir] = {'mtime_ns': dir_mtime_ns, 'files': files, 'subdirs': [name for name, _, _ in subdirs]}
+
+        for sub_name, sub_abs, sub_mtime_ns in subdirs:
+            self._scan_dir(self._join(rel_dir, sub_name), sub_abs, sub_mtime_ns, forced_dirs, changed, removed, seen_dirs)
+
+    @staticmethod
+    def _join(rel_dir, name):
+        return f"{rel_dir}/{name}" if rel_dir else name
+
+
+CATALOG_SNAPSHOT_FORMAT = 1
+SNAPSHOT_INTERVAL = 30.0
+HOST_CACHE_WAIT_TIMEOUT = 900.0
+ACK_TOKENS = (b'READY', b'WAIT', b'CACHED', b'DONE', b'FAILED')
+CHANGE_LOG_SIZE = 1024
+# Ritmul de reconectare cerut clienților după o oprire controlată: fereastra de jitter crește cu numărul lor.
+RECONNECTS_PER_SECOND = 100.0
+# Cât poate întârzia încălzirea page cache-ului notificările unei versiuni noi (0 o dezactivează).
+WARM_TIMEOUT = 5.0
+# Fișiere încălzite în paralel când o scanare găsește mai multe actualizări deodată.
+WARM_WORKERS = 4
+# Cât poate sta o conexiune fără nicio cerere înainte să fie închisă.
+CLIENT_IDLE_TIMEOUT = 300.0
+# Limitele eșantionării cerute prin profile_start (interval_ms).
+PROFILE_INTERVAL_MS = (1.0, 1000.0)
+# Comenzi care modifică serverul sau expun date interne: cer admin_token (APP_ADMIN_TOKEN).
+ADMIN_COMMANDS = frozenset(('publish_app', 'rollback_app', 'profile_start', 'profile_stop', 'profile_report', 'trace_start', 'trace_stop'))
 
 
 class ApplicationServer:
 
-    def __init__(self, host='localhost', port=5000):
+    def __init__(self, host='localhost', port=5000, data_dir='server_data', keep_versions=40, store_max_bytes=None, trace_path=None,
+                 drain_timeout=30.0, restart_retry_after=5.0, reconnect_rate=RECONNECTS_PER_SECOND, warm_timeout=WARM_TIMEOUT,
+                 admin_token=None):
         self.host = host
         self.port = port
-        self.applications = {}
+        self.data_dir = data_dir
+        self.drain_timeout = drain_timeout
+        self.restart_retry_after = restart_retry_after
+        self.reconnect_rate = reconnect_rate
+        self.warm_timeout = warm_timeout
+        # Fără token configurat, comenzile de administrare sunt refuzate.
+        self.admin_token = admin_token if admin_token is not None else os.environ.get('APP_ADMIN_TOKEN') or None
+        self.draining = False
+        self.server_socket = None
+        self.snapshot_path = os.path.join(data_dir, 'catalog_snapshot.json')
+        self._snapshot_generation = None
+        self._snapshot_saved_at = 0.0
+        self._snapshot_unverified = False
+        self.blob_store = BlobStore(os.path.join(data_dir, 'store'), keep_versions=keep_versions, max_bytes=store_max_bytes)
+        self.catalog = AppCatalog()
+        self.catalog_index = CatalogIndex()
+        self.catalog_write_lock = threading.Lock()
         self.client_download_versions = {}
         self.lock = threading.Lock()
         self.active_clients = {} 
+        self.manifest_cache = {}
+        self.store_worker = None
+        self.profiler = ServerProfiler()
+        self.rollouts = RolloutTracker()
+        # Ultimele actualizări notificate: (generație, aplicație, versiune, dimensiune, trace_id), pentru resume_session.
+        self.change_log = collections.deque(maxlen=CHANGE_LOG_SIZE)
+        self.recorder = None
+        self._session_io = threading.local()
+        if trace_path:
+            self.start_trace(trace_path)
+        self.manifest_lock = threading.Lock()
         self.stop_server_event = threading.Event()
-        self.load_applications()
+        self.scanner = AppsDirScanner('apps')
+        self.metadata_root = os.path.join('apps', '.metadata')
+        self.metadata_scanner = AppsDirScanner(self.metadata_root)
+        if not self._restore_catalog_snapshot():
+            self.load_applications()
+        self._change_log_start = self.catalog.generation
+
+    @property
+    def applications(self):
+        """ Generația curentă a catalogului (doar citire, fără blocare). """
+        return self.catalog
+
+    def _publish_catalog(self, updated=None, removed=()):
+        """ Publică o nouă generație a catalogului. Apelantul deține catalog_write_lock. """
+        new_catalog = self.catalog.with_changes(updated, removed)
+        if new_catalog is not self.catalog:
+            updated_names = list(updated or {})
+            self.catalog_index = self.catalog_index.with_changes(
+                {name: new_catalog.get(name) for name in updated_names}, list(removed),
+                {name: load_app_metadata(self.metadata_root, name) for name in updated_names})
+        self.catalog = new_catalog
+        return new_catalog
+
+    def _refresh_app_metadata(self):
+        """ Reindexează aplicațiile ale căror fișiere din apps/.metadata s-au schimbat. """
+        if not os.path.isdir(self.metadata_root):
+            return
+        changed_files, removed_files = self.metadata_scanner.scan()
+        changed_names = {file_name[:-len('.json')] for file_name in list(changed_files) + list(removed_files) if file_name.endswith('.json')}
+        if not changed_names:
+            return
+        with self.catalog_write_lock:
+            catalog = self.catalog
+            affected = {name: catalog.get(name) for name in changed_names if name in catalog}
+            self.catalog_index = self.catalog_index.with_changes(
+                affected, (), {name: load_app_metadata(self.metadata_root, name) for name in affected})
 
     def load_applications(self):
         apps_dir = 'apps'
@@ -24,74 +289,340 @@ class ApplicationServer:
             os.makedirs(apps_dir)
             print(f"Directorul '{apps_dir}' a fost creat.")
 
-        with self.lock:
-            newly_loaded_apps = {}
-            for file_name in os.listdir(apps_dir):
-                app_full_path = os.path.join(apps_dir, file_name)
-                if os.path.isfile(app_full_path):
-                    try:
-                        version = os.path.getmtime(app_full_path)
-                        newly_loaded_apps[file_name] = {
-                            'name': file_name,
-                            'path': app_full_path,
-                            'version': version
-                        }
-                        if file_name not in self.applications or self.applications[file_name]['version'] != version:
-                             print(f"Aplicație (re)încărcată/actualizată în listă: {file_name} (Versiune: {version})")
-                        self.applications[file_name] = newly_loaded_apps[file_name]
-                    except Exception as e:
-                        print(f"Eroare la încărcarea metadatelor pentru {file_name}: {e}")
-            current_app_files = set(newly_loaded_apps.keys())
-            apps_to_remove = []
-            for app_name_in_mem in self.applications.keys():
-                if app_name_in_mem not in current_app_files:
-                    apps_to_remove.append(app_name_in_mem)
+        self.scanner.scan(full=True)
+        disk_apps = self.scanner.current_entries()
+
+        with self.catalog_write_lock:
+            current_catalog = self.catalog
+            updated_apps = {}
+            for file_name, app_info in disk_apps.items():
+                current_info = current_catalog.get(file_name)
+                if current_info is None or current_info['version'] != app_info['version']:
+                    print(f"Aplicație (re)încărcată/actualizată în listă: {file_name} (Versiune: {app_info['version']})")
+                    updated_apps[file_name] = app_info
+            apps_to_remove = [name for name in current_catalog if name not in disk_apps]
             for app_to_remove in apps_to_remove:
                 print(f"Aplicația {app_to_remove} nu mai există în directorul 'apps'. Se elimină din listă.")
-                del self.applications[app_to_remove]
+            self._publish_catalog(updated_apps, apps_to_remove)
 
-    def _send_update_notifications(self, app_name, new_version, new_size):
-        clients_to_notify_sockets = []
-        if not self.active_clients:
-            print(f"Info Notificare ({app_name}): Niciun client activ pentru a notifica.")
+    def _restore_catalog_snapshot(self):
+        """ Pornire rapidă: catalogul salvat la oprire se servește imediat, iar verificatorul periodic
+        îl confruntă cu discul (mtime + dimensiune per fișier) în fundal. """
+        if not os.path.exists('apps'):
+            return False
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if snapshot.get('format') != CATALOG_SNAPSHOT_FORMAT or snapshot.get('apps_dir') != os.path.abspath(self.scanner.root):
+                print("Instantaneul catalogului nu corespunde acestui server. Se face scanarea completă.")
+                return False
+            apps = snapshot['apps']
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError) as e_snapshot:
+            print(f"Instantaneul catalogului nu poate fi citit ({e_snapshot}). Se face scanarea completă.")
+            return False
+
+        self.scanner.restore_entries(apps)
+        with self.catalog_write_lock:
+            self.catalog = AppCatalog(apps, snapshot.get('generation', 0))
+            self.catalog_index = CatalogIndex.build(apps, snapshot.get('metadata', {}))
+        self._snapshot_generation = self.catalog.generation
+        self._snapshot_unverified = True
+        print(f"Catalog încărcat din instantaneu: {len(apps)} aplicații (salvat la {time.ctime(snapshot.get('saved_at', 0))}). Verificarea pe disc continuă în fundal.")
+        return True
+
+    def _save_catalog_snapshot(self):
+        catalog = self.catalog
+        snapshot = {
+            'format': CATALOG_SNAPSHOT_FORMAT,
+            'apps_dir': os.path.abspath(self.scanner.root),
+            'generation': catalog.generation,
+            'saved_at': time.time(),
+            'apps': {name: dict(info) for name, info in catalog.items()},
+            'metadata': {name: dict(record['metadata']) for name, record in self.catalog_index.records.items() if record['metadata']}
+        }
+        os.makedirs(self.data_dir, exist_ok=True)
+        temp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError as e_snapshot:
+            print(f"Eroare la salvarea instantaneului catalogului: {e_snapshot}")
             return
+        self._snapshot_generation = catalog.generation
+        self._snapshot_saved_at = time.monotonic()
 
-        potential_recipients_count = 0
+    def _verify_restored_catalog(self):
+        started = time.perf_counter()
+        changed_apps, removed_apps = self.scanner.scan(full=True)
+        if changed_apps or removed_apps:
+            self._apply_scan_changes(changed_apps, removed_apps)
+        self._snapshot_unverified = False
+        print(f"Instantaneul catalogului verificat pe disc în {time.perf_counter() - started:.2f}s: "
+              f"{len(changed_apps)} aplicații modificate, {len(removed_apps)} eliminate între timp.")
 
-        for client_sock, client_data in list(self.active_clients.items()):
-            client_address = client_data['address']
-            current_client_app_versions = client_data['downloaded_app_versions']
-            client_downloaded_this_app_version = current_client_app_versions.get(app_name)
-            
-            potential_recipients_count += 1
+    @staticmethod
+    def _profile_options(request):
+        """ (duration, interval_ms) din cererea profile_start, sau None dacă lipsesc limitele sau nu sunt numere. """
+        try:
+            duration = float(request.get('duration', 30.0))
+            interval_ms = float(request.get('interval_ms', 5.0))
+        except (TypeError, ValueError):
+            return None
+        if not 0 < duration <= MAX_PROFILE_SECONDS or not PROFILE_INTERVAL_MS[0] <= interval_ms <= PROFILE_INTERVAL_MS[1]:
+            return None
+        return duration, interval_ms
+
+    @staticmethod
+    def _valid_versions(versions):
+        """ {aplicație: versiune} trimis de client, fără intrările cu nume sau versiuni de alt tip. """
+        if not isinstance(versions, dict):
+            return {}
+        return {name: version for name, version in versions.items()
+                if isinstance(name, str) and isinstance(version, (int, float)) and not isinstance(version, bool)}
+
+    def _register_announced_versions(self, client_socket, address, versions):
+        announced = self._valid_versions(versions)
+        with self.lock:
+            session = self.active_clients.get(client_socket)
+            if session is not None:
+                session['downloaded_app_versions'].update(announced)
+            self.client_download_versions.setdefault(address, {}).update(announced)
+        return announced
+
+    def _resume_session(self, client_socket, address, request):
+        """ Un client reconectat redeclară ce are instalat și primește notificările pierdute între timp.
+
+        Orice aplicație instalată pentru care catalogul are o versiune mai nouă produce o notificare.
+        Dacă actualizarea apare în change_log după ultima generație văzută de client, notificarea
+        păstrează trace_id-ul propagării inițiale. log_complete spune dacă jurnalul acoperă tot
+        intervalul (altfel, de ex. după o repornire fără snapshot, s-a comparat doar pe versiuni).
+        """
+        announced = self._register_announced_versions(client_socket, address, request.get('versions'))
+        last_generation = request.get('last_generation')
+        catalog = self.catalog
+        with self.lock:
+            changes = list(self.change_log)
+        covered_from = changes[0][0] if len(changes) == CHANGE_LOG_SIZE else self._change_log_start
+        log_complete = isinstance(last_generation, int) and covered_from <= last_generation <= catalog.generation
+        trace_ids = {}
+        if isinstance(last_generation, int):
+            for generation, app_name, version, _, trace_id in changes:
+                if generation >= last_generation:
+                    trace_ids[(app_name, version)] = trace_id
+
+        missed = []
+        client_key = self._rollout_key(client_socket, address)
+        for app_name, installed_version in sorted(announced.items()):
+            app_info = catalog.get(app_name)
+            if app_info is None or app_info['version'] <= installed_version:
+                continue
+            trace_id = trace_ids.get((app_name, app_info['version']))
+            if trace_id:
+                self.rollouts.mark(trace_id, client_key, 'notified')
+            missed.append({'type': 'force_delete_then_redownload', 'app_name': app_name, 'version': app_info['version'],
+                           'size': app_info['size'], 'trace_id': trace_id, 'generation': catalog.generation})
+        if missed:
+            print(f"Clientul {address} a reluat sesiunea (generația {last_generation} -> {catalog.generation}); {len(missed)} actualizări pierdute.")
+        return {'status': 'success', 'generation': catalog.generation, 'missed': missed, 'log_complete': log_complete}
+
+    def _rollout_key(self, client_socket, address):
+        """ Cheia clientului în propagări: client_id-ul declarat de client (același după reconectări și pe
+        conexiunile lui de lucru); ip:port doar pentru clienții care nu îl trimit. """
+        with self.lock:
+            session = self.active_clients.get(client_socket)
+            client_id = session.get('client_id') if session is not None else None
+        return client_id or f"{address[0]}:{address[1]}"
 
+    def _send_update_notifications(self, app_name, new_version, new_size, detected_at=None, warm=True):
+        generation = self.catalog.generation
+        with self.lock:
+            recipients = [
+                (client_sock, client_data['address'], client_data['downloaded_app_versions'].get(app_name))
+                for client_sock, client_data in self.active_clients.items()
+            ]
+
+        clients_to_notify = []
+        for client_sock, client_address, client_downloaded_this_app_version in recipients:
             if client_downloaded_this_app_version is not None:
                 if client_downloaded_this_app_version < new_version:
                     print(f"Info Notificare ({app_name}): Clientul {client_address} (v{client_downloaded_this_app_version}) necesită actualizare forțată la v{new_version}. Se adaugă la lista de notificare.")
-                    clients_to_notify_sockets.append(client_sock)
+                    clients_to_notify.append((client_sock, client_address))
                 else:
                     print(f"Info Notificare ({app_name}): Clientul {client_address} (v{client_downloaded_this_app_version}) are deja versiunea {new_version} sau mai nouă. Nu se notifică.")
             else:
                  print(f"Info Notificare ({app_name}): Clientul {client_address} nu a descărcat anterior această aplicație. Nu se notifică pentru actualizare.")
-        
-        if not clients_to_notify_sockets:
-            print(f"Info Notificare ({app_name}): Din {potential_recipients_count} clienți activi, niciunul nu necesită notificare pentru această actualizare forțată.")
+
+        # O propagare fără destinatari ar scoate din istoricul limitat propagări reale.
+        trace_id = self.rollouts.begin(app_name, new_version, detected_at) if clients_to_notify else None
+        with self.lock:
+            self.change_log.append((generation, app_name, new_version, new_size, trace_id))
+        if not recipients:
+            print(f"Info Notificare ({app_name}): Niciun client activ pentru a notifica.")
+            return
+        if not clients_to_notify:
+            print(f"Info Notificare ({app_name}): Din {len(recipients)} clienți activi, niciunul nu necesită notificare pentru această actualizare forțată.")
             return
 
         notification_message = {
             'type': 'force_delete_then_redownload',
             'app_name': app_name,
             'version': new_version,
-            'size': new_size
+            'size': new_size,
+            'trace_id': trace_id,
+            'generation': generation
         }
-        print(f"Info Notificare ({app_name}): Se notifică {len(clients_to_notify_sockets)} clienți pentru actualizare forțată...")
-        for sock_to_notify in clients_to_notify_sockets:
-            notify_addr_str = str(self.active_clients.get(sock_to_notify, {}).get('address', 'Adresă necunoscută'))
+        if warm:
+            self._warm_published_file(app_name, new_version)
+        print(f"Info Notificare ({app_name}): Se notifică {len(clients_to_notify)} clienți pentru actualizare forțată...")
+        for sock_to_notify, notify_address in clients_to_notify:
             try:
                 self._send_json_response(sock_to_notify, notification_message)
-                print(f"Notificare de actualizare forțată pentru {app_name} trimisă clientului {notify_addr_str}")
+                self.rollouts.mark(trace_id, self._rollout_key(sock_to_notify, notify_address), 'notified')
+                print(f"Notificare de actualizare forțată pentru {app_name} trimisă clientului {notify_address}")
             except Exception as e_notify:
-                print(f"Eroare la trimiterea notificării de update forțat către {notify_addr_str}: {e_notify}")
+                print(f"Eroare la trimiterea notificării de update forțat către {notify_address}: {e_notify}")
+
+    def _has_notification_targets(self, app_name, new_version):
+        with self.lock:
+            return any(client_data['downloaded_app_versions'].get(app_name) is not None
+                       and client_data['downloaded_app_versions'][app_name] < new_version
+                       for client_data in self.active_clients.values())
+
+    def _notify_after_warming(self, app_infos, detected_at=None):
+        """ Notificările unei treceri de scanare. Fișierele care au destinatari se încălzesc în paralel,
+        toate în același termen (warm_timeout pe trecere, nu pe aplicație), iar fiecare aplicație se
+        notifică imediat ce fișierul ei e cald, fără să aștepte după celelalte. """
+        to_warm = []
+        for app_info in app_infos:
+            if self.warm_timeout and self._has_notification_targets(app_info['name'], app_info['version']):
+                to_warm.append(app_info)
+            else:
+                self._send_update_notifications(app_info['name'], app_info['version'], app_info['size'], detected_at, warm=False)
+        if not to_warm:
+            return
+        deadline = time.monotonic() + self.warm_timeout
+        with ThreadPoolExecutor(max_workers=min(WARM_WORKERS, len(to_warm)), thread_name_prefix="PageCacheWarm") as pool:
+            futures = {pool.submit(self._warm_published_file, app_info['name'], app_info['version'], deadline): app_info
+                       for app_info in to_warm}
+            for future in as_completed(futures):
+                app_info = futures[future]
+                self._send_update_notifications(app_info['name'], app_info['version'], app_info['size'], detected_at, warm=False)
+
+    def _warm_published_file(self, app_name, version, deadline=None):
+        """ Prima val de download_app vine imediat după notificări; fișierul se aduce în page cache înainte,
+        ca cererile să nu citească toate, în paralel, de pe un disc rece. Cu deadline (ceas monoton),
+        încălzirea se oprește la termenul comun al trecerii. """
+        app_info = self.catalog.get(app_name)
+        if not self.warm_timeout or not app_info or app_info['version'] != version:
+            return
+        timeout = self.warm_timeout if deadline is None else deadline - time.monotonic()
+        if timeout <= 0:
+            return
+        started = time.perf_counter()
+        try:
+            warmed_bytes = warm_file(app_info['path'], timeout)
+        except OSError as e_warm:
+            print(f"Page cache: {app_name} nu a putut fi încălzit: {e_warm}")
+            return
+        print(f"Page cache: {app_name} v{version} încălzit înainte de notificări "
+              f"({warmed_bytes}/{app_info['size']} bytes în {(time.perf_counter() - started) * 1000:.1f} ms).")
+
+    def _store_versions(self, app_infos):
+        """ Salvează versiunile în depozitul de blob-uri; returnează intrările de catalog cu rădăcina manifestului atașată. """
+        stored_apps = {}
+        for app_info in app_infos:
+            app_name = app_info['name']
+            try:
+                manifest, new_bytes = self.blob_store.ingest(app_name, app_info['path'], app_info['version'],
+                                                             expected_size=app_info['size'], expected_mtime=app_info['version'])
+            except FileNotFoundError:
+                continue
+            except FileChangedError:
+                print(f"Depozit: {app_name} s-a modificat în timpul citirii; versiunea va fi salvată la următoarea scanare.")
+                continue
+            except Exception as e_store:
+                print(f"Depozit: Eroare la salvarea {app_name} (v{app_info['version']}): {e_store}")
+                continue
+            with self.manifest_lock:
+                self.manifest_cache[app_name] = (app_info['version'], manifest)
+            stored_apps[app_name] = dict(app_info, manifest_root=manifest['root'])
+            if new_bytes:
+                print(f"Depozit: {app_name} v{app_info['version']} salvat ({new_bytes} bytes noi din {manifest['size']}).")
+                self.blob_store.drop_superseded(app_name, manifest)
+        return stored_apps
+
+    def _apply_store_retention(self, app_names):
+        protected_versions = {name: info['version'] for name, info in self.catalog.items()}
+        removed_versions, freed_bytes = self.blob_store.apply_retention(protected_versions, app_names=app_names)
+        if removed_versions:
+            print(f"Depozit: {removed_versions} versiuni vechi eliminate, {freed_bytes} bytes eliberați.")
+
+    def _submit_store(self, app_infos=None):
+        """ Salvarea în depozit citește și copiază fișierele complet, așa că rulează pe thread-ul de fundal
+        al depozitului, după ce catalogul a fost publicat și clienții notificați. """
+        worker = self.store_worker
+        if worker is None:
+            self._store_current_versions(app_infos)
+            return
+        try:
+            worker.submit(self._store_current_versions, app_infos)
+        except RuntimeError:
+            pass  # serverul se oprește; versiunile rămase se completează la următoarea pornire
+
+    def _store_current_versions(self, app_infos=None):
+        """ Salvează versiunile în depozit și atașează rădăcina manifestului celor încă publicate.
+        Fără app_infos completează versiunile curente care nu au încă manifest (de ex. la pornire). """
+        backfill = app_infos is None
+        if backfill:
+            app_infos = [dict(info) for _, info in self.catalog.items() if 'manifest_root' not in info]
+        try:
+            stored_apps = self._store_versions(app_infos)
+            if stored_apps:
+                with self.catalog_write_lock:
+                    current_catalog = self.catalog
+                    still_current = {name: info for name, info in stored_apps.items()
+                                     if name in current_catalog and current_catalog.get(name)['version'] == info['version']}
+                    self._publish_catalog(still_current)
+                if backfill:
+                    print(f"Depozit: {len(still_current)} versiuni curente înregistrate în istoric.")
+            if not backfill and app_infos:
+                self._apply_store_retention([app_info['name'] for app_info in app_infos])
+        except Exception as e_store:
+            print(f"Depozit: Eroare la salvarea versiunilor în fundal: {e_store}")
+
+    def _apply_scan_changes(self, changed_apps, removed_apps):
+        detected_at = time.monotonic()
+        pending_notifications = []
+        with self.catalog_write_lock:
+            current_catalog = self.catalog
+            updated_apps = {}
+            for app_name, disk_app_info in changed_apps.items():
+                mem_app_info = current_catalog.get(app_name)
+                if mem_app_info is not None:
+                    if disk_app_info['version'] > mem_app_info['version']:
+                        print(f"Cron: Actualizare detectată pentru {app_name}. Versiune server: {mem_app_info['version']} -> {disk_app_info['version']}")
+                        updated_apps[app_name] = disk_app_info
+                        pending_notifications.append(disk_app_info)
+                    elif disk_app_info['version'] != mem_app_info['version'] or disk_app_info['size'] != mem_app_info['size']:
+                        print(f"Cron: Fișierul {app_name} s-a schimbat fără o versiune mai nouă ({disk_app_info['version']}). Se actualizează catalogul fără notificare.")
+                        updated_apps[app_name] = disk_app_info
+                else:
+                    print(f"Cron: Aplicație nouă detectată și adăugată: {app_name} (Versiune: {disk_app_info['version']})")
+                    print(f"Cron: Aplicația {app_name} este nouă/înlocuită pe disc. Se verifică dacă este o actualizare pentru clienți...")
+                    updated_apps[app_name] = disk_app_info
+                    pending_notifications.append(disk_app_info)
+
+            apps_to_remove_from_memory = [name for name in removed_apps if name in current_catalog]
+            for app_to_remove in apps_to_remove_from_memory:
+                print(f"Cron: Aplicația {app_to_remove} a fost ștearsă din director. Se elimină din memoria serverului.")
+            self._publish_catalog(updated_apps, apps_to_remove_from_memory)
+
+        self._notify_after_warming(pending_notifications, detected_at)
+        if changed_apps:
+            self._submit_store(list(changed_apps.values()))
 
     def _periodic_app_update_checker(self):
         print("Monitorizare periodică a actualizărilor de aplicații pornită (verificare la 2 secunde).")
@@ -100,59 +631,26 @@ class ApplicationServer:
             print(f"EROARE CRITICĂ: Directorul '{apps_dir}' nu există. Monitorizarea actualizărilor nu poate funcționa.")
             return
 
-        while not self.stop_server_event.is_set():
+        if self._snapshot_unverified:
             try:
-                current_disk_apps = {}
-                for file_name in os.listdir(apps_dir):
-                    app_full_path = os.path.join(apps_dir, file_name)
-                    if os.path.isfile(app_full_path):
-                        try:
-                            current_disk_apps[file_name] = {
-                                'path': app_full_path,
-                                'version': os.path.getmtime(app_full_path),
-                                'size': os.path.getsize(app_full_path)
-                            }
-                        except FileNotFoundError:
-                            continue 
-                        except Exception as e_scan:
-                            print(f"Eroare la scanarea fișierului {file_name} în cron: {e_scan}")
-                            continue
-                
-                with self.lock:
-                    for app_name, disk_app_info in current_disk_apps.items():
-                        current_disk_version = disk_app_info['version']
-                        current_disk_size = disk_app_info['size']
-                        
-                        if app_name in self.applications:
-                            if current_disk_version > self.applications[app_name]['version']:
-                                old_mem_version = self.applications[app_name]['version']
-                                self.applications[app_name]['version'] = current_disk_version
-                                self.applications[app_name]['path'] = disk_app_info['path']
-                                print(f"Cron: Actualizare detectată pentru {app_name}. Versiune server: {old_mem_version} -> {current_disk_version}")
-                                self._send_update_notifications(app_name, current_disk_version, current_disk_size)
-                        else:
-                            self.applications[app_name] = disk_app_info.copy()
-                            newly_added_version = disk_app_info['version']
-                            newly_added_size = disk_app_info['size']
-                            print(f"Cron: Aplicație nouă detectată și adăugată: {app_name} (Versiune: {newly_added_version})")
-                            print(f"Cron: Aplicația {app_name} este nouă/înlocuită pe disc. Se verifică dacă este o actualizare pentru clienți...")
-                            self._send_update_notifications(app_name, newly_added_version, newly_added_size)
-
-                    app_names_on_disk = set(current_disk_apps.keys())
-                    apps_to_remove_from_memory = []
-                    for mem_app_name in self.applications.keys():
-                        if mem_app_name not in app_names_on_disk:
-                            apps_to_remove_from_memory.append(mem_app_name)
-                    
-                    for app_to_remove in apps_to_remove_from_memory:
-                        print(f"Cron: Aplicația {app_to_remove} a fost ștearsă din director. Se elimină din memoria serverului.")
-                        del self.applications[app_to_remove]
+                self._verify_restored_catalog()
+            except Exception as e_verify:
+                print(f"Eroare la verificarea instantaneului catalogului: {e_verify}")
 
+        self._submit_store()
 
+        while not self.stop_server_event.is_set():
+            try:
+                changed_apps, removed_apps = self.scanner.scan()
+                if changed_apps or removed_apps:
+                    self._apply_scan_changes(changed_apps, removed_apps)
+                self._refresh_app_metadata()
+                if self.catalog.generation != self._snapshot_generation and time.monotonic() - self._snapshot_saved_at >= SNAPSHOT_INTERVAL:
+                    self._save_catalog_snapshot()
             except Exception as e_cron_loop:
                 print(f"Eroare în bucla de monitorizare actualizări aplicații: {e_cron_loop}")
             
-            time.sleep(2)
+            self.stop_server_event.wait(2)
         print("Monitorizare periodică a actualizărilor de aplicații oprită.")
 
     def start(self):
@@ -160,22 +658,28 @@ class ApplicationServer:
         server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         server_socket.bind((self.host, self.port))
         server_socket.listen(5)
+        self.server_socket = server_socket
         print(f"Server pornit pe {self.host}:{self.port}. Apăsați Ctrl+C pentru a opri.")
+        if not self.admin_token:
+            print("APP_ADMIN_TOKEN nu este setat: comenzile de administrare (publish, rollback, profile, trace) sunt dezactivate.")
 
         self.stop_server_event.clear()
+        self.draining = False
+        self.store_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="BlobStore")
         checker_thread = threading.Thread(target=self._periodic_app_update_checker, name="AppUpdateChecker")
         checker_thread.daemon = True
         checker_thread.start()
 
         try:
-            while True:
+            while not self.stop_server_event.is_set():
                 client_socket, address = server_socket.accept()
                 print(f"Nouă conexiune de la {address}")
                 with self.lock:
                     previous_downloads_for_address = self.client_download_versions.get(address, {})
                     self.active_clients[client_socket] = {
                         'address': address,
-                        'downloaded_app_versions': previous_downloads_for_address.copy() 
+                        'downloaded_app_versions': previous_downloads_for_address.copy(),
+                        'busy': False
                     }
                 client_thread = threading.Thread(target=self.handle_client, args=(client_socket, address))
                 client_thread.daemon = True
@@ -183,28 +687,208 @@ class ApplicationServer:
         except KeyboardInterrupt:
             print("Serverul se oprește (Ctrl+C primit)...")
         except Exception as e:
-            print(f"Eroare la acceptarea conexiunii: {e}")
+            if not self.stop_server_event.is_set():
+                print(f"Eroare la acceptarea conexiunii: {e}")
         finally:
             print("Se oprește monitorizarea actualizărilor și se închide serverul...")
             self.stop_server_event.set()
+            server_socket.close()
+            print("Socket-ul serverului a fost închis. Nu se mai acceptă conexiuni noi.")
+            self._drain_clients()
             if 'checker_thread' in locals() and checker_thread.is_alive():
                 checker_thread.join(timeout=5)
-            server_socket.close()
-            print("Socket-ul serverului a fost închis.")
+            # Salvările neîncepute se abandonează; versiunile fără manifest se completează la pornire.
+            self.store_worker.shutdown(wait=False, cancel_futures=True)
+            self._save_catalog_snapshot()
+            print("Instantaneul catalogului a fost salvat.")
+
+    def stop(self):
+        """ Oprire controlată din alt thread (sau din handler-ul SIGTERM): închide socket-ul de ascultare, iar start() face drenarea. """
+        self.stop_server_event.set()
+        if self.server_socket is not None:
+            try:
+                self.server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.server_socket.close()
+
+    def _shutdown_notice(self):
+        return {
+            'type': 'server_shutdown',
+            'status': 'error',
+            'message': 'Serverul se oprește pentru repornire. Reconectați-vă după retry_after secunde.',
+            'retry_after': self.restart_retry_after,
+            # Fiecare client alege un moment aleator în fereastra asta, ca reconectările să nu vină toate odată.
+            'retry_jitter': max(1.0, len(self.active_clients) / self.reconnect_rate)
+        }
+
+    def _drain_clients(self):
+        """ Clienții inactivi primesc imediat server_shutdown; transferurile în curs au la dispoziție
+        drain_timeout secunde să se termine, după care conexiunile rămase se închid forțat. """
+        self.draining = True
+        deadline = time.monotonic() + self.drain_timeout
+        with self.lock:
+            idle_sockets = [sock for sock, data in self.active_clients.items() if not data['busy']]
+            busy_count = len(self.active_clients) - len(idle_sockets)
+        for client_socket in idle_sockets:
+            self._send_json_response(client_socket, self._shutdown_notice())
+            try:
+                client_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if busy_count:
+            print(f"Se așteaptă finalizarea a {busy_count} cereri în curs (max {self.drain_timeout:.0f}s)...")
+
+        while time.monotonic() < deadline:
+            with self.lock:
+                remaining_sockets = list(self.active_clients)
+            if not remaining_sockets:
+                print("Toți clienții au fost deconectați.")
+                return
+            time.sleep(0.1)
+
+        print(f"Termenul de drenare a expirat. Se închid forțat {len(remaining_sockets)} conexiuni.")
+        for client_socket in remaining_sockets:
+            try:
+                client_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _note_sent(self, byte_count):
+        if self.recorder is not None:
+            self._session_io.bytes_out = getattr(self._session_io, 'bytes_out', 0) + byte_count
+
+    def start_trace(self, trace_path):
+        """ Pornește înregistrarea traficului (sesiuni, comenzi, dimensiuni, durate) pentru replay.py. """
+        if self.recorder is not None:
+            return {'status': 'error', 'message': f'Înregistrarea este deja activă în {self.recorder.path}.'}
+        os.makedirs(os.path.dirname(trace_path) or '.', exist_ok=True)
+        self.recorder = TraceRecorder(trace_path)
+        print(f"Înregistrare trafic pornită în {trace_path}.")
+        return {'status': 'success', 'path': trace_path}
+
+    def stop_trace(self):
+        recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return {'status': 'error', 'message': 'Înregistrarea nu este activă.'}
+        recorder.close()
+        print(f"Înregistrare trafic oprită ({recorder.path}).")
+        return {'status': 'success', 'path': recorder.path}
 
     def _send_json_response(self, client_socket, data_dict):
         """ Trimite un răspuns JSON către client. """
         try:
-            client_socket.sendall(json.dumps(data_dict).encode('utf-8'))
+            response_bytes = json.dumps(data_dict).encode('utf-8')
+            client_socket.sendall(response_bytes)
+            self._note_sent(len(response_bytes))
         except Exception as e:
             print(f"Eroare la trimiterea răspunsului JSON: {e}")
 
+    def _admin_authorized(self, request):
+        provided = request.get('admin_token')
+        if not self.admin_token or not isinstance(provided, str):
+            return False
+        return hmac.compare_digest(provided.encode('utf-8'), self.admin_token.encode('utf-8'))
+
+    def _dispatch_command(self, client_socket, address, request, command):
+        if command in ADMIN_COMMANDS and not self._admin_authorized(request):
+            print(f"Comanda de administrare '{command}' de la {address} a fost refuzată (token lipsă sau invalid).")
+            self._send_json_response(client_socket, {'status': 'error', 'message': f'Comanda {command} necesită un token de administrare valid.'})
+            return
+
+        if command == 'list_apps':
+            catalog = self.catalog
+            apps_list = [{'name': name, 'version': data['version']} for name, data in catalog.items()]
+            self._send_json_response(client_socket, {'status': 'success', 'apps': apps_list})
+
+        elif command == 'announce_versions':
+            # Un client (re)conectat declară ce are instalat, ca notificările de actualizare să îl includă.
+            announced = self._register_announced_versions(client_socket, address, request.get('versions'))
+            catalog = self.catalog
+            outdated = sorted(name for name, version in announced.items() if name in catalog and catalog.get(name)['version'] > version)
+            self._send_json_response(client_socket, {'status': 'success', 'outdated': outdated})
+
+        elif command == 'resume_session':
+            self._send_json_response(client_socket, self._resume_session(client_socket, address, request))
+
+        elif command == 'query_apps':
+            index = self.catalog_index
+            try:
+                records, next_cursor = index.query(request)
+            except (QueryError, ValueError, TypeError) as e_query:
+                self._send_json_response(client_socket, {'status': 'error', 'message': f'Interogare invalidă: {e_query}'})
+                return
+            apps_list = [{'name': record['name'], 'version': record['version'], 'size': record['size'], 'tags': list(record['tags']),
+                          'platform': record['platform'], 'metadata': dict(record['metadata'])} for record in records]
+            self._send_json_response(client_socket, {'status': 'success', 'apps': apps_list, 'next_cursor': next_cursor,
+                                                     'indexed': len(index.records)})
+
+        elif command == 'download_app':
+            self._handle_download_app(client_socket, address, request)
+
+        elif command == 'download_bundle':
+            self._handle_download_bundle(client_socket, address, request)
+
+        elif command == 'list_versions':
+            app_name = request.get('app_name')
+            if not self._is_valid_app_name(app_name):
+                self._send_json_response(client_socket, {'status': 'error', 'message': 'Cerere list_versions invalidă (app_name).'})
+                return
+            versions = [{'version': m['version'], 'size': m['size'], 'root': m['root'], 'stored_at': m['stored_at']}
+                        for m in self.blob_store.versions(app_name)]
+            self._send_json_response(client_socket, {'status': 'success', 'app_name': app_name, 'versions': versions})
+
+        elif command == 'publish_app':
+            self._handle_publish_app(client_socket, address, request)
+
+        elif command == 'rollback_app':
+            self._send_json_response(client_socket, self.rollback_application(request.get('app_name'), request.get('version')))
+
+        elif command == 'profile_start':
+            options = self._profile_options(request)
+            if options is None:
+                self._send_json_response(client_socket, {'status': 'error', 'message':
+                    f'Cerere profile_start invalidă: duration în (0, {MAX_PROFILE_SECONDS:.0f}] s, '
+                    f'interval_ms în [{PROFILE_INTERVAL_MS[0]:.0f}, {PROFILE_INTERVAL_MS[1]:.0f}].'})
+                return
+            duration, interval_ms = options
+            self._send_json_response(client_socket, self.profiler.start(
+                duration=duration, interval=interval_ms / 1000.0, trace_memory=bool(request.get('memory'))))
+
+        elif command == 'trace_start':
+            trace_name = os.path.basename(str(request.get('name') or f"trace_{int(time.time())}"))
+            self._send_json_response(client_socket, self.start_trace(os.path.join(self.data_dir, 'traces', trace_name + '.trace')))
+
+        elif command == 'trace_stop':
+            self._send_json_response(client_socket, self.stop_trace())
+
+        elif command == 'trace_event':
+            stage = request.get('stage')
+            if stage not in CLIENT_STAGES or not self.rollouts.mark(request.get('trace_id'), self._rollout_key(client_socket, address), stage, request.get('age', 0.0)):
+                self._send_json_response(client_socket, {'status': 'error', 'message': 'Propagare sau etapă necunoscută.'})
+            else:
+                self._send_json_response(client_socket, {'status': 'success'})
+
+        elif command == 'rollout_stats':
+            stats = self.rollouts.stats(request.get('trace_id'), request.get('limit', 10))
+            self._send_json_response(client_socket, dict(stats, status='success'))
+
+        elif command in ('profile_stop', 'profile_report'):
+            report = self.profiler.stop() if command == 'profile_stop' else self.profiler.report()
+            response = {'status': 'success', 'report': report}
+            if report is not None and request.get('dump'):
+                response['dump_path'] = self.profiler.dump(os.path.join(self.data_dir, 'profiles'))
+            self._send_json_response(client_socket, response)
+        else:
+            self._send_json_response(client_socket, {'status': 'error', 'message': f'Comanda {command} este necunoscută.'})
+
     def handle_client(self, client_socket, address):
         print(f"Manipulare client {address}")
+        trace_session = (self.recorder, self.recorder.open_session()) if self.recorder is not None else (None, None)
         try:
             while True:
-                client_socket.settimeout(300.0)
-                data_received_bytes = client_socket.recv(4096)
+                client_socket.settimeout(CLIENT_IDLE_TIMEOUT)
+                data_received_bytes = self._take_pending_input() or client_socket.recv(4096)
                 if not data_received_bytes:
                     print(f"Clientul {address} s-a deconectat (nu s-au primit date).")
                     break
@@ -213,6 +897,8 @@ class ApplicationServer:
                 try:
                     request_str = data_received_bytes.decode('utf-8')
                     request = json.loads(request_str)
+                    if isinstance(request, dict) and 'admin_token' in request:
+                        request_str = json.dumps(dict(request, admin_token='***'))
                     print(f"Cerere JSON primită de la {address}: {request_str}")
                 except (json.JSONDecodeError, UnicodeDecodeError) as e:
                     print(f"Eroare la decodarea cererii JSON de la {address}: {e}. Date: {data_received_bytes!r}")
@@ -222,72 +908,40 @@ class ApplicationServer:
                 command = request.get('command')
                 print(f"Comanda '{command}' primită de la {address}.")
 
-                if command == 'list_apps':
-                    with self.lock:
-                        apps_list = [{'name': name, 'version': data['version']} for name, data in self.applications.items()]
-                    self._send_json_response(client_socket, {'status': 'success', 'apps': apps_list})
-
-                elif command == 'download_app':
-                    app_name = request.get('app_name')
-                    app_info = None
-                    with self.lock:
-                        app_info_candidate = self.applications.get(app_name)
-                        if app_info_candidate:
-                             app_info = app_info_candidate.copy()
-
-                    if app_info:
-                        app_file_path = app_info['path']
-                        current_app_version = app_info['version'] # This is the timestamp
-                        try:
-                            with open(app_file_path, 'rb') as f:
-                                app_data = f.read()
-
-                            metadata = {
-                                'status': 'success',
-                                'app_name': app_name,
-                                'version': current_app_version,
-                                'size': len(app_data)
-                            }
-                            self._send_json_response(client_socket, metadata)
-
-                            client_socket.settimeout(60.0)
-                            ack = client_socket.recv(1024).decode('utf-8', errors='ignore')
-                            client_socket.settimeout(None)
-
-                            if ack == 'READY':
-                                print(f"Clientul {address} este gata. Se trimite {app_name} (v{current_app_version}, {len(app_data)} bytes)...")
-                                client_socket.sendall(app_data)
-                                print(f"Fișierul {app_name} trimis complet către {address}.")
-
-                                client_socket.settimeout(60.0)
-                                final_ack = client_socket.recv(1024).decode('utf-8', errors='ignore')
-                                client_socket.settimeout(None)
-
-                                if final_ack == 'DONE':
-                                    with self.lock:
-                                        self.client_download_versions.setdefault(address, {})[app_name] = current_app_version
-                                        
-                                        if client_socket in self.active_clients:
-                                            self.active_clients[client_socket]['downloaded_app_versions'][app_name] = current_app_version
-                                    print(f"Transferul pentru {app_name} (v{current_app_version}) către {address} confirmat de client.")
-                                else:
-                                    print(f"Confirmare finală ('{final_ack}') invalidă de la {address} pentru {app_name}.")
-                            else:
-                                print(f"Clientul {address} nu a trimis 'READY' pentru {app_name}. Răspuns: '{ack}'.")
-                        except FileNotFoundError:
-                            print(f"Eroare server: Fișierul {app_file_path} negăsit pentru {app_name}.")
-                            self._send_json_response(client_socket, {'status': 'error', 'message': f'Fișierul {app_name} nu există.'})
-                        except socket.timeout as ste:
-                            print(f"Server: Timeout în transfer cu {address} pentru {app_name}: {ste}")
-                        except Exception as e_file_transfer:
-                            print(f"Server: Eroare la transferul {app_name} către {address}: {e_file_transfer}")
-                            try:
-                                self._send_json_response(client_socket, {'status': 'error', 'message': f'Eroare server la transfer: {str(e_file_transfer)}'})
-                            except Exception: pass # Avoid error cascades if sending error fails
-                    else:
-                        self._send_json_response(client_socket, {'status': 'error', 'message': f'Aplicația {app_name} nu a fost găsită.'})
+                with self.lock:
+                    draining = self.draining
+                    client_data = self.active_clients.get(client_socket)
+                    if client_data is not None and not draining:
+                        client_data['busy'] = True
+                    if client_data is not None and isinstance(request.get('client_id'), str):
+                        client_data['client_id'] = request['client_id'][:128]
+                if draining:
+                    print(f"Serverul se oprește: comanda '{command}' de la {address} este refuzată.")
+                    self._send_json_response(client_socket, self._shutdown_notice())
+                    break
+
+                recorder = self.recorder
+                if recorder is not None:
+                    self._session_io.bytes_out = 0
+                    command_started = time.perf_counter()
+                if self.profiler.active:
+                    self.profiler.timed_command(command, self._dispatch_command, client_socket, address, request, command)
                 else:
-                    self._send_json_response(client_socket, {'status': 'error', 'message': f'Comanda {command} este necunoscută.'})
+                    self._dispatch_command(client_socket, address, request, command)
+                if recorder is not None:
+                    if trace_session[0] is not recorder:
+                        trace_session = (recorder, recorder.open_session())
+                    recorder.record_request(trace_session[1], command, request.get('app_name'), len(data_received_bytes),
+                                            self._session_io.bytes_out, time.perf_counter() - command_started)
+
+                with self.lock:
+                    if client_data is not None:
+                        client_data['busy'] = False
+                    draining = self.draining
+                if draining:
+                    print(f"Cererea în curs a clientului {address} s-a încheiat. Se trimite notificarea de oprire.")
+                    self._send_json_response(client_socket, self._shutdown_notice())
+                    break
 
         except socket.timeout:
             print(f"Timeout în așteptarea datelor de la clientul {address}. Se închide conexiunea.")
@@ -297,6 +951,8 @@ class ApplicationServer:
             print(f"Eroare neașteptată în handle_client pentru {address}: {e_client_loop}")
         finally:
             print(f"Se închide conexiunea cu clientul {address}.")
+            if trace_session[0] is not None:
+                trace_session[0].close_session(trace_session[1])
             with self.lock:
                 if client_socket in self.active_clients:
                     session_versions = self.active_clients[client_socket]['downloaded_app_versions']
@@ -307,31 +963,419 @@ class ApplicationServer:
             except: pass
             client_socket.close()
 
-    def update_application(self, app_name, new_version_file_path):
-        with self.lock: 
-            if not os.path.exists(new_version_file_path) or not os.path.isfile(new_version_file_path):
-                print(f"(ManualUpdate) Eroare: Calea '{new_version_file_path}' pt {app_name} nu e validă.")
+    def _recv_ack(self, client_socket, max_size):
+        """ Citește o confirmare scurtă (READY, DONE, ...). Dacă în același recv a sosit deja și
+        cererea următoare a clientului, aceasta se păstrează pentru bucla din handle_client. """
+        data = client_socket.recv(max_size)
+        for token in ACK_TOKENS:
+            if data.startswith(token) and len(data) > len(token):
+                self._session_io.pending_input = data[len(token):]
+                return token.decode('ascii')
+        return data.decode('utf-8', errors='ignore')
+
+    def _take_pending_input(self):
+        pending = getattr(self._session_io, 'pending_input', b'')
+        self._session_io.pending_input = b''
+        return pending
+
+    def _record_client_download(self, client_socket, address, app_name, app_version):
+        with self.lock:
+            self.client_download_versions.setdefault(address, {})[app_name] = app_version
+
+            if client_socket in self.active_clients:
+                self.active_clients[client_socket]['downloaded_app_versions'][app_name] = app_version
+
+    def _get_manifest(self, app_name, app_version, app_data=None, app_path=None, app_file=None):
+        """ Manifestul Merkle al versiunii trimise, calculat o singură dată per versiune (din app_data,
+        din fișierul deja deschis app_file sau din app_path). """
+        if app_data is not None:
+            expected_size = len(app_data)
+        elif app_file is not None:
+            expected_size = os.fstat(app_file.fileno()).st_size
+        else:
+            expected_size = None
+        with self.manifest_lock:
+            cached = self.manifest_cache.get(app_name)
+        if cached and cached[0] == app_version and (expected_size is None or cached[1]['size'] == expected_size):
+            return cached[1]
+
+        started = time.perf_counter()
+        if app_data is not None:
+            manifest = build_manifest_from_bytes(app_data)
+        elif app_file is not None:
+            manifest = build_manifest_from_file(app_file)
+        else:
+            manifest = build_manifest(app_path)
+        elapsed = time.perf_counter() - started
+        throughput = manifest['size'] / elapsed / (1024 * 1024) if elapsed > 0 else float('inf')
+        print(f"Manifest Merkle pentru {app_name} (v{app_version}): {len(manifest['chunks'])} bucăți, calculat în {elapsed * 1000:.1f} ms ({throughput:.0f} MB/s).")
+        with self.manifest_lock:
+            self.manifest_cache[app_name] = (app_version, manifest)
+        return manifest
+
+    def _resend_chunks(self, client_socket, address, app_name, app_data, manifest, repair_request):
+        chunk_size = manifest['chunk_size']
+        chunk_total = len(manifest['chunks'])
+        requested = sorted({int(i) for i in repair_request.get('chunks', []) if 0 <= int(i) < chunk_total})
+        print(f"Clientul {address} a cerut retransmiterea a {len(requested)} bucăți din {app_name}: {requested[:10]}{'...' if len(requested) > 10 else ''}")
+        for index in requested:
+            chunk_view = memoryview(app_data)[index * chunk_size:(index + 1) * chunk_size]
+            client_socket.sendall(chunk_view)
+            self._note_sent(len(chunk_view))
+        return requested
+
+    def _handle_download_app(self, client_socket, address, request):
+        request_started = time.perf_counter()
+        app_name = request.get('app_name')
+        app_info = self.catalog.get(app_name)
+        # Conexiunile de lucru (sync) nu ascultă notificări: nu devin destinatari ai actualizărilor.
+        subscribe = request.get('subscribe') is not False
+
+        if not app_info:
+            self._send_json_response(client_socket, {'status': 'error', 'message': f'Aplicația {app_name} nu a fost găsită.'})
+            return
+
+        app_file_path = app_info['path']
+        current_app_version = app_info['version'] # This is the timestamp
+        requested_version = request.get('version')
+        stored_manifest = None
+        if requested_version is not None and requested_version != current_app_version:
+            stored_manifest = self.blob_store.get_version(app_name, requested_version)
+            if stored_manifest is None:
+                self._send_json_response(client_socket, {'status': 'error', 'message': f'Versiunea {requested_version} a aplicației {app_name} nu mai este disponibilă.'})
                 return
-            if app_name not in self.applications:
-                print(f"(ManualUpdate) Eroare: Aplicația {app_name} nu există pe server.")
+            current_app_version = requested_version
+        try:
+            if stored_manifest is not None:
+                app_data = self.blob_store.read_version(stored_manifest)
+            else:
+                with open(app_file_path, 'rb') as f:
+                    advise(f.fileno(), 'SEQUENTIAL')
+                    app_data = f.read()
+
+            # Reluarea unui transfer întrerupt: se trimite doar restul, dacă versiunea e aceeași.
+            resume = request.get('resume') or {}
+            offset = resume.get('offset') if resume.get('version') == current_app_version else 0
+            if not isinstance(offset, int) or not 0 < offset < len(app_data):
+                offset = 0
+            metadata = {
+                'status': 'success',
+                'app_name': app_name,
+                'version': current_app_version,
+                'size': len(app_data),
+                'offset': offset
+            }
+            manifest = None
+            if request.get('verify') == 'merkle':
+                manifest = stored_manifest or self._get_manifest(app_name, current_app_version, app_data)
+                metadata['manifest'] = manifest
+            self._send_json_response(client_socket, metadata)
+            # Timpul serverului până la primul byte: pregătirea metadatelor + reacția la READY (fără așteptarea clientului).
+            server_seconds = time.perf_counter() - request_started
+
+            client_socket.settimeout(60.0)
+            ack = self._recv_ack(client_socket, 1024)
+            while ack == 'WAIT':
+                # Alt proces de pe mașina clientului descarcă același conținut în cache-ul comun.
+                print(f"Clientul {address} așteaptă cache-ul comun al mașinii pentru {app_name}...")
+                client_socket.settimeout(HOST_CACHE_WAIT_TIMEOUT)
+                ack = self._recv_ack(client_socket, 1024)
+            client_socket.settimeout(None)
+            ready_at = time.perf_counter()
+
+            trace_id = request.get('trace_id')
+            if ack == 'CACHED':
+                if subscribe:
+                    self._record_client_download(client_socket, address, app_name, current_app_version)
+                if trace_id:
+                    self.rollouts.mark(trace_id, self._rollout_key(client_socket, address), 'download_done')
+                print(f"Clientul {address} are {app_name} (v{current_app_version}) în cache-ul comun al mașinii. Nu se mai trimite.")
+                return
+            if ack != 'READY':
+                print(f"Clientul {address} nu a trimis 'READY' pentru {app_name}. Răspuns: '{ack}'.")
                 return
+
+            if trace_id:
+                self.rollouts.mark(trace_id, self._rollout_key(client_socket, address), 'download_started')
+            self.rollouts.record_ttfb(trace_id, server_seconds + time.perf_counter() - ready_at)
+            if offset:
+                print(f"Clientul {address} reia {app_name} (v{current_app_version}) de la byte-ul {offset}/{len(app_data)}...")
+            else:
+                print(f"Clientul {address} este gata. Se trimite {app_name} (v{current_app_version}, {len(app_data)} bytes)...")
+            client_socket.sendall(memoryview(app_data)[offset:])
+            self._note_sent(len(app_data) - offset)
+            print(f"Fișierul {app_name} trimis complet către {address}.")
+
+            client_socket.settimeout(60.0)
+            final_ack = self._recv_ack(client_socket, 4096)
+            repair_rounds = 0
+            while manifest and final_ack.startswith('{') and repair_rounds < MAX_REPAIR_ROUNDS:
+                repair_request = json.loads(final_ack)
+                if repair_request.get('command') != 'resend_chunks':
+                    break
+                self._resend_chunks(client_socket, address, app_name, app_data, manifest, repair_request)
+                repair_rounds += 1
+                final_ack = self._recv_ack(client_socket, 4096)
+            client_socket.settimeout(None)
+
+            if final_ack == 'DONE':
+                if subscribe:
+                    self._record_client_download(client_socket, address, app_name, current_app_version)
+                if trace_id:
+                    self.rollouts.mark(trace_id, self._rollout_key(client_socket, address), 'download_done')
+                print(f"Transferul pentru {app_name} (v{current_app_version}) către {address} confirmat de client.")
+            else:
+                print(f"Confirmare finală ('{final_ack[:100]}') invalidă de la {address} pentru {app_name}.")
+        except FileNotFoundError:
+            print(f"Eroare server: Fișierul {app_file_path} negăsit pentru {app_name}.")
+            self._send_json_response(client_socket, {'status': 'error', 'message': f'Fișierul {app_name} nu există.'})
+        except socket.timeout as ste:
+            print(f"Server: Timeout în transfer cu {address} pentru {app_name}: {ste}")
+        except Exception as e_file_transfer:
+            print(f"Server: Eroare la transferul {app_name} către {address}: {e_file_transfer}")
             try:
-                old_path = self.applications[app_name]['path']
-                apps_dir = os.path.dirname(old_path)
-                if not os.path.exists(apps_dir): os.makedirs(apps_dir)
-                temp_staging_path = os.path.join(apps_dir, f"{app_name}.manual_stage_{time.time()}")
-                shutil.copy2(new_version_file_path, temp_staging_path)
-                os.replace(temp_staging_path, old_path)
-                new_server_version = os.path.getmtime(old_path)
-                self.applications[app_name]['version'] = new_server_version
-                print(f"(ManualUpdate) Aplicația {app_name} actualizată pe disc la versiunea {new_server_version}.")
-                print("  Monitorizarea periodică va detecta și notifica clienții.")
-            except Exception as e:
-                print(f"(ManualUpdate) Eroare majoră la actualizarea {app_name}: {e}")
-                if 'temp_staging_path' in locals() and os.path.exists(temp_staging_path):
-                    try: os.remove(temp_staging_path); print("(ManualUpdate) Staging file șters.")
-                    except OSError: pass
-            
+                self._send_json_response(client_socket, {'status': 'error', 'message': f'Eroare server la transfer: {str(e_file_transfer)}'})
+            except Exception: pass # Avoid error cascades if sending error fails
+
+    def _recv_json(self, client_socket, timeout, max_size=1024 * 1024):
+        """ Citește un mesaj JSON care poate depăși un singur recv(). """
+        buffer = b''
+        client_socket.settimeout(timeout)
+        try:
+            while len(buffer) < max_size:
+                chunk = client_socket.recv(65536)
+                if not chunk:
+                    return None
+                buffer += chunk
+                try:
+                    return json.loads(buffer.decode('utf-8'))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+            return None
+        finally:
+            client_socket.settimeout(None)
+
+    def _resolve_bundle_apps(self, client_socket, request, catalog):
+        if not request.get('outdated'):
+            apps = request.get('apps')
+            return [name for name in apps if isinstance(name, str)] if isinstance(apps, list) else []
+        with self.lock:
+            session = self.active_clients.get(client_socket)
+            known_versions = dict(session['downloaded_app_versions']) if session else {}
+        known_versions.update(self._valid_versions(request.get('installed')))
+        return sorted(name for name, version in known_versions.items()
+                      if name in catalog and catalog.get(name)['version'] > version)
+
+    def _valid_bundle_ack(self, received, sent_versions):
+        """ {aplicație: versiune} confirmate de client, sau None dacă lista nu corespunde pachetului trimis. """
+        if not isinstance(received, list) or not all(isinstance(entry, dict) for entry in received):
+            return None
+        acked = {entry.get('app_name'): entry.get('version') for entry in received}
+        valid = self._valid_versions(acked)
+        if len(valid) != len(received) or any(sent_versions.get(name) != version for name, version in valid.items()):
+            return None
+        return valid
+
+    def _handle_download_bundle(self, client_socket, address, request):
+        """ Trimite mai multe aplicații într-un singur răspuns: [lungime antet][antet JSON][conținut] per intrare, terminat cu lungime 0. """
+        catalog = self.catalog
+        subscribe = request.get('subscribe') is not False
+        requested_names = self._resolve_bundle_apps(client_socket, request, catalog)
+        bundle_entries = [catalog.get(name) for name in requested_names if name in catalog]
+        missing = [name for name in requested_names if name not in catalog]
+        self._send_json_response(client_socket, {
+            'status': 'success',
+            'count': len(bundle_entries),
+            'total_size': sum(entry['size'] for entry in bundle_entries),
+            'missing': missing
+        })
+        if not bundle_entries:
+            return
+
+        try:
+            client_socket.settimeout(60.0)
+            ack = self._recv_ack(client_socket, 1024)
+            client_socket.settimeout(None)
+            if ack != 'READY':
+                print(f"Clientul {address} nu a trimis 'READY' pentru pachet. Răspuns: '{ack}'.")
+                return
+
+            print(f"Se trimite un pachet de {len(bundle_entries)} aplicații către {address}...")
+            for app_info in bundle_entries:
+                self._send_bundle_entry(client_socket, app_info)
+            client_socket.sendall(struct.pack('!I', 0))
+            self._note_sent(4)
+
+            bundle_ack = self._recv_json(client_socket, 60.0)
+            if not bundle_ack or bundle_ack.get('command') != 'bundle_ack':
+                print(f"Confirmare invalidă pentru pachet de la {address}: {bundle_ack}")
+                return
+            sent_versions = {app_info['name']: app_info['version'] for app_info in bundle_entries}
+            received = self._valid_bundle_ack(bundle_ack.get('received'), sent_versions)
+            if received is None:
+                print(f"Confirmare malformată pentru pachet de la {address}: {bundle_ack}")
+                self._send_json_response(client_socket, {'status': 'error', 'message': 'Confirmare de pachet invalidă.'})
+                return
+            if subscribe:
+                for app_name, app_version in received.items():
+                    self._record_client_download(client_socket, address, app_name, app_version)
+            self._send_json_response(client_socket, {'status': 'success', 'recorded': len(received)})
+            print(f"Pachet confirmat de {address}: {len(received)}/{len(bundle_entries)} aplicații.")
+        except socket.timeout as ste:
+            print(f"Server: Timeout în transferul pachetului către {address}: {ste}")
+
+    def _send_bundle_entry(self, client_socket, app_info):
+        app_name = app_info['name']
+        try:
+            with open(app_info['path'], 'rb') as f:
+                file_stat = os.fstat(f.fileno())
+                if file_stat.st_size != app_info['size'] or file_stat.st_mtime != app_info['version']:
+                    # Fișierul s-a schimbat după scanare: manifestul ar descrie altă versiune decât cea trimisă.
+                    print(f"Server: {app_name} s-a schimbat pe disc în timpul pachetului; se omite până la următoarea scanare.")
+                    self._send_bundle_error(client_socket, app_name, 'Fișierul s-a schimbat între timp; reîncercați după notificarea de actualizare.')
+                    return
+                entry_size = file_stat.st_size
+                manifest = self._get_manifest(app_name, app_info['version'], app_file=f)
+                entry_header = {'app_name': app_name, 'version': app_info['version'], 'size': entry_size, 'manifest': manifest}
+                header_bytes = json.dumps(entry_header).encode('utf-8')
+                client_socket.sendall(struct.pack('!I', len(header_bytes)) + header_bytes)
+                if entry_size:
+                    client_socket.sendfile(f, 0, entry_size)
+                self._note_sent(4 + len(header_bytes) + entry_size)
+        except FileNotFoundError:
+            print(f"Eroare server: Fișierul {app_info['path']} a dispărut în timpul trimiterii pachetului.")
+            self._send_bundle_error(client_socket, app_name, 'Fișierul nu mai există.')
+
+    def _send_bundle_error(self, client_socket, app_name, message):
+        header_bytes = json.dumps({'app_name': app_name, 'size': 0, 'error': message}).encode('utf-8')
+        client_socket.sendall(struct.pack('!I', len(header_bytes)) + header_bytes)
+        self._note_sent(4 + len(header_bytes))
+
+    def rollback_application(self, app_name, version):
+        """ Restaurează o versiune din depozit ca versiune curentă; clienții sunt notificați ca la orice actualizare. """
+        if not self._is_valid_app_name(app_name):
+            return {'status': 'error', 'message': 'Cerere rollback_app invalidă (app_name).'}
+        app_info = self.catalog.get(app_name)
+        manifest = self.blob_store.get_version(app_name, version)
+        if app_info is None or manifest is None:
+            print(f"(Rollback) Eroare: Versiunea {version} pentru {app_name} nu există în depozit.")
+            return {'status': 'error', 'message': f'Versiunea {version} pentru {app_name} nu există în depozit.'}
+
+        temp_staging_path = self._staging_path(app_name, 'rollback')
+        try:
+            self.blob_store.materialize(manifest, temp_staging_path)
+            os.replace(temp_staging_path, app_info['path'])
+        except Exception as e:
+            print(f"(Rollback) Eroare la restaurarea {app_name} v{version}: {e}")
+            if os.path.exists(temp_staging_path):
+                os.remove(temp_staging_path)
+            return {'status': 'error', 'message': f'Eroare la restaurare: {e}'}
+
+        # Fișierul restaurat primește un mtime nou, deci o versiune nouă; monitorizarea periodică notifică clienții.
+        new_version = os.path.getmtime(app_info['path'])
+        print(f"(Rollback) {app_name} restaurat la conținutul versiunii {version} (versiune nouă: {new_version}).")
+        return {'status': 'success', 'app_name': app_name, 'restored_version': version, 'version': new_version}
+
+    @staticmethod
+    def _is_valid_app_name(app_name):
+        if not isinstance(app_name, str) or not app_name or '\\' in app_name:
+            return False
+        return all(part and not part.startswith('.') for part in app_name.split('/'))
+
+    def _staging_path(self, app_name, tag):
+        """ Fișier temporar în apps/.staging (ignorat de scanare), pe același sistem de fișiere ca apps/. """
+        staging_dir = os.path.join('apps', '.staging')
+        os.makedirs(staging_dir, exist_ok=True)
+        return os.path.join(staging_dir, f"{os.path.basename(app_name)}.{tag}_{time.time()}")
+
+    def _swap_in_published_file(self, app_name, staged_path):
+        """ Mută atomic fișierul pregătit în apps/ și publică imediat noua versiune în catalog. """
+        current_info = self.catalog.get(app_name)
+        target_path = current_info['path'] if current_info else os.path.join('apps', *app_name.split('/'))
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        os.utime(staged_path)  # versiunea (mtime) trebuie să fie mai nouă decât cea publicată
+        os.replace(staged_path, target_path)
+        file_stat = os.stat(target_path)
+        app_info = {'name': app_name, 'path': target_path, 'version': file_stat.st_mtime, 'size': file_stat.st_size}
+        app_info = self._store_versions([app_info]).get(app_name, app_info)
+        with self.catalog_write_lock:
+            self._publish_catalog({app_name: app_info})
+        return app_info
+
+    def _announce_published(self, app_info):
+        self._send_update_notifications(app_info['name'], app_info['version'], app_info['size'])
+        self._apply_store_retention([app_info['name']])
+
+    def _handle_publish_app(self, client_socket, address, request):
+        """ Primește o versiune nouă în streaming într-un fișier de staging, fără blocări globale. """
+        app_name = request.get('app_name')
+        expected_size = request.get('size')
+        expected_sha256 = str(request.get('sha256') or '').lower()
+        if not self._is_valid_app_name(app_name) or not isinstance(expected_size, int) or expected_size < 0 or len(expected_sha256) != 64:
+            self._send_json_response(client_socket, {'status': 'error', 'message': 'Cerere publish_app invalidă (app_name, size, sha256).'})
+            return
+
+        temp_staging_path = self._staging_path(app_name, 'publish')
+        try:
+            self._send_json_response(client_socket, {'status': 'ready'})
+            hasher = hashlib.sha256()
+            buffer = bytearray(1024 * 1024)
+            view = memoryview(buffer)
+            bytes_received = 0
+            client_socket.settimeout(60.0)
+            with open(temp_staging_path, 'wb') as f:
+                while bytes_received < expected_size:
+                    received_now = client_socket.recv_into(view, min(len(buffer), expected_size - bytes_received))
+                    if received_now == 0:
+                        raise EOFError(f"Conexiune închisă după {bytes_received}/{expected_size} bytes.")
+                    f.write(view[:received_now])
+                    hasher.update(view[:received_now])
+                    bytes_received += received_now
+            client_socket.settimeout(None)
+
+            if hasher.hexdigest() != expected_sha256:
+                print(f"(Publish) Digest invalid pentru {app_name} de la {address}. Versiunea nu se publică.")
+                self._send_json_response(client_socket, {'status': 'error', 'message': 'Digest SHA-256 diferit de cel declarat.'})
+                return
+
+            app_info = self._swap_in_published_file(app_name, temp_staging_path)
+            print(f"(Publish) {app_name} publicat de {address}: versiunea {app_info['version']}, {app_info['size']} bytes.")
+            self._send_json_response(client_socket, {'status': 'success', 'app_name': app_name, 'version': app_info['version'], 'size': app_info['size']})
+            self._announce_published(app_info)
+        except (socket.timeout, EOFError, OSError) as e_publish:
+            print(f"(Publish) Eroare la primirea {app_name} de la {address}: {e_publish}")
+            self._send_json_response(client_socket, {'status': 'error', 'message': f'Eroare la publicare: {e_publish}'})
+        finally:
+            if os.path.exists(temp_staging_path):
+                os.remove(temp_staging_path)
+
+    def update_application(self, app_name, new_version_file_path, expected_sha256=None, allow_hardlink=False):
+        """ Publică o versiune nouă dintr-un fișier local; copierea nu blochează catalogul sau clienții. """
+        if not os.path.exists(new_version_file_path) or not os.path.isfile(new_version_file_path):
+            print(f"(ManualUpdate) Eroare: Calea '{new_version_file_path}' pt {app_name} nu e validă.")
+            return None
+        if self.catalog.get(app_name) is None:
+            print(f"(ManualUpdate) Eroare: Aplicația {app_name} nu există pe server.")
+            return None
+
+        temp_staging_path = self._staging_path(app_name, 'manual_stage')
+        try:
+            copy_method = clone_file(new_version_file_path, temp_staging_path, allow_hardlink=allow_hardlink)
+            if expected_sha256 and file_sha256(temp_staging_path) != expected_sha256.lower():
+                print(f"(ManualUpdate) Eroare: Digest-ul fișierului '{new_version_file_path}' nu corespunde. Versiunea nu se publică.")
+                return None
+            app_info = self._swap_in_published_file(app_name, temp_staging_path)
+            print(f"(ManualUpdate) Aplicația {app_name} actualizată pe disc la versiunea {app_info['version']} (copiere: {copy_method}).")
+            self._announce_published(app_info)
+            return app_info
+        except Exception as e:
+            print(f"(ManualUpdate) Eroare majoră la actualizarea {app_name}: {e}")
+            return None
+        finally:
+            if os.path.exists(temp_staging_path):
+                try: os.remove(temp_staging_path); print("(ManualUpdate) Staging file șters.")
+                except OSError: pass
+
 if __name__ == '__main__':
     server = ApplicationServer()
     
@@ -366,5 +1410,6 @@ if __name__ == '__main__':
         if os.path.exists(temp_admin_uploads_dir) and not os.listdir(temp_admin_uploads_dir):
             os.rmdir(temp_admin_uploads_dir)
 
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
     server.start()
     print("Server oprit complet.")
\ No newline at end of file
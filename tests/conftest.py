@@ -0,0 +1,155 @@
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server as server_module  # noqa: E402
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def wait_for_port(port, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+
+
+def write_app(name, size, seed=0):
+    """ Scrie apps/<name> cu conținut determinist; întoarce conținutul. """
+    content = random.Random(seed).randbytes(size)
+    path = os.path.join('apps', name)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(content)
+    os.replace(path + '.tmp', path)
+    return content
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Serverul și clientul folosesc căi relative (apps/, server_data/, downloads/).
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('apps')
+    return tmp_path
+
+
+@pytest.fixture
+def app_server(workdir):
+    """ Pornește servere pe porturi libere; se opresc la finalul testului. """
+    started = []
+
+    def start(port=None, **kwargs):
+        kwargs.setdefault('drain_timeout', 2.0)
+        server = server_module.ApplicationServer('127.0.0.1', port or free_port(), data_dir='server_data', **kwargs)
+        thread = threading.Thread(target=server.start, daemon=True)
+        thread.start()
+        wait_for_port(server.port)
+        started.append((server, thread))
+        return server
+
+    yield start
+    for server, thread in started:
+        server.stop()
+        thread.join(timeout=10)
+
+
+class CuttingProxy:
+    """ Proxy TCP către server care poate tăia conexiunea după un număr de bytes server->client
+    și poate refuza conexiunile (portul închis) cât timp serverul trebuie să pară indisponibil. """
+
+    def __init__(self, target_port):
+        self.target_port = target_port
+        self.port = free_port()
+        self.cut_after = None
+        self.cuts = 0
+        self._pairs = []
+        self._lock = threading.Lock()
+        self._listener = None
+        self.resume()
+
+    def resume(self):
+        self._listener = socket.create_server(('127.0.0.1', self.port))
+        threading.Thread(target=self._accept_loop, args=(self._listener,), daemon=True).start()
+
+    def pause(self):
+        """ Închide portul și toate conexiunile în curs. """
+        try:
+            # close() singur nu trezește accept()-ul blocat, care ar mai accepta o conexiune.
+            self._listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._listener.close()
+        with self._lock:
+            pairs, self._pairs = self._pairs, []
+        for pair in pairs:
+            self._close_pair(pair)
+
+    close = pause
+
+    @property
+    def connection_count(self):
+        with self._lock:
+            return len(self._pairs)
+
+    def _accept_loop(self, listener):
+        while True:
+            try:
+                downstream, _ = listener.accept()
+            except OSError:
+                return
+            upstream = socket.create_connection(('127.0.0.1', self.target_port))
+            pair = (downstream, upstream)
+            with self._lock:
+                self._pairs.append(pair)
+                limit, self.cut_after = self.cut_after, None
+            threading.Thread(target=self._pump, args=(downstream, upstream, None, pair), daemon=True).start()
+            threading.Thread(target=self._pump, args=(upstream, downstream, limit, pair), daemon=True).start()
+
+    def _pump(self, source, destination, limit, pair):
+        forwarded = 0
+        try:
+            while True:
+                data = source.recv(65536 if limit is None else min(65536, limit - forwarded))
+                if not data:
+                    break
+                destination.sendall(data)
+                forwarded += len(data)
+                if limit is not None and forwarded >= limit:
+                    self.cuts += 1
+                    break
+        except OSError:
+            pass
+        self._close_pair(pair)
+
+    @staticmethod
+    def _close_pair(pair):
+        for sock in pair:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+
+def wait_until(predicate, timeout=20.0, interval=0.05):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+    return True
@@ -0,0 +1,54 @@
+import socket
+
+import admin
+from profiler import MAX_PROFILE_SECONDS
+from server import CLIENT_IDLE_TIMEOUT
+
+from conftest import write_app
+
+
+def _run_admin(server, *args):
+    return admin.main(['--host', '127.0.0.1', '--port', str(server.port)] + list(args))
+
+
+def test_admin_commands_require_token(app_server, workdir, capsys):
+    write_app('tool.bin', 4096, seed=32)
+    server = app_server(admin_token='s3cret')
+    new_version = workdir / 'tool.new'
+    new_version.write_bytes(b'new version')
+
+    assert _run_admin(server, 'publish', 'tool.bin', str(new_version)) == 1
+    assert _run_admin(server, '--token', 'wrong', 'trace', 'start') == 1
+    assert _run_admin(server, '--token', 'wrong', 'profile', '--duration', '0.1') == 1
+    assert server.applications.get('tool.bin')['size'] == 4096
+    assert server.recorder is None
+
+    assert _run_admin(server, '--token', 's3cret', 'publish', 'tool.bin', str(new_version)) == 0
+    assert server.applications.get('tool.bin')['size'] == len(b'new version')
+    assert 's3cret' not in capsys.readouterr().out
+
+
+def test_admin_commands_disabled_without_token(app_server, workdir, monkeypatch):
+    monkeypatch.delenv('APP_ADMIN_TOKEN', raising=False)
+    write_app('tool.bin', 4096, seed=32)
+    server = app_server()
+    assert _run_admin(server, '--token', '', 'rollback', 'tool.bin', '1') == 1
+
+
+def test_version_commands_reject_missing_app_name(app_server):
+    server = app_server(admin_token='s3cret')
+    with socket.create_connection(('127.0.0.1', server.port)) as sock:
+        for request in ({'command': 'list_versions'}, {'command': 'rollback_app', 'version': 1.0, 'admin_token': 's3cret'}):
+            assert admin._send_command(sock, request, timeout=10.0)['status'] == 'error'
+
+
+def test_profile_start_rejects_invalid_options(app_server):
+    server = app_server(admin_token='s3cret')
+    invalid = ({'duration': 'abc'}, {'interval_ms': None}, {'duration': 0}, {'duration': MAX_PROFILE_SECONDS + 1},
+               {'interval_ms': 0.01}, {'duration': float('nan')})
+    with socket.create_connection(('127.0.0.1', server.port)) as sock:
+        for options in invalid:
+            request = dict(options, command='profile_start', admin_token='s3cret')
+            assert admin._send_command(sock, request, timeout=10.0)['status'] == 'error'
+        assert not server.profiler.active
+    assert MAX_PROFILE_SECONDS < CLIENT_IDLE_TIMEOUT
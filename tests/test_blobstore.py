@@ -0,0 +1,107 @@
+import os
+import random
+
+import pytest
+
+from blobstore import BlobStore, FileChangedError
+from merkle import chunk_digest
+
+from conftest import write_app
+
+
+CHUNK = 1024
+
+
+def _ingest(store, tmp_path, app_name, version, content):
+    path = tmp_path / f'{app_name}.{version}'
+    path.write_bytes(content)
+    return store.ingest(app_name, str(path), version)
+
+
+def test_size_budget_scans_once_and_reports_freed_bytes(tmp_path, monkeypatch):
+    store = BlobStore(str(tmp_path / 'store'), keep_versions=40, max_bytes=9 * CHUNK, chunk_size=CHUNK)
+    for version in range(1, 6):
+        # 3 bucăți proprii fiecărei versiuni + una comună tuturor.
+        _ingest(store, tmp_path, 'app', version, random.Random(version).randbytes(3 * CHUNK) + b'\xff' * CHUNK)
+    assert store.disk_usage() == 16 * CHUNK
+
+    scans = []
+    object_sizes = store._object_sizes
+    monkeypatch.setattr(store, '_object_sizes', lambda: scans.append(1) or object_sizes())
+    gc_calls = []
+    gc = store.gc
+    monkeypatch.setattr(store, 'gc', lambda: gc_calls.append(1) or gc())
+
+    removed, freed = store.apply_retention()
+    assert (removed, freed) == (3, 9 * CHUNK)
+    assert len(scans) == 1 and len(gc_calls) == 1
+    assert [m['version'] for m in store.versions('app')] == [4, 5]
+    assert store.disk_usage() <= store.max_bytes
+
+
+def test_protected_and_newest_versions_survive_size_budget(tmp_path):
+    store = BlobStore(str(tmp_path / 'store'), max_bytes=CHUNK, chunk_size=CHUNK)
+    for version in range(1, 4):
+        _ingest(store, tmp_path, 'app', version, bytes([version]) * 2 * CHUNK)
+    store.apply_retention(protected_versions={'app': 1})
+    assert [m['version'] for m in store.versions('app')] == [1, 3]
+
+
+def test_pending_chunks_are_reference_counted(tmp_path):
+    store = BlobStore(str(tmp_path / 'store'), chunk_size=CHUNK)
+    content = b'x' * CHUNK
+    digest = chunk_digest(content)
+    # Un alt ingest, încă în curs, a scris deja aceeași bucată.
+    store._pending_chunks[digest] += 1
+    _ingest(store, tmp_path, 'app', 1, content)
+    assert store._pending_chunks[digest] == 1
+
+    store._save_history('app', [])
+    store.gc()
+    assert os.path.exists(store._object_path(digest))
+
+
+def test_file_changed_during_ingest_saves_no_manifest(tmp_path, monkeypatch):
+    store = BlobStore(str(tmp_path / 'store'), chunk_size=CHUNK)
+    path = tmp_path / 'app.1'
+    path.write_bytes(b'a' * 4 * CHUNK)
+    write_object = store._write_object
+
+    def truncating_write(digest, data):
+        # Fișierul e rescris (mai scurt) cât timp ingest îl citește.
+        os.truncate(path, 2 * CHUNK)
+        return write_object(digest, data)
+    monkeypatch.setattr(store, '_write_object', truncating_write)
+    with pytest.raises(FileChangedError):
+        store.ingest('app', str(path), 1)
+    assert store.versions('app') == [] and not store._pending_chunks
+
+
+def test_ingest_rejects_unexpected_size(tmp_path):
+    store = BlobStore(str(tmp_path / 'store'), chunk_size=CHUNK)
+    path = tmp_path / 'app.1'
+    path.write_bytes(b'a' * CHUNK)
+    with pytest.raises(FileChangedError):
+        store.ingest('app', str(path), 1, expected_size=2 * CHUNK)
+    assert store.versions('app') == []
+
+
+def test_scan_changes_are_published_before_storing(app_server, monkeypatch):
+    server = app_server()
+    submitted = []
+    monkeypatch.setattr(server.store_worker, 'submit', lambda fn, *args: submitted.append(args))
+    notified = []
+    monkeypatch.setattr(server, '_send_update_notifications',
+                        lambda app_name, version, size, detected_at=None, warm=True: notified.append(app_name))
+
+    write_app('new.bin', 4 * CHUNK)
+    file_stat = os.stat(os.path.join('apps', 'new.bin'))
+    app_info = {'name': 'new.bin', 'path': os.path.join('apps', 'new.bin'), 'version': file_stat.st_mtime, 'size': file_stat.st_size}
+    server._apply_scan_changes({'new.bin': app_info}, [])
+    assert 'new.bin' in server.applications and 'new.bin' in notified
+    assert server.blob_store.versions('new.bin') == []
+    assert ([app_info],) in submitted
+
+    server._store_current_versions([app_info])
+    assert [m['version'] for m in server.blob_store.versions('new.bin')] == [server.applications.get('new.bin')['version']]
+    assert 'manifest_root' in server.applications.get('new.bin')
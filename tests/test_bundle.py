@@ -0,0 +1,136 @@
+import glob
+import json
+import os
+import socket
+import struct
+
+import pytest
+
+from client import ApplicationClient
+from merkle import build_manifest_from_bytes
+
+from conftest import CuttingProxy, write_app
+
+
+def _client(server):
+    client = ApplicationClient('127.0.0.1', server.port, persist_versions=False, use_host_cache=False, auto_reconnect=False)
+    client.connect(listen=False)
+    return client
+
+
+def test_bundle_installs_requested_apps(app_server):
+    contents = {name: write_app(name, 300 * 1024, seed=index) for index, name in enumerate(('a.bin', 'b.bin'))}
+    server = app_server()
+    client = _client(server)
+    try:
+        results = client.download_bundle(['a.bin', 'b.bin', 'missing.bin'])
+    finally:
+        client.close_connection()
+    assert results['a.bin']['status'] == results['b.bin']['status'] == 'success'
+    assert results['missing.bin']['status'] == 'failed'
+    for name, content in contents.items():
+        with open(os.path.join('downloads', name), 'rb') as f:
+            assert f.read() == content
+
+
+def test_outdated_bundle_ignores_malformed_installed_versions(app_server):
+    write_app('a.bin', 1024)
+    write_app('b.bin', 1024)
+    server = app_server()
+    with socket.create_connection(('127.0.0.1', server.port)) as sock:
+        sock.sendall(json.dumps({'command': 'download_bundle', 'outdated': True,
+                                 'installed': {'a.bin': 'old', 'b.bin': 1, 'c.bin': None}}).encode('utf-8'))
+        header = json.loads(sock.recv(65536).decode('utf-8'))
+    assert header['status'] == 'success' and header['count'] == 1
+
+
+def test_entry_changed_on_disk_is_not_sent(app_server):
+    write_app('a.bin', 1024)
+    server = app_server()
+    app_info = dict(server.applications.get('a.bin'))
+    os.utime(app_info['path'], (0, app_info['version'] + 10))
+    left, right = socket.socketpair()
+    with left, right:
+        server._send_bundle_entry(left, app_info)
+        (length,) = struct.unpack('!I', right.recv(4))
+        entry = json.loads(right.recv(length).decode('utf-8'))
+    assert entry['size'] == 0 and entry['error']
+
+
+def test_bundle_entry_temp_file_removed_on_eof(workdir):
+    content = os.urandom(256 * 1024)
+    client = ApplicationClient(persist_versions=False, use_host_cache=False, auto_reconnect=False)
+    left, right = socket.socketpair()
+    client.socket = left
+    entry = {'app_name': 'a.bin', 'version': 1.0, 'size': len(content), 'manifest': build_manifest_from_bytes(content)}
+    right.sendall(content[:100 * 1024])
+    right.close()
+    with left, pytest.raises(EOFError):
+        client._receive_bundle_entry(entry)
+    assert glob.glob(os.path.join('downloads', '*.tmp')) == []
+
+
+def _read_bundle(sock):
+    stream = sock.makefile('rb')
+    entries = []
+    while True:
+        (length,) = struct.unpack('!I', stream.read(4))
+        if length == 0:
+            return entries
+        entry = json.loads(stream.read(length).decode('utf-8'))
+        stream.read(entry['size'])
+        entries.append(entry)
+
+
+@pytest.mark.parametrize('received', [
+    [{'app_name': 'a.bin', 'version': 'zzz'}],
+    [{'app_name': 'other.bin', 'version': 1.0}],
+    [{'version': 1.0}],
+    'a.bin',
+])
+def test_malformed_bundle_ack_is_rejected(app_server, received):
+    write_app('a.bin', 1024)
+    server = app_server()
+    with socket.create_connection(('127.0.0.1', server.port)) as sock:
+        sock.sendall(json.dumps({'command': 'download_bundle', 'apps': ['a.bin']}).encode('utf-8'))
+        header = json.loads(sock.recv(65536).decode('utf-8'))
+        assert header['count'] == 1
+        sock.sendall(b'READY')
+        _read_bundle(sock)
+        sock.sendall(json.dumps({'command': 'bundle_ack', 'received': received}).encode('utf-8'))
+        response = json.loads(sock.recv(65536).decode('utf-8'))
+        address = sock.getsockname()
+    assert response['status'] == 'error'
+    assert 'a.bin' not in server.client_download_versions.get(address, {})
+
+
+def test_bundle_without_subscribe_is_not_recorded(app_server):
+    write_app('a.bin', 1024)
+    server = app_server()
+    client = _client(server)
+    client.subscribe_updates = False
+    try:
+        results = client.download_bundle(['a.bin'])
+        address = client.socket.getsockname()
+        assert results['a.bin']['status'] == 'success'
+        assert 'a.bin' not in server.client_download_versions.get(address, {})
+    finally:
+        client.close_connection()
+
+
+def test_interrupted_bundle_drops_connection(app_server):
+    write_app('a.bin', 4 * 1024 * 1024)
+    server = app_server()
+    proxy = CuttingProxy(server.port)
+    client = ApplicationClient('127.0.0.1', proxy.port, persist_versions=False, use_host_cache=False)
+    lost = []
+    client._connection_lost = lost.append
+    proxy.cut_after = 1024 * 1024
+    try:
+        client.connect(listen=False)
+        results = client.download_bundle(['a.bin'])
+        assert 'a.bin' not in results or results['a.bin']['status'] != 'success'
+        assert len(lost) == 1 and client.socket.fileno() == -1
+    finally:
+        client.close_connection()
+        proxy.close()
@@ -0,0 +1,65 @@
+import os
+
+from client import ApplicationClient
+from host_cache import HostCache
+
+from conftest import write_app
+
+
+def _client(server, cache_dir):
+    client = ApplicationClient('127.0.0.1', server.port, persist_versions=False, host_cache_dir=str(cache_dir), auto_reconnect=False)
+    client.connect(listen=False)
+    return client
+
+
+def test_lookup_rejects_world_writable_object(tmp_path):
+    cache = HostCache(str(tmp_path / 'cache'))
+    source = tmp_path / 'source.bin'
+    source.write_bytes(b'x' * 1000)
+    object_path = cache.insert('ab' * 32, str(source))
+    assert cache.lookup('ab' * 32, 1000) == object_path
+    os.chmod(object_path, 0o666)
+    assert cache.lookup('ab' * 32, 1000) is None
+
+
+def test_cache_dirs_are_not_world_writable(tmp_path):
+    cache = HostCache(str(tmp_path / 'cache'))
+    for directory in (cache.root, cache.objects_dir, cache.locks_dir):
+        assert not os.stat(directory).st_mode & 0o002
+
+
+def test_install_does_not_share_inode_with_cache(tmp_path):
+    cache = HostCache(str(tmp_path / 'cache'))
+    source = tmp_path / 'source.bin'
+    source.write_bytes(b'y' * 4096)
+    object_path = cache.insert('cd' * 32, str(source))
+    cache.materialize('cd' * 32, str(tmp_path / 'installed.bin'))
+    assert os.stat(object_path).st_ino != os.stat(source).st_ino
+    assert os.stat(object_path).st_ino != os.stat(tmp_path / 'installed.bin').st_ino
+
+
+def test_tampered_cache_object_falls_back_to_network(app_server, workdir):
+    content = write_app('tool.bin', 3 * 1024 * 1024 + 123, seed=40)
+    server = app_server()
+    cache_dir = workdir / 'host_cache'
+
+    first = _client(server, cache_dir)
+    assert first.download_application('tool.bin')['status'] == 'success'
+    first.close_connection()
+
+    # Un obiect de aceeași dimensiune, dar cu alt conținut, nu trebuie instalat.
+    object_paths = [os.path.join(root, name) for root, _, names in os.walk(first.host_cache.objects_dir) for name in names]
+    assert len(object_paths) == 1
+    os.chmod(object_paths[0], 0o644)
+    with open(object_paths[0], 'r+b') as f:
+        f.write(b'\x00' * 4096)
+    os.remove(os.path.join('downloads', 'tool.bin'))
+
+    second = _client(server, cache_dir)
+    status = second.download_application('tool.bin')
+    second.close_connection()
+    assert status['status'] == 'success' and not status.get('cached')
+    with open(os.path.join('downloads', 'tool.bin'), 'rb') as f:
+        assert f.read() == content
+    with open(object_paths[0], 'rb') as f:
+        assert f.read() == content
@@ -0,0 +1,91 @@
+import json
+import socket
+import threading
+
+from client import ApplicationClient
+from merkle import CHUNK_SIZE, MAX_REPAIR_ROUNDS, ChunkVerifier, build_manifest_from_bytes
+
+from conftest import write_app
+
+
+CONTENT = bytes(range(256)) * (3 * CHUNK_SIZE // 256) + b'tail'
+
+
+def _corrupted_download(workdir, bad_index):
+    """ Fișierul temporar așa cum l-ar lăsa un transfer cu bucata bad_index coruptă. """
+    received = bytearray(CONTENT)
+    received[bad_index * CHUNK_SIZE] ^= 0xff
+    verifier = ChunkVerifier(build_manifest_from_bytes(CONTENT))
+    verifier.update(received)
+    assert verifier.finish() == [bad_index]
+    temp_path = str(workdir / 'app.tmp')
+    with open(temp_path, 'wb') as f:
+        f.write(received)
+    return temp_path, verifier
+
+
+def _fake_server(sock, corrupt_rounds):
+    """ Răspunde la resend_chunks; primele corrupt_rounds runde trimit tot date corupte. """
+    requests = []
+
+    def serve():
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                return
+            chunks = json.loads(data.decode('utf-8'))['chunks']
+            requests.append(chunks)
+            for index in chunks:
+                chunk = bytearray(CONTENT[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE])
+                if len(requests) <= corrupt_rounds:
+                    chunk[-1] ^= 0xff
+                sock.sendall(chunk)
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    return requests
+
+
+def _repair(workdir, corrupt_rounds):
+    temp_path, verifier = _corrupted_download(workdir, bad_index=1)
+    client = ApplicationClient(persist_versions=False, use_host_cache=False, auto_reconnect=False)
+    left, right = socket.socketpair()
+    with left, right:
+        client.socket = left
+        requests = _fake_server(right, corrupt_rounds)
+        repaired = client._repair_chunks('app.bin', temp_path, verifier, len(CONTENT))
+    with open(temp_path, 'rb') as f:
+        return repaired, requests, f.read()
+
+
+def test_corrupted_chunk_is_repaired_after_a_bad_resend(workdir):
+    repaired, requests, data = _repair(workdir, corrupt_rounds=1)
+    assert repaired and requests == [[1], [1]]
+    assert data == CONTENT
+
+
+def test_repair_gives_up_after_max_rounds(workdir):
+    repaired, requests, data = _repair(workdir, corrupt_rounds=MAX_REPAIR_ROUNDS + 1)
+    assert not repaired and requests == [[1]] * MAX_REPAIR_ROUNDS
+    assert data != CONTENT
+
+
+def test_server_stops_resending_after_max_rounds(app_server):
+    content = write_app('app.bin', 2 * CHUNK_SIZE + 10, seed=7)
+    server = app_server()
+    with socket.create_connection(('127.0.0.1', server.port)) as sock:
+        sock.sendall(json.dumps({'command': 'download_app', 'app_name': 'app.bin', 'verify': 'merkle'}).encode('utf-8'))
+        metadata = json.loads(sock.recv(65536).decode('utf-8'))
+        sock.sendall(b'READY')
+        stream = sock.makefile('rb')
+        assert stream.read(metadata['size']) == content
+        for _ in range(MAX_REPAIR_ROUNDS):
+            sock.sendall(json.dumps({'command': 'resend_chunks', 'chunks': [2]}).encode('utf-8'))
+            assert stream.read(10) == content[2 * CHUNK_SIZE:]
+        sock.sendall(json.dumps({'command': 'resend_chunks', 'chunks': [2]}).encode('utf-8'))
+        sock.settimeout(1.0)
+        try:
+            extra = sock.recv(65536)
+        except socket.timeout:
+            extra = b''
+    # Cererea în plus e tratată ca o confirmare finală invalidă: nu se mai retrimite nimic.
+    assert not extra.startswith(content[2 * CHUNK_SIZE:])
@@ -0,0 +1,66 @@
+import os
+import socket
+import threading
+
+import pytest
+
+from merkle import ChunkVerifier, build_manifest_from_bytes
+from receiver import FileReceiver, RECEIVE_MODES
+
+
+PAYLOAD = os.urandom(3 * 1024 * 1024 + 17)
+
+
+def _send_then_close(sock, data):
+    try:
+        sock.sendall(data)
+    finally:
+        sock.close()
+
+
+def _receive(tmp_path, mode, data, size, verifier=None):
+    sender, receiver_sock = socket.socketpair()
+    thread = threading.Thread(target=_send_then_close, args=(sender, data))
+    thread.start()
+    receiver = FileReceiver(str(tmp_path / 'download.bin'), size, verifier=verifier, mode=mode)
+    try:
+        receiver.receive(receiver_sock)
+    finally:
+        receiver_sock.close()
+        thread.join()
+    return receiver
+
+
+@pytest.mark.parametrize('mode', RECEIVE_MODES)
+def test_receive_complete_file(tmp_path, mode):
+    verifier = ChunkVerifier(build_manifest_from_bytes(PAYLOAD))
+    receiver = _receive(tmp_path, mode, PAYLOAD, len(PAYLOAD), verifier)
+    assert receiver.received == len(PAYLOAD)
+    assert verifier.finish() == []
+    assert (tmp_path / 'download.bin').read_bytes() == PAYLOAD
+
+
+@pytest.mark.parametrize('mode', RECEIVE_MODES)
+def test_eof_mid_transfer_raises_eof_error(tmp_path, mode):
+    verifier = ChunkVerifier(build_manifest_from_bytes(PAYLOAD))
+    with pytest.raises(EOFError):
+        _receive(tmp_path, mode, PAYLOAD[:1024 * 1024 + 100 * 1024], len(PAYLOAD), verifier)
+
+
+@pytest.mark.parametrize('mode', RECEIVE_MODES)
+def test_resume_from_written_offset(tmp_path, mode):
+    cut = 2 * 1024 * 1024 + 5
+    sender, receiver_sock = socket.socketpair()
+    threading.Thread(target=_send_then_close, args=(sender, PAYLOAD[:cut])).start()
+    first = FileReceiver(str(tmp_path / 'download.bin'), len(PAYLOAD), mode=mode)
+    with pytest.raises(EOFError):
+        first.receive(receiver_sock)
+    receiver_sock.close()
+    assert 0 < first.written <= cut
+
+    sender, receiver_sock = socket.socketpair()
+    threading.Thread(target=_send_then_close, args=(sender, PAYLOAD[first.written:])).start()
+    second = FileReceiver(str(tmp_path / 'download.bin'), len(PAYLOAD), mode=mode, offset=first.written)
+    second.receive(receiver_sock)
+    receiver_sock.close()
+    assert (tmp_path / 'download.bin').read_bytes() == PAYLOAD
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from client import ApplicationClient
+from receiver import RECEIVE_MODES
+
+from conftest import CuttingProxy, wait_for_port, wait_until, write_app
+
+
+APP_SIZE = 12 * 1024 * 1024
+CUT_AT = 8 * 1024 * 1024
+
+
+@pytest.fixture
+def proxied_server(app_server):
+    content = write_app('tool.bin', APP_SIZE, seed=42)
+    server = app_server()
+    proxy = CuttingProxy(server.port)
+    yield server, proxy, content
+    proxy.close()
+
+
+def _client(proxy, mode):
+    client = ApplicationClient('127.0.0.1', proxy.port, persist_versions=False, use_host_cache=False, receive_mode=mode)
+    offsets = []
+    new_receiver = client._new_receiver
+
+    def recording_receiver(temp_path, size, verifier, on_progress=None, offset=0):
+        offsets.append(offset)
+        return new_receiver(temp_path, size, verifier, on_progress, offset)
+    client._new_receiver = recording_receiver
+    return client, offsets
+
+
+def _installed_content():
+    path = os.path.join('downloads', 'tool.bin')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('mode', RECEIVE_MODES)
+def test_interrupted_download_resumes_after_reconnect(proxied_server, mode):
+    server, proxy, content = proxied_server
+    client, offsets = _client(proxy, mode)
+    proxy.cut_after = CUT_AT
+    client.connect()
+    try:
+        status = client.download_application('tool.bin')
+        assert status['status'] == 'failed' and proxy.cuts == 1
+        assert wait_until(lambda: _installed_content() == content
+                          and client.downloaded_apps.get('tool.bin') == server.applications.get('tool.bin')['version'])
+        assert len(offsets) == 2 and 0 < offsets[1] <= CUT_AT
+        assert client.interrupted_downloads == {}
+    finally:
+        client.close_connection()
+
+
+def test_session_resume_applies_missed_update(proxied_server):
+    server, proxy, _ = proxied_server
+    client, _ = _client(proxy, 'buffer')
+    client.connect()
+    try:
+        assert client.download_application('tool.bin')['status'] == 'success'
+        old_version = client.downloaded_apps['tool.bin']
+
+        # Serverul pare căzut cât timp se publică o versiune nouă.
+        proxy.pause()
+        new_content = write_app('tool.bin', APP_SIZE // 2, seed=43)
+        assert wait_until(lambda: server.applications.get('tool.bin')['version'] > old_version)
+        proxy.resume()
+        wait_for_port(proxy.port)
+
+        # Fișierul se mută în downloads/ înainte ca versiunea instalată să fie înregistrată.
+        assert wait_until(lambda: _installed_content() == new_content
+                          and client.downloaded_apps['tool.bin'] == server.applications.get('tool.bin')['version'], timeout=40.0)
+    finally:
+        client.close_connection()
@@ -0,0 +1,64 @@
+import json
+import os
+import socket
+import time
+
+from server import ApplicationServer
+
+from conftest import wait_until, write_app
+
+
+def _catalog_versions(server):
+    return {name: (info['version'], info['size']) for name, info in server.applications.items()}
+
+
+def test_snapshot_restore_then_verify_scan(workdir):
+    write_app('kept.bin', 1024, seed=1)
+    write_app('removed.bin', 1024, seed=2)
+    write_app('rewritten.bin', 1024, seed=3)
+    first = ApplicationServer('127.0.0.1', 0, data_dir='server_data')
+    first._save_catalog_snapshot()
+    saved = _catalog_versions(first)
+
+    # Schimbări cât timp serverul e oprit.
+    os.remove(os.path.join('apps', 'removed.bin'))
+    write_app('rewritten.bin', 2048, seed=4)
+    os.utime(os.path.join('apps', 'rewritten.bin'), (0, saved['rewritten.bin'][0] + 10))
+    write_app('added.bin', 512, seed=5)
+
+    restarted = ApplicationServer('127.0.0.1', 0, data_dir='server_data')
+    assert restarted._snapshot_unverified
+    assert _catalog_versions(restarted) == saved
+
+    restarted._verify_restored_catalog()
+    assert not restarted._snapshot_unverified
+    versions = _catalog_versions(restarted)
+    assert set(versions) == {'kept.bin', 'rewritten.bin', 'added.bin'}
+    assert versions['kept.bin'] == saved['kept.bin']
+    assert versions['rewritten.bin'] == (os.path.getmtime(os.path.join('apps', 'rewritten.bin')), 2048)
+    assert restarted.scanner.scan() == ({}, set())
+
+
+def test_drain_waits_for_active_download(app_server):
+    content = write_app('tool.bin', 2 * 1024 * 1024, seed=6)
+    server = app_server(drain_timeout=10.0)
+    with socket.create_connection(('127.0.0.1', server.port)) as idle, \
+            socket.create_connection(('127.0.0.1', server.port)) as busy:
+        busy.sendall(json.dumps({'command': 'download_app', 'app_name': 'tool.bin'}).encode('utf-8'))
+        metadata = json.loads(busy.recv(65536).decode('utf-8'))
+        assert metadata['status'] == 'success'
+
+        # Serverul așteaptă READY: cererea e în curs când începe oprirea.
+        started = time.monotonic()
+        server.stop()
+        idle.settimeout(5.0)
+        assert json.loads(idle.recv(65536).decode('utf-8'))['type'] == 'server_shutdown'
+        time.sleep(0.5)
+        assert len(server.active_clients) == 1
+
+        busy.sendall(b'READY')
+        stream = busy.makefile('rb')
+        assert stream.read(metadata['size']) == content
+        busy.sendall(b'DONE')
+        assert wait_until(lambda: not server.active_clients, timeout=5.0)
+        assert time.monotonic() - started < server.drain_timeout
@@ -0,0 +1,38 @@
+import os
+
+from client import ApplicationClient
+
+from conftest import wait_until, write_app
+
+
+def test_update_without_recipients_opens_no_rollout(app_server):
+    write_app('tool.bin', 4096, seed=1)
+    server = app_server()
+    old_version = server.applications.get('tool.bin')['version']
+    write_app('tool.bin', 8192, seed=2)
+    assert wait_until(lambda: server.applications.get('tool.bin')['version'] > old_version)
+    assert wait_until(lambda: len(server.change_log) == 1)
+    assert server.rollouts.stats()['rollouts'] == []
+    assert server.change_log[0][4] is None
+
+
+def test_rollout_stages_are_keyed_by_client_id(app_server):
+    write_app('tool.bin', 64 * 1024, seed=1)
+    server = app_server()
+    client = ApplicationClient('127.0.0.1', server.port, persist_versions=False, use_host_cache=False, client_id='host-a')
+    client.connect()
+    try:
+        assert client.download_application('tool.bin')['status'] == 'success'
+        old_version = client.downloaded_apps['tool.bin']
+        new_content = write_app('tool.bin', 96 * 1024, seed=2)
+
+        def installed():
+            with open(os.path.join('downloads', 'tool.bin'), 'rb') as f:
+                return f.read() == new_content
+        assert wait_until(lambda: client.downloaded_apps['tool.bin'] > old_version and installed())
+        assert wait_until(lambda: server.rollouts.stats()['rollouts'] and server.rollouts.stats()['rollouts'][0]['clients_completed'] == 1)
+        rollout = next(iter(server.rollouts._rollouts.values()))
+        assert list(rollout['clients']) == ['host-a']
+        assert {'notified', 'download_started', 'download_done', 'completed'} <= set(rollout['clients']['host-a'])
+    finally:
+        client.close_connection()
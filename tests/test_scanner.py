@@ -0,0 +1,62 @@
+import os
+
+from server import AppsDirScanner
+
+
+def _write(root, rel_path, content):
+    path = os.path.join(root, *rel_path.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+def _scanner(tmp_path, **kwargs):
+    root = str(tmp_path / 'apps')
+    _write(root, 'top.bin', b'top')
+    _write(root, 'team/tool.bin', b'tool')
+    _write(root, 'team/sub/deep.bin', b'deep')
+    _write(root, 'other/x.bin', b'x')
+    scanner = AppsDirScanner(root, **kwargs)
+    changed, removed = scanner.scan(full=True)
+    assert set(changed) == {'top.bin', 'team/tool.bin', 'team/sub/deep.bin', 'other/x.bin'} and not removed
+    return root, scanner
+
+
+def test_nested_add_and_remove_are_detected(tmp_path):
+    root, scanner = _scanner(tmp_path)
+    _write(root, 'team/sub/new.bin', b'new')
+    _write(root, 'team/sub/deeper/newest.bin', b'newest')
+    os.remove(os.path.join(root, 'other', 'x.bin'))
+    changed, removed = scanner.scan()
+    assert set(changed) == {'team/sub/new.bin', 'team/sub/deeper/newest.bin'}
+    assert removed == {'other/x.bin'}
+    assert scanner.scan() == ({}, set())
+
+
+def test_removed_nested_directory_drops_its_apps(tmp_path):
+    root, scanner = _scanner(tmp_path)
+    os.remove(os.path.join(root, 'team', 'sub', 'deep.bin'))
+    os.rmdir(os.path.join(root, 'team', 'sub'))
+    changed, removed = scanner.scan()
+    assert changed == {} and removed == {'team/sub/deep.bin'}
+    assert 'team/sub/deep.bin' not in scanner.current_entries()
+
+
+def test_in_place_rewrite_is_found_by_rolling_rescan(tmp_path):
+    root, scanner = _scanner(tmp_path, full_rescan_budget=1)
+    path = os.path.join(root, 'team', 'sub', 'deep.bin')
+    dir_mtime_ns = os.stat(os.path.dirname(path)).st_mtime_ns
+    # Rescrierea pe loc nu schimbă mtime-ul directorului; doar verificarea completă eșalonată o găsește.
+    with open(path, 'r+b') as f:
+        f.write(b'DEEP, rewritten')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert os.stat(os.path.dirname(path)).st_mtime_ns == dir_mtime_ns
+
+    found = {}
+    for _ in range(len(scanner._dirs)):
+        changed, _ = scanner.scan()
+        found.update(changed)
+    assert set(found) == {'team/sub/deep.bin'}
+    assert found['team/sub/deep.bin']['size'] == len(b'DEEP, rewritten')
@@ -0,0 +1,33 @@
+import os
+import sys
+import threading
+
+import pytest
+
+from client import ApplicationClient
+
+
+def _priority():
+    return os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='nice per thread doar pe Linux')
+def test_staged_update_is_applied_at_normal_priority(workdir, monkeypatch):
+    client = ApplicationClient(persist_versions=False, use_host_cache=False, auto_reconnect=False)
+    priorities = {}
+
+    def fake_download(app_name, **kwargs):
+        priorities['download'] = _priority()
+        return {'status': 'staged', 'path': 'staged/a.bin', 'version': kwargs['new_version_for_staging']}
+
+    def fake_apply(app_name, staged_path, version, trace_id=None):
+        priorities['apply'] = _priority()
+
+    monkeypatch.setattr(client, 'download_application', fake_download)
+    monkeypatch.setattr(client, 'handle_staged_update', fake_apply)
+    worker = threading.Thread(target=client._prefetch_and_stage_update, args=('a.bin', 2.0, 10))
+    baseline = _priority()
+    worker.start()
+    worker.join()
+    assert priorities['download'] > baseline
+    assert priorities['apply'] == baseline
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from client import ApplicationClient, ProcessSupervisor
+
+
+needs_pidfd = pytest.mark.skipif(not hasattr(os, 'pidfd_open'), reason='os.pidfd_open indisponibil')
+
+
+def _open_fds():
+    return len(os.listdir('/proc/self/fd'))
+
+
+def _waiting_process():
+    """ Proces care rulează până i se închide stdin-ul. """
+    return subprocess.Popen([sys.executable, '-c', 'import sys; sys.stdin.read()'], stdin=subprocess.PIPE)
+
+
+@needs_pidfd
+def test_exit_is_notified_through_pidfd():
+    exits = []
+    supervisor = ProcessSupervisor(on_exit=lambda app_name, process: exits.append((app_name, process.returncode)))
+    process = _waiting_process()
+    try:
+        supervisor.add('app', process)
+        assert supervisor.is_running('app') and supervisor._selector is not None
+        assert not any(thread.name.startswith('ProcessWaiter-') for thread in threading.enumerate())
+
+        process.stdin.close()
+        assert supervisor.wait_exit('app', timeout=10)
+        assert exits == [('app', 0)] and not supervisor.is_running('app')
+    finally:
+        supervisor.close()
+
+
+@needs_pidfd
+def test_close_releases_descriptors():
+    baseline = _open_fds()
+    client = ApplicationClient(persist_versions=False, use_host_cache=False, auto_reconnect=False)
+    assert _open_fds() == baseline
+    client.close_connection()
+
+    supervisor = ProcessSupervisor()
+    process = _waiting_process()
+    try:
+        with_process = _open_fds()
+        supervisor.add('app', process)
+        assert _open_fds() > with_process
+        supervisor.close()
+        assert _open_fds() == with_process
+        assert not supervisor._watcher_thread.is_alive()
+    finally:
+        process.stdin.close()
+        process.wait()
@@ -0,0 +1,72 @@
+import json
+import os
+
+from client import ApplicationClient, FleetSync, EXIT_SYNCED, EXIT_UNAVAILABLE
+
+from conftest import CuttingProxy, wait_until, write_app
+
+
+def _manifest(workdir, apps):
+    path = workdir / 'desired.json'
+    path.write_text(json.dumps({'apps': apps}))
+    return str(path)
+
+
+def _subscribed_apps(server):
+    with server.lock:
+        return [dict(data['downloaded_app_versions']) for data in server.active_clients.values()]
+
+
+def test_sync_reuses_workers_and_does_not_subscribe_them(app_server, workdir):
+    contents = {name: write_app(name, 256 * 1024, seed=index) for index, name in enumerate(('a.bin', 'b.bin', 'c.bin'))}
+    server = app_server()
+    client = ApplicationClient('127.0.0.1', server.port, persist_versions=False, use_host_cache=False)
+    client.connect()
+    sync = FleetSync(client, _manifest(workdir, ['a.bin', 'b.bin']), concurrency=2)
+    try:
+        synced, failed = sync.reconcile()
+        assert sorted(synced) == ['a.bin', 'b.bin'] and failed == []
+        workers = list(sync._worker_clients)
+        assert 1 <= len(workers) <= 2
+
+        _manifest(workdir, ['a.bin', 'b.bin', 'c.bin'])
+        synced, failed = sync.reconcile()
+        assert synced == ['c.bin'] and failed == []
+        assert all(worker in workers for worker in sync._worker_clients)
+        for name, content in contents.items():
+            with open(os.path.join('downloads', name), 'rb') as f:
+                assert f.read() == content
+
+        # Doar conexiunea principală (după announce_versions) e destinatar al notificărilor.
+        subscribed = [apps for apps in _subscribed_apps(server) if apps]
+        assert len(subscribed) == 1 and sorted(subscribed[0]) == ['a.bin', 'b.bin', 'c.bin']
+    finally:
+        sync.close()
+        client.close_connection()
+    assert sync._worker_clients == [] and all(worker.socket is None for worker in workers)
+
+
+def test_sync_once_reports_unreachable_server(app_server, workdir):
+    write_app('a.bin', 1024)
+    server = app_server()
+    proxy = CuttingProxy(server.port)
+    client = ApplicationClient('127.0.0.1', proxy.port, persist_versions=False, use_host_cache=False, auto_reconnect=False)
+    client.connect(listen=False)
+    sync = FleetSync(client, _manifest(workdir, ['a.bin']))
+    try:
+        assert wait_until(lambda: proxy.connection_count == 1)
+        proxy.pause()
+        assert sync.run(once=True) == EXIT_UNAVAILABLE
+    finally:
+        client.close_connection()
+
+
+def test_sync_once_succeeds(app_server, workdir):
+    write_app('a.bin', 1024)
+    server = app_server()
+    client = ApplicationClient('127.0.0.1', server.port, persist_versions=False, use_host_cache=False)
+    client.connect()
+    try:
+        assert FleetSync(client, _manifest(workdir, ['a.bin'])).run(once=True) == EXIT_SYNCED
+    finally:
+        client.close_connection()
@@ -0,0 +1,56 @@
+import inspect
+import re
+
+from client import ApplicationClient
+from replay import Replayer, load_sessions
+from server import ApplicationServer
+from traffic_trace import COMMAND_CODES, COMMAND_NAMES, COMMAND_UNKNOWN, KIND_REQUEST, TraceRecorder, read_trace
+
+from conftest import wait_until, write_app
+
+
+def test_every_dispatched_command_has_a_code():
+    source = inspect.getsource(ApplicationServer._dispatch_command)
+    dispatched = set()
+    for match in re.finditer(r"command (?:==|in) (\([^)]*\)|'[^']+')", source):
+        dispatched.update(re.findall(r"'([a-z_]+)'", match.group(1)))
+    assert dispatched and dispatched <= set(COMMAND_CODES)
+    assert len(set(COMMAND_CODES.values())) == len(COMMAND_CODES)
+
+
+def test_query_apps_is_recorded_and_replayed(app_server, workdir):
+    write_app('tool.bin', 4096)
+    server = app_server()
+    trace_path = str(workdir / 'queries.trace')
+    server.start_trace(trace_path)
+    client = ApplicationClient('127.0.0.1', server.port, persist_versions=False, use_host_cache=False)
+    client.connect(listen=False)
+    try:
+        assert client.query_applications(limit=10) is not None
+    finally:
+        client.close_connection()
+    # Cererea se înregistrează după răspuns: se așteaptă încheierea sesiunii pe server.
+    assert wait_until(lambda: not server.active_clients)
+    server.stop_trace()
+
+    sessions = load_sessions(trace_path)
+    commands = [COMMAND_NAMES.get(record.command) for session in sessions.values() for record in session['requests']]
+    assert 'query_apps' in commands
+
+    replayer = Replayer('127.0.0.1', server.port, speed=100.0)
+    replayer.run(sessions)
+    summary = replayer.summary()
+    assert summary['commands']['query_apps']['count'] == commands.count('query_apps')
+    assert summary['errors'] == {} and 'query_apps' not in summary['skipped']
+
+
+def test_unregistered_commands_are_recorded_as_unknown(tmp_path, capsys):
+    recorder = TraceRecorder(str(tmp_path / 'unknown.trace'))
+    session = recorder.open_session()
+    recorder.record_request(session, 'future_command', 'tool.bin', 10, 20, 0.1)
+    recorder.record_request(session, 'future_command', None, 10, 20, 0.1)
+    recorder.record_request(session, ['not', 'a', 'name'], {'app': 1}, 10, 20, 0.1)
+    recorder.close()
+    assert capsys.readouterr().out.count('future_command') == 1
+    commands = [record.command for record in read_trace(str(tmp_path / 'unknown.trace')) if record.kind == KIND_REQUEST]
+    assert commands == [COMMAND_UNKNOWN] * 3
@@ -0,0 +1,45 @@
+import time
+
+import server as server_module
+
+from conftest import write_app
+
+
+def _slow_warm(durations):
+    def warm_file(path, timeout=None):
+        time.sleep(min(durations[path.rsplit('/', 1)[-1]], timeout))
+        return 0
+    return warm_file
+
+
+def _prepare(app_server, monkeypatch, durations, warm_timeout):
+    for name in durations:
+        write_app(name, 1024)
+    server = app_server(warm_timeout=warm_timeout)
+    monkeypatch.setattr(server_module, 'warm_file', _slow_warm(durations))
+    monkeypatch.setattr(server, '_has_notification_targets', lambda app_name, version: True)
+    notified = []
+    monkeypatch.setattr(server, '_send_update_notifications',
+                        lambda app_name, version, size, detected_at=None, warm=True: notified.append((app_name, warm, time.monotonic())))
+    return server, notified
+
+
+def test_files_are_warmed_together_and_notified_when_ready(app_server, monkeypatch):
+    durations = {'slow.bin': 0.8, 'fast.bin': 0.1, 'mid.bin': 0.4}
+    server, notified = _prepare(app_server, monkeypatch, durations, warm_timeout=5.0)
+    started = time.monotonic()
+    server._notify_after_warming([server.applications.get(name) for name in durations])
+    elapsed = time.monotonic() - started
+    assert [name for name, _, _ in notified] == ['fast.bin', 'mid.bin', 'slow.bin']
+    assert not any(warm for _, warm, _ in notified)
+    assert notified[0][2] - started < 0.4
+    assert elapsed < 1.2
+
+
+def test_warming_time_is_capped_per_pass(app_server, monkeypatch):
+    durations = {f'app{index}.bin': 2.0 for index in range(6)}
+    server, notified = _prepare(app_server, monkeypatch, durations, warm_timeout=0.3)
+    started = time.monotonic()
+    server._notify_after_warming([server.applications.get(name) for name in durations])
+    assert len(notified) == 6
+    assert time.monotonic() - started < 0.8
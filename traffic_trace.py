@@ -0,0 +1,99 @@
+import collections
+import struct
+import threading
+import time
+import zlib
+
+
+TRACE_MAGIC = b'APPTRC1\n'
+# tip, sesiune, moment (s de la pornirea înregistrării), comandă, hash nume aplicație, bytes primiți, bytes trimiși, durată (s)
+TRACE_RECORD = struct.Struct('<BIdBIQQf')
+
+KIND_SESSION_OPEN = 1
+KIND_REQUEST = 2
+KIND_SESSION_CLOSE = 3
+
+# Comenzi fără cod în COMMAND_CODES; replay-ul le sare. Orice comandă nouă din server primește un cod aici.
+COMMAND_UNKNOWN = 0
+COMMAND_CODES = {
+    'list_apps': 1,
+    'download_app': 2,
+    'download_bundle': 3,
+    'list_versions': 4,
+    'publish_app': 5,
+    'rollback_app': 6,
+    'query_apps': 7,
+    'announce_versions': 8,
+    'resume_session': 9,
+    'trace_event': 10,
+    'rollout_stats': 11,
+    'profile_start': 12,
+    'profile_stop': 13,
+    'profile_report': 14,
+    'trace_start': 15,
+    'trace_stop': 16,
+}
+COMMAND_NAMES = {code: name for name, code in COMMAND_CODES.items()}
+MAX_UNKNOWN_COMMANDS = 16
+
+TraceRecord = collections.namedtuple('TraceRecord', 'kind session offset command name_hash bytes_in bytes_out duration')
+
+
+def name_hash(app_name):
+    """ Numele aplicațiilor nu se salvează în clar; replay-ul le regăsește după hash în catalogul local. """
+    return zlib.crc32(app_name.encode('utf-8')) if isinstance(app_name, str) and app_name else 0
+
+
+class TraceRecorder:
+    """ Înregistrează compact (binar, fără adrese sau conținut) cererile fiecărei sesiuni de client. """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'wb')
+        self._file.write(TRACE_MAGIC)
+        self._started = time.monotonic()
+        self._next_session = 1
+        self.unknown_commands = set()
+
+    def _write(self, kind, session_id, command=COMMAND_UNKNOWN, app_hash=0, bytes_in=0, bytes_out=0, duration=0.0):
+        record = TRACE_RECORD.pack(kind, session_id, time.monotonic() - self._started, command, app_hash, bytes_in, bytes_out, duration)
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(record)
+
+    def open_session(self):
+        with self._lock:
+            session_id = self._next_session
+            self._next_session += 1
+        self._write(KIND_SESSION_OPEN, session_id)
+        return session_id
+
+    def record_request(self, session_id, command, app_name, bytes_in, bytes_out, duration):
+        code = COMMAND_CODES.get(command, COMMAND_UNKNOWN) if isinstance(command, str) else COMMAND_UNKNOWN
+        if code == COMMAND_UNKNOWN:
+            label = str(command)[:64]
+            # Numele vin de la clienți: se reține (și se afișează) doar un număr limitat.
+            if label not in self.unknown_commands and len(self.unknown_commands) < MAX_UNKNOWN_COMMANDS:
+                self.unknown_commands.add(label)
+                print(f"Înregistrare trafic: comanda '{label}' nu are cod în COMMAND_CODES; se înregistrează ca necunoscută.")
+        self._write(KIND_REQUEST, session_id, code, name_hash(app_name), bytes_in, bytes_out, duration)
+
+    def close_session(self, session_id):
+        self._write(KIND_SESSION_CLOSE, session_id)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def read_trace(path):
+    with open(path, 'rb') as f:
+        if f.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+            raise ValueError(f"{path} nu este un fișier de trasare valid.")
+        while True:
+            data = f.read(TRACE_RECORD.size)
+            if len(data) < TRACE_RECORD.size:
+                break
+            yield TraceRecord(*TRACE_RECORD.unpack(data))